@@ -0,0 +1,125 @@
+from typing import Any, Callable, Mapping
+
+from fastapi_cache import FastAPICache
+
+from config import db_connection
+from config.cache import BulkRedisBackend, L1RedisBackend
+from config.metrics import metrics
+from api_v1.redirect_servise.cache import flights, revalidator
+from api_v1.redirect_servise.negative import negative_lookups
+from api_v1.redirect_servise.snapshot import redirect_snapshot
+from api_v1.redirect_servise.change_feed import change_feed
+
+
+def _pool_values(*fields: str) -> Callable[[], dict[tuple[str, ...], float]]:
+    def collect() -> dict[tuple[str, ...], float]:
+        stats = db_connection.pool_stats()
+        pools = [('primary', stats['primary']),
+                 *(('replica', replica) for replica in stats['replicas'])]
+        values = dict()
+        for role, pool in pools:
+            if pool is None:
+                continue
+            for field in fields:
+                labels = (role, pool['host'], field) if len(fields) > 1 else (role, pool['host'])
+                values[labels] = pool[field]
+        return values
+    return collect
+
+
+def _event_values(stats: Callable[[], Mapping[str, Any]]) -> Callable[[], dict[tuple[str, ...], float]]:
+    return lambda: {(event,): value for event, value in stats().items()}
+
+
+def _cache_values() -> dict[tuple[str, ...], float]:
+    backend = FastAPICache.get_backend()
+    if not isinstance(backend, BulkRedisBackend):
+        return dict()
+    return {(level, event): value
+            for level, stats in backend.stats().items()
+            if stats is not None
+            for event, value in stats.items()
+            if event not in ('size', 'max_size')}
+
+
+metrics.gauge('db_pool_connections',
+              'Connections of Data Base pools by state.',
+              _pool_values('checked_out', 'checked_in', 'overflow', 'size'),
+              labels=('role', 'host', 'state'),
+              )
+metrics.gauge('db_pool_checkouts_total',
+              'Connection checkouts of Data Base pools.',
+              _pool_values('checkouts'),
+              labels=('role', 'host'),
+              type='counter',
+              )
+metrics.gauge('db_pool_timeouts_total',
+              'Connection checkouts of Data Base pools failed by timeout.',
+              _pool_values('timeouts'),
+              labels=('role', 'host'),
+              type='counter',
+              )
+metrics.gauge('db_pool_wait_avg_ms',
+              'Average connection checkout wait of Data Base pools.',
+              _pool_values('avg_wait_ms'),
+              labels=('role', 'host'),
+              )
+metrics.gauge('db_pool_wait_max_ms',
+              'Maximum connection checkout wait of Data Base pools.',
+              _pool_values('max_wait_ms'),
+              labels=('role', 'host'),
+              )
+metrics.gauge('cache_events_total',
+              'Events of the in-process L1 cache and Redis behind it, Redis errors as event="errors".',
+              _cache_values,
+              labels=('level', 'event'),
+              type='counter',
+              )
+metrics.gauge('cache_l1_entries',
+              'Entries of the in-process L1 cache.',
+              lambda: {(): backend.stats()['l1']['size']
+                       for backend in (FastAPICache.get_backend(),)
+                       if isinstance(backend, L1RedisBackend)},
+              )
+metrics.gauge('single_flight_events_total',
+              'Leaders and coalesced waiters of concurrent cache misses.',
+              _event_values(flights.stats.as_dict),
+              labels=('event',),
+              type='counter',
+              )
+metrics.gauge('cache_refresh_events_total',
+              'Stale hits and background refreshes of cached entries.',
+              _event_values(revalidator.stats.as_dict),
+              labels=('event',),
+              type='counter',
+              )
+metrics.gauge('negative_lookups_total',
+              'Lookups of unknown short urls by outcome.',
+              _event_values(negative_lookups.stats.as_dict),
+              labels=('event',),
+              type='counter',
+              )
+metrics.gauge('redirect_snapshot_events_total',
+              'Hits, misses, refreshes and applied deletions of the redirect snapshot.',
+              _event_values(redirect_snapshot.stats.as_dict),
+              labels=('event',),
+              type='counter',
+              )
+metrics.gauge('redirect_snapshot_urls',
+              'Urls held by the in-process redirect snapshot.',
+              lambda: {(): redirect_snapshot.size},
+              )
+metrics.gauge('redirect_snapshot_bytes',
+              'Memory of buffer and index of the redirect snapshot.',
+              lambda: {(): redirect_snapshot.nbytes},
+              )
+metrics.gauge('change_feed_events_total',
+              'Received events, evictions, connections and resyncs of the change feed.',
+              _event_values(change_feed.stats.as_dict),
+              labels=('event',),
+              type='counter',
+              )
+metrics.gauge('change_feed_connected',
+              'Whether the change feed listens for changes of urls.',
+              lambda: {(): int(change_feed.connected)},
+              )
@@ -0,0 +1,65 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from fastapi_cache import FastAPICache
+
+from config import db_connection
+from config.cache import BulkRedisBackend
+from config.metrics import metrics, multiprocess_collector
+from api_v1.redirect_servise.cache import flights, revalidator
+from api_v1.redirect_servise.change_feed import change_feed
+from api_v1.redirect_servise.snapshot import redirect_snapshot
+from . import metrics as collectors  # noqa: F401
+
+
+router = APIRouter(
+    prefix='/internal',
+    tags=['Internal'],
+)
+
+
+@router.get(path='/cache',
+            name='internal:cache',
+            description=('Counters of the in-process `L1` cache, `Redis` behind it, '
+                         'coalesced concurrent cache misses, background refreshes, '
+                         'the in-process redirect snapshot and the change feed.'),
+            )
+async def get_cache_stats():
+    backend = FastAPICache.get_backend()
+    if not isinstance(backend, BulkRedisBackend):
+        stats = dict(l1=None, redis=None)
+    else:
+        stats = backend.stats()
+    stats['single_flight'] = flights.stats.as_dict()
+    stats['stale'] = revalidator.stats.as_dict()
+    stats['snapshot'] = dict(redirect_snapshot.stats.as_dict(),
+                             size=redirect_snapshot.size,
+                             bytes=redirect_snapshot.nbytes,
+                             )
+    stats['change_feed'] = dict(change_feed.stats.as_dict(),
+                                connected=change_feed.connected,
+                                )
+    return stats
+
+
+@router.get(path='/pool',
+            name='internal:pool',
+            description=('Counters of the `Data Base` connection pools of primary and replicas: '
+                         'checkout wait time, connections in use and overflow connections.'),
+            )
+async def get_pool_stats():
+    return db_connection.pool_stats()
+
+
+@router.get(path='/metrics',
+            name='internal:metrics',
+            description=('Request counts, latency histograms, cache and `Data Base` pool '
+                         'counters in `Prometheus` text format. Under `server.py` with '
+                         'several workers counters are summed over all worker processes, '
+                         'gauges are reported per worker with the `pid` label.'),
+            response_class=PlainTextResponse,
+            )
+async def get_metrics():
+    text = metrics.render() if multiprocess_collector is None else multiprocess_collector.render()
+    return PlainTextResponse(text,
+                             media_type='text/plain; version=0.0.4; charset=utf-8',
+                             )
@@ -0,0 +1,88 @@
+from typing import Any, Callable, Iterable
+
+from fastapi_cache import FastAPICache
+from loguru import logger
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config import db_connection, settings
+from config.cache import (
+    get_version,
+    bump_version,
+    SingleFlight,
+    RedisSingleFlight,
+    StaleWhileRevalidate,
+    )
+
+
+REDIRECT_NAMESPACE = 'redirect'
+LIST_NAMESPACE = 'urls-list'
+
+if settings.cache.SINGLE_FLIGHT_LOCK:
+    flights = RedisSingleFlight(lock_ttl=settings.cache.SINGLE_FLIGHT_LOCK_TTL,
+                                wait_timeout=settings.cache.SINGLE_FLIGHT_WAIT,
+                                )
+else:
+    flights = SingleFlight()
+revalidator = StaleWhileRevalidate(session_factory=db_connection.session,
+                                   stale=settings.cache.STALE_WINDOW,
+                                   beta=settings.cache.EARLY_REFRESH_BETA,
+                                   )
+
+
+def redirect_cache_key(url_id: int) -> str:
+    """
+    Cache key of original url by `id` of short url
+    """
+    return f'{FastAPICache.get_prefix()}:{REDIRECT_NAMESPACE}:{url_id}'
+
+
+def redirect_key_builder(func: Callable[..., Any],
+                         namespace: str = '',
+                         *,
+                         request: Request | None = None,
+                         response: Response | None = None,
+                         args: tuple[Any, ...],
+                         kwargs: dict[str, Any],
+                         ) -> str:
+    """
+    Key builder of redirect endpoint.
+
+    Keys are plain `prefix:redirect:{url_id}`, so they can be read
+    in bulk with `MGET` and evicted by `id`.
+    """
+    return f'{namespace}:{kwargs["url_id"]}'
+
+
+async def list_key_builder(func: Callable[..., Any],
+                           namespace: str = '',
+                           *,
+                           request: Request | None = None,
+                           response: Response | None = None,
+                           args: tuple[Any, ...],
+                           kwargs: dict[str, Any],
+                           ) -> str:
+    """
+    Key builder of list endpoint.
+
+    Keys contain current version of urls collection, so any change of
+    urls makes all cached pages unreachable at once.
+    """
+    try:
+        version = await get_version(LIST_NAMESPACE)
+    except Exception:
+        version = 'unknown'
+    return f'{namespace}:v{version}:{kwargs["after_id"]}:{kwargs["limit"]}'
+
+
+async def invalidate_urls(url_ids: Iterable[int] = ()) -> None:
+    """
+    Evict cached redirects of changed urls and bump version of urls list
+    """
+    backend = FastAPICache.get_backend()
+    try:
+        for url_id in url_ids:
+            await backend.clear(key=redirect_cache_key(url_id))
+        await bump_version(LIST_NAMESPACE)
+    except Exception:
+        logger.opt(exception=True).error('Can not invalidate cache of urls')
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import random
+from dataclasses import dataclass, asdict
+from typing import Sequence
+
+import asyncpg
+from fastapi_cache import FastAPICache
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import db_connection, settings
+from config.cache import L1RedisBackend, version_cache_key
+from config.database.db_helper import asyncpg_dsn
+from config.database.routing import use_primary
+from .cache import LIST_NAMESPACE, invalidate_urls, redirect_cache_key
+from .dao import RedirectServiseDAO
+from .negative import missing_cache_key, negative_lookups
+from .snapshot import redirect_snapshot
+
+
+@dataclass
+class ChangeFeedStats:
+    """
+    Counters of change feed
+    """
+    events: int = 0
+    evictions: int = 0
+    connects: int = 0
+    resyncs: int = 0
+    replayed_deletions: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class ChangeFeed:
+    """
+    Applies changes of short urls made by other workers to caches of
+    this process.
+
+    `RedirectServiseDAO` publishes `NOTIFY` with ids of created, updated
+    and deleted urls in the writing transaction. The feed keeps one
+    dedicated asyncpg connection (outside of the pool) with `LISTEN`
+    on the channel and on every event:
+
+    - evicts redirects of updated and deleted urls, missing markers of
+      created urls and version of urls list from the in-process `L1`;
+    - removes deleted urls from the redirect snapshot and adds created
+      ids to the Bloom filter of negative lookups.
+
+    Redis is invalidated by the writer after commit, so the feed does
+    not repeat it for each event.
+
+    Notifications sent while the connection is down are lost. After
+    every (re)connection, once `LISTEN` is active, the feed resyncs:
+    clears the whole `L1` and replays the deletion log from the last
+    seen position, evicting those urls from `L1` and Redis. Connection
+    is checked every `health_interval` seconds and reopened with
+    exponential backoff up to `max_backoff` seconds.
+
+    ## Example
+    ```python
+    feed = ChangeFeed(session_factory=db_connection.session,
+                      dsn=asyncpg_dsn(settings.db.url),
+                      channel='url_changes',
+                      )
+    await feed.start()
+    ```
+    """
+    def __init__(self,
+                 session_factory: async_sessionmaker[AsyncSession],
+                 dsn: str,
+                 channel: str,
+                 health_interval: float = 10.0,
+                 min_backoff: float = 0.5,
+                 max_backoff: float = 30.0,
+                 chunk_size: int = 10_000,
+                 ) -> None:
+        self.session_factory = session_factory
+        self.dsn = dsn
+        self.channel = channel
+        self.health_interval = health_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.chunk_size = chunk_size
+        self.stats = ChangeFeedStats()
+        self.connected = False
+        self.last_deletion: int | None = None
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _l1() -> L1RedisBackend | None:
+        backend = FastAPICache.get_backend()
+        return backend if isinstance(backend, L1RedisBackend) else None
+
+    def apply(self, operation: str, ids: Sequence[int]) -> None:
+        """
+        Apply one change event to caches of this process
+        """
+        if operation == 'insert':
+            negative_lookups.added_many(ids)
+            keys = [missing_cache_key(url_id) for url_id in ids]
+        else:
+            keys = [redirect_cache_key(url_id) for url_id in ids]
+        if operation == 'delete':
+            for url_id in ids:
+                redirect_snapshot.deleted(url_id)
+        backend = self._l1()
+        if backend is not None:
+            keys.append(version_cache_key(LIST_NAMESPACE))
+            for key in keys:
+                if backend.l1.pop(key) is not None:
+                    self.stats.evictions += 1
+
+    def _on_notify(self,
+                   connection: asyncpg.Connection,
+                   pid: int,
+                   channel: str,
+                   payload: str,
+                   ) -> None:
+        self.stats.events += 1
+        try:
+            event = json.loads(payload)
+            self.apply(event['op'], event['ids'])
+        except Exception:
+            self.stats.errors += 1
+            logger.opt(exception=True).warning('Can not apply change event {}', payload)
+
+    async def resync(self) -> None:
+        """
+        Catch up with changes possibly missed while not listening
+        """
+        backend = self._l1()
+        if backend is not None:
+            backend.l1.clear()
+        async with self.session_factory() as session:
+            use_primary(session)
+            if self.last_deletion is None:
+                self.last_deletion = await RedirectServiseDAO.last_deletion(session)
+            while True:
+                deletions = await RedirectServiseDAO.find_deletions(
+                    session=session,
+                    after_id=self.last_deletion,
+                    limit=self.chunk_size,
+                )
+                if not deletions:
+                    break
+                url_ids = [url_id for _, url_id in deletions]
+                await invalidate_urls(url_ids)
+                for url_id in url_ids:
+                    redirect_snapshot.deleted(url_id)
+                self.last_deletion = deletions[-1][0]
+                self.stats.replayed_deletions += len(deletions)
+        self.stats.resyncs += 1
+
+    async def _watch(self, connection: asyncpg.Connection, lost: asyncio.Event) -> None:
+        while not lost.is_set():
+            try:
+                await asyncio.wait_for(lost.wait(), timeout=self.health_interval)
+            except TimeoutError:
+                await connection.fetchval('SELECT 1', timeout=self.health_interval)
+
+    async def _listen(self) -> None:
+        connection = await asyncpg.connect(self.dsn, timeout=self.health_interval)
+        try:
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(self.channel, self._on_notify)
+            self.stats.connects += 1
+            await self.resync()
+            self.connected = True
+            logger.info('Change feed listens on {}', self.channel)
+            await self._watch(connection, lost)
+        finally:
+            self.connected = False
+            connection.terminate()
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Delay before reconnection `attempt`, exponential with jitter
+        """
+        delay = min(self.max_backoff, self.min_backoff * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    async def _run(self) -> None:
+        attempt = 0
+        while True:
+            resyncs = self.stats.resyncs
+            try:
+                await self._listen()
+            except Exception:
+                self.stats.errors += 1
+                logger.opt(exception=True).warning('Change feed connection is lost')
+            if self.stats.resyncs > resyncs:
+                # Connection was established, backoff starts over
+                attempt = 0
+            await asyncio.sleep(self.backoff(attempt))
+            attempt += 1
+
+    async def start(self) -> None:
+        """
+        Start listening of changes in background
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+change_feed = ChangeFeed(
+    session_factory=db_connection.session,
+    dsn=asyncpg_dsn(settings.db.url),
+    channel=settings.cache.CHANGE_FEED_CHANNEL,
+    health_interval=settings.cache.CHANGE_FEED_HEALTH_INTERVAL,
+    max_backoff=settings.cache.CHANGE_FEED_MAX_BACKOFF,
+)
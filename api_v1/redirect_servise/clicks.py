@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime, timezone
+from functools import wraps
+from time import time
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import db_connection, settings
+from .dao import RedirectClickDAO
+
+
+class ClickCounter:
+    """
+    Write-behind accumulator of redirect clicks.
+
+    Redirects only increment counters in process memory. Background task
+    flushes them with one batched upsert every `flush_interval` seconds
+    or as soon as `flush_size` distinct urls are pending, and pending
+    counters are flushed on shutdown. A flush cancelled by shutdown
+    puts its counters back, so the final flush writes them.
+
+    If Data Base is unavailable counters are kept until the next flush,
+    but not more than `max_pending` urls, the rest is dropped.
+
+    ## Example
+    ```python
+    counter = ClickCounter(session_factory=db_connection.session)
+    await counter.start()
+    counter.hit(url_id=23)
+    await counter.stop()
+    ```
+    """
+    def __init__(self,
+                 session_factory: async_sessionmaker[AsyncSession],
+                 flush_interval: float = 5.0,
+                 flush_size: int = 10_000,
+                 max_pending: int = 1_000_000,
+                 ) -> None:
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: dict[int, list[int | float]] = dict()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def hit(self, url_id: int) -> None:
+        """
+        Count one click, never waits for I/O
+        """
+        entry = self._pending.get(url_id)
+        if entry is not None:
+            entry[0] += 1
+            entry[1] = time()
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending[url_id] = [1, time()]
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """
+        Write all pending counters to Data Base
+        """
+        pending, self._pending = self._pending, dict()
+        if not pending:
+            return
+        clicks = {url_id: (count, datetime.fromtimestamp(last_access, tz=timezone.utc))
+                  for url_id, (count, last_access)
+                  in pending.items()}
+        try:
+            async with self.session_factory() as session:
+                await RedirectClickDAO.add_clicks(session=session, clicks=clicks)
+        except Exception:
+            logger.opt(exception=True).error('Can not flush {} click counters', len(pending))
+            self._restore(pending)
+        except BaseException:
+            # Cancelled during write (e.g. by `stop`), next flush retries
+            self._restore(pending)
+            raise
+
+    def _restore(self, pending: dict[int, list[int | float]]) -> None:
+        for url_id, (count, last_access) in pending.items():
+            entry = self._pending.get(url_id)
+            if entry is not None:
+                entry[0] += count
+                entry[1] = max(entry[1], last_access)
+            elif len(self._pending) < self.max_pending:
+                self._pending[url_id] = [count, last_access]
+            else:
+                self.dropped += count
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+click_counter = ClickCounter(
+    session_factory=db_connection.session,
+    flush_interval=settings.analytics.CLICKS_FLUSH_INTERVAL,
+    flush_size=settings.analytics.CLICKS_FLUSH_SIZE,
+    max_pending=settings.analytics.CLICKS_MAX_PENDING,
+)
+
+
+def count_clicks(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Count click of successful redirect by `url_id` argument.
+
+    Must be the outer decorator, above `@cache`, so cached redirects
+    are counted too.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        result = await func(*args, **kwargs)
+        if settings.analytics.CLICKS_ENABLED:
+            click_counter.hit(kwargs['url_id'])
+        return result
+    return wrapper
@@ -4,3 +4,4 @@ from enum import Enum
 class ErrorCode(str, Enum):
     URL_NOT_FOUND_ERROR = 'URL_NOT_FOUND_BY_THIS_ID'
     URL_ALREADY_EXISTS_ERROR = 'URL_ALREADY_EXISTS_BY_THIS_NAME'
+    URL_UPDATE_NOT_SUPPORTED_ERROR = 'URL_UPDATE_NOT_SUPPORTED_BY_STORAGE'
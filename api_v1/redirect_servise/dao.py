@@ -1,5 +1,60 @@
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, ClassVar, Mapping, Sequence
+
+from fastapi import status
+from sqlalchemy import DateTime, BigInteger, LargeBinary, Select, Text, any_, bindparam, func
+from sqlalchemy.dialects.postgresql import ARRAY, Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import db_connection, settings
 from config.dao import BaseDAO
-from config.models import RedirectURL
+from config.dao.base_dao import keyset_statment
+from config.database.routing import REPLICA_READ, use_primary
+from config.models import RedirectURL, RedirectClick, RedirectDeletion, RedirectDigest
+from config.models.urls import url_digest
+from config.storage import MmapUrlStore
+from .cache import invalidate_urls
+from .common import ErrorCode
+from .exceptions import UrlAlreadyExistsError, UrlUpdateNotSupportedError
+
+
+# Digest may be skipped as taken and its url deleted before it is read
+CLAIM_ATTEMPTS = 3
+
+
+def claim_urls_statement() -> Insert:
+    """
+    Insert of new urls given as arrays `urls` and `hashes` of digests
+
+    Digest is claimed in `redirectdigests` with the next `id`, url is
+    inserted into partitioned `redirecturls` only for claimed digests,
+    all in one statement. Digests claimed before (or concurrently by
+    committed transactions) are skipped like `ON CONFLICT DO NOTHING`,
+    any other conflict (`id` taken) is an error.
+    """
+    rows = Select(
+        func.unnest(bindparam('urls', type_=ARRAY(Text))).label('url'),
+        func.unnest(bindparam('hashes', type_=ARRAY(LargeBinary))).label('url_hash'),
+    ).subquery()
+    unique_rows = (Select(func.min(rows.c.url).label('url'), rows.c.url_hash)
+                   .group_by(rows.c.url_hash)
+                   .cte('unique_rows'))
+    next_id = func.nextval(func.pg_get_serial_sequence(RedirectURL.__tablename__, 'id'))
+    claimed = (insert(RedirectDigest)
+               .from_select(['url_hash', 'id'], Select(unique_rows.c.url_hash, next_id))
+               .on_conflict_do_nothing(index_elements=['url_hash'])
+               .returning(RedirectDigest.url_hash, RedirectDigest.id)
+               .cte('claimed'))
+    source = (Select(claimed.c.id, unique_rows.c.url, claimed.c.url_hash)
+              .join(unique_rows, unique_rows.c.url_hash == claimed.c.url_hash))
+    return (insert(RedirectURL.__table__)
+            .from_select(['id', 'url', 'url_hash'], source)
+            .returning(RedirectURL.id, RedirectURL.url))
+
+
+CLAIM_URLS = claim_urls_statement()
 
 
 class RedirectServiseDAO(BaseDAO):
@@ -7,3 +62,471 @@ class RedirectServiseDAO(BaseDAO):
     Class DAO for redirect servise
     """
     model = RedirectURL
+    change_channel = (settings.cache.CHANGE_FEED_CHANNEL
+                      if settings.cache.CHANGE_FEED_ENABLED
+                      else None)
+
+    @classmethod
+    async def after_commit(cls,
+                           operation: str,
+                           instances: Sequence[RedirectURL],
+                           ) -> None:
+        """
+        Invalidate cached redirects and list pages of changed urls
+        """
+        await invalidate_urls(
+            url_ids=() if operation == 'insert' else [url.id for url in instances],
+        )
+
+    @classmethod
+    async def find_latest_ids(cls,
+                              session: AsyncSession,
+                              limit: int,
+                              ) -> list[int]:
+        """
+        Ids of most recently created short urls
+        """
+        stmt = Select(cls.model.id).order_by(cls.model.id.desc()).limit(limit)
+        result = await session.scalars(statement=stmt, bind_arguments=REPLICA_READ)
+        return list(result)
+
+    @classmethod
+    async def find_url(cls,
+                       session: AsyncSession,
+                       url_id: int,
+                       ) -> RedirectURL | None:
+        """
+        Short url by `id`, read from replica and re-read from primary
+        if replica has not received it yet (read-your-writes)
+        """
+        url = await cls.find_item_by_args(session=session, id=url_id)
+        if url is None and db_connection.replicas:
+            url = await cls.find_item_by_args(session=use_primary(session), id=url_id)
+        return url
+
+    @classmethod
+    async def _claim_urls(cls,
+                          session: AsyncSession,
+                          urls: Sequence[str],
+                          ) -> list[RedirectURL]:
+        result = await session.execute(CLAIM_URLS, dict(
+            urls=list(urls),
+            hashes=[url_digest(url) for url in urls],
+        ))
+        return [cls.model(id=url_id, url=url, url_hash=url_digest(url))
+                for url_id, url in result.tuples()]
+
+    @classmethod
+    async def get_or_create(cls,
+                            session: AsyncSession,
+                            index_elements: Sequence[str] = ('url_hash',),
+                            **values,
+                            ) -> tuple[RedirectURL, bool]:
+        """
+        Get existing or create new short url by digest of `url`
+
+        Raises:
+            UrlAlreadyExistsError: Digest stays taken, but its url is
+                not found after `CLAIM_ATTEMPTS` attempts.
+        """
+        for _ in range(CLAIM_ATTEMPTS):
+            try:
+                created = await cls._claim_urls(session, (values['url'],))
+                if created:
+                    instance, = created
+                    await cls.notify_changes(session, 'insert', (instance.id,))
+                else:
+                    existing = await cls.find_items_by_values(
+                        session=use_primary(session),
+                        field='url_hash',
+                        values=(url_digest(values['url']),),
+                    )
+                    instance = existing[0] if existing else None
+                await session.commit()
+            except SQLAlchemyError as ex:
+                await session.rollback()
+                raise ex
+            if instance is not None:
+                break
+        else:
+            raise UrlAlreadyExistsError(status_code=status.HTTP_409_CONFLICT,
+                                        detail=ErrorCode.URL_ALREADY_EXISTS_ERROR,
+                                        )
+        if created:
+            await cls.after_commit('insert', created)
+        return instance, bool(created)
+
+    @classmethod
+    async def add(cls,
+                  session: AsyncSession,
+                  **values,
+                  ) -> RedirectURL:
+        """
+        Create short url, existing url with the same digest is returned
+        """
+        instance, _ = await cls.get_or_create(session=session, **values)
+        return instance
+
+    @classmethod
+    async def add_many(cls,
+                       session: AsyncSession,
+                       values: Sequence[dict],
+                       index_elements: Sequence[str] | None = None,
+                       ) -> list[RedirectURL]:
+        """
+        Create many short urls with one statement, existing urls are skipped
+        """
+        if not values:
+            return list()
+        try:
+            created = await cls._claim_urls(session, [value['url'] for value in values])
+            await cls.notify_changes(session, 'insert', [url.id for url in created])
+            await session.commit()
+        except SQLAlchemyError as ex:
+            await session.rollback()
+            raise ex
+        if created:
+            await cls.after_commit('insert', created)
+        return created
+
+    @classmethod
+    async def find_items_by_values(cls,
+                                   session: AsyncSession,
+                                   field: str,
+                                   values: Sequence[int | bytes],
+                                   ) -> list[RedirectURL]:
+        """
+        Short urls by values of `field`, digests are resolved to `id`
+        by `redirectdigests`, so each url is read from one partition
+        """
+        if field != 'url_hash':
+            return await super().find_items_by_values(session=session, field=field, values=values)
+        stmt = (Select(cls.model)
+                .join(RedirectDigest, RedirectDigest.id == cls.model.id)
+                .where(RedirectDigest.url_hash == any_(bindparam('url_hash_values',
+                                                                 value=list(values),
+                                                                 type_=ARRAY(LargeBinary),
+                                                                 ))))
+        result = await session.scalars(statement=stmt, bind_arguments=REPLICA_READ)
+        return list(result)
+
+    @classmethod
+    async def get_or_create_url(cls,
+                                session: AsyncSession,
+                                url: str,
+                                ) -> tuple[RedirectURL, bool]:
+        """
+        Get existing or create new short url, unique by digest of url
+        """
+        return await cls.get_or_create(
+            session=session,
+            index_elements=('url_hash',),
+            url=url,
+            url_hash=url_digest(url),
+        )
+
+    @classmethod
+    async def delete(cls,
+                     session: AsyncSession,
+                     instance: RedirectURL,
+                     ) -> None:
+        """
+        Delete short url and append its `id` to deletion log in one transaction
+        """
+        session.add(RedirectDeletion(url_id=instance.id))
+        await super().delete(session=session, instance=instance)
+
+    @classmethod
+    async def stream_id_urls(cls,
+                             session: AsyncSession,
+                             after_id: int | None = None,
+                             chunk_size: int = 10_000,
+                             ) -> AsyncIterator[tuple[int, str]]:
+        """
+        `(id, url)` rows ordered by `id` from primary, without building entities
+        """
+        stmt = keyset_statment(
+            stmt=Select(cls.model.id, cls.model.url),
+            model=cls.model,
+            after_id=after_id,
+        ).execution_options(yield_per=chunk_size)
+        result = await session.stream(stmt)
+        async for url_id, url in result.tuples():
+            yield url_id, url
+
+    @classmethod
+    async def find_deletions(cls,
+                             session: AsyncSession,
+                             after_id: int = 0,
+                             limit: int = 10_000,
+                             ) -> list[tuple[int, int]]:
+        """
+        `(position, url id)` of deletion log after `after_id` from primary
+        """
+        stmt = (Select(RedirectDeletion.id, RedirectDeletion.url_id)
+                .where(RedirectDeletion.id > after_id)
+                .order_by(RedirectDeletion.id)
+                .limit(limit))
+        result = await session.execute(stmt)
+        return list(result.tuples())
+
+    @classmethod
+    async def last_deletion(cls, session: AsyncSession) -> int:
+        """
+        Position of the last record of deletion log, `0` if empty
+        """
+        return await session.scalar(Select(func.max(RedirectDeletion.id))) or 0
+
+
+class MmapRedirectServiseDAO(RedirectServiseDAO):
+    """
+    Class DAO for redirect servise on memory-mapped url store
+
+    Same interface as `RedirectServiseDAO` without Data Base:
+    `session` arguments are accepted and ignored, urls are returned
+    as transient `RedirectURL`. Lookups by `id` are O(1) reads of
+    the mapped index, writes wait for `fdatasync` in a thread.
+    """
+    store: ClassVar[MmapUrlStore] = MmapUrlStore(settings.storage.PATH,
+                                                 sync=settings.storage.SYNC,
+                                                 )
+
+    @classmethod
+    def _instance(cls, url_id: int) -> RedirectURL | None:
+        url = cls.store.get(url_id)
+        return None if url is None else cls.model(id=url_id, url=url)
+
+    @classmethod
+    def _url_id(cls, field: str, value: int | bytes) -> int | None:
+        if field == 'id':
+            return value
+        if field == 'url_hash':
+            return cls.store.find_digest(value)
+        raise ValueError(f'Url store can not search by {field}')
+
+    @classmethod
+    def _check_index(cls, index_elements: Sequence[str] | None) -> None:
+        # Store deduplicates urls only by digest
+        if index_elements is not None and tuple(index_elements) != ('url_hash',):
+            raise ValueError(f'Url store can not deduplicate by {index_elements}')
+
+    @classmethod
+    async def find_item_by_args(cls,
+                                session: AsyncSession,
+                                one_to_many: Sequence[RedirectURL] | None = None,
+                                many_to_many: Sequence[RedirectURL] | None = None,
+                                **kwargs: int | bytes,
+                                ) -> RedirectURL | None:
+        (field, value), = kwargs.items()
+        url_id = cls._url_id(field, value)
+        return None if url_id is None else cls._instance(url_id)
+
+    @classmethod
+    async def find_url(cls,
+                       session: AsyncSession,
+                       url_id: int,
+                       ) -> RedirectURL | None:
+        return cls._instance(url_id)
+
+    @classmethod
+    async def find_items_by_values(cls,
+                                   session: AsyncSession,
+                                   field: str,
+                                   values: Sequence[int | bytes],
+                                   ) -> list[RedirectURL]:
+        urls = (cls._instance(url_id)
+                for url_id in (cls._url_id(field, value) for value in values)
+                if url_id is not None)
+        return [url for url in urls if url is not None]
+
+    @classmethod
+    async def find_page_by_args(cls,
+                                session: AsyncSession,
+                                after_id: int | None = None,
+                                limit: int = 100,
+                                **kwargs,
+                                ) -> list[RedirectURL]:
+        urls = list()
+        for url_id in cls.store.iter_ids(after_id or 0):
+            urls.append(cls._instance(url_id))
+            if len(urls) >= limit:
+                break
+        return urls
+
+    @classmethod
+    async def stream_items_by_args(cls,
+                                   session: AsyncSession,
+                                   after_id: int | None = None,
+                                   chunk_size: int = 1000,
+                                   **kwargs,
+                                   ) -> AsyncIterator[RedirectURL]:
+        for number, url_id in enumerate(cls.store.iter_ids(after_id or 0), start=1):
+            yield cls._instance(url_id)
+            if number % chunk_size == 0:
+                await asyncio.sleep(0)
+
+    @classmethod
+    async def stream_field_values(cls,
+                                  session: AsyncSession,
+                                  field: str,
+                                  after_id: int | None = None,
+                                  chunk_size: int = 1000,
+                                  **kwargs,
+                                  ) -> AsyncIterator[int]:
+        if field != 'id':
+            raise ValueError(f'Url store can not stream {field}')
+        for number, url_id in enumerate(cls.store.iter_ids(after_id or 0), start=1):
+            yield url_id
+            if number % chunk_size == 0:
+                await asyncio.sleep(0)
+
+    @classmethod
+    async def find_latest_ids(cls,
+                              session: AsyncSession,
+                              limit: int,
+                              ) -> list[int]:
+        ids = list()
+        for url_id in cls.store.iter_ids(reverse=True):
+            ids.append(url_id)
+            if len(ids) >= limit:
+                break
+        return ids
+
+    @classmethod
+    async def add_many(cls,
+                       session: AsyncSession,
+                       values: Sequence[dict],
+                       index_elements: Sequence[str] | None = None,
+                       ) -> list[RedirectURL]:
+        """
+        Append new urls, existing ones are skipped like `ON CONFLICT DO NOTHING`
+        """
+        cls._check_index(index_elements)
+        urls = [value['url'] for value in values]
+        results = await asyncio.to_thread(cls.store.add_many, urls)
+        created = [cls.model(id=url_id, url=url)
+                   for url, (url_id, is_new) in zip(urls, results)
+                   if is_new]
+        if created:
+            await cls.after_commit('insert', created)
+        return created
+
+    @classmethod
+    async def get_or_create(cls,
+                            session: AsyncSession,
+                            index_elements: Sequence[str] = ('url_hash',),
+                            **values,
+                            ) -> tuple[RedirectURL, bool]:
+        cls._check_index(index_elements)
+        url = values['url']
+        url_id, created = await asyncio.to_thread(cls.store.add, url)
+        instance = cls.model(id=url_id, url=url)
+        if created:
+            await cls.after_commit('insert', (instance,))
+        return instance, created
+
+    @classmethod
+    async def add(cls,
+                  session: AsyncSession,
+                  **values,
+                  ) -> RedirectURL:
+        instance, _ = await cls.get_or_create(session=session, **values)
+        return instance
+
+    @classmethod
+    async def update(cls,
+                     session: AsyncSession,
+                     instance: RedirectURL,
+                     **values,
+                     ) -> RedirectURL:
+        """
+        Urls of url store are append-only, change is delete and add
+        """
+        raise UrlUpdateNotSupportedError(status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
+                                         detail=ErrorCode.URL_UPDATE_NOT_SUPPORTED_ERROR,
+                                         )
+
+    @classmethod
+    async def delete(cls,
+                     session: AsyncSession,
+                     instance: RedirectURL,
+                     ) -> None:
+        await asyncio.to_thread(cls.store.delete, instance.id)
+        await cls.after_commit('delete', (instance,))
+
+
+class RedirectClickDAO(BaseDAO):
+    """
+    Class DAO for usage counters of short urls
+    """
+    model = RedirectClick
+
+    @classmethod
+    async def find_most_clicked_ids(cls,
+                                    session: AsyncSession,
+                                    limit: int,
+                                    ) -> list[int]:
+        """
+        Ids of short urls with most clicks
+        """
+        stmt = Select(cls.model.id).order_by(cls.model.clicks.desc()).limit(limit)
+        result = await session.scalars(statement=stmt, bind_arguments=REPLICA_READ)
+        return list(result)
+
+    @classmethod
+    async def add_clicks(cls,
+                         session: AsyncSession,
+                         clicks: Mapping[int, tuple[int, datetime]],
+                         ) -> None:
+        """
+        Add accumulated clicks with one upsert statement
+
+        Counters are passed as three arrays and unnested on the server,
+        so statement size does not depend on count of urls. Clicks of
+        urls deleted in the meantime are skipped by join.
+
+        Args:
+            session (AsyncSession): Current session
+
+            clicks (Mapping[int, tuple[int, datetime]]): Count of clicks
+                and time of last click by `id` of short url
+        """
+        rows = Select(
+            func.unnest(bindparam('ids', type_=ARRAY(BigInteger))).label('id'),
+            func.unnest(bindparam('clicks', type_=ARRAY(BigInteger))).label('clicks'),
+            func.unnest(bindparam('last_access',
+                                  type_=ARRAY(DateTime(timezone=True)),
+                                  )).label('last_access'),
+        ).subquery()
+        source = (Select(rows.c.id, rows.c.clicks, rows.c.last_access)
+                  .join(RedirectURL, RedirectURL.id == rows.c.id))
+        stmt = insert(cls.model).from_select(
+            ['id', 'clicks', 'last_access'],
+            source,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['id'],
+            set_=dict(
+                clicks=cls.model.clicks + stmt.excluded.clicks,
+                last_access=func.greatest(cls.model.last_access,
+                                          stmt.excluded.last_access,
+                                          ),
+            ),
+        )
+        params = dict(
+            ids=list(clicks),
+            clicks=[count for count, _ in clicks.values()],
+            last_access=[last_access for _, last_access in clicks.values()],
+        )
+        try:
+            await session.execute(stmt, params)
+            await session.commit()
+        except SQLAlchemyError as ex:
+            await session.rollback()
+            raise ex
+
+
+# DAO of short urls for storage backend selected by `STORAGE_BACKEND`
+UrlDAO: type[RedirectServiseDAO] = (MmapRedirectServiseDAO
+                                    if settings.storage.BACKEND == 'mmap'
+                                    else RedirectServiseDAO)
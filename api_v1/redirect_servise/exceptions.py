@@ -15,3 +15,11 @@ class UrlAlreadyExistsError(HTTPException):
     """
 
     pass
+
+
+class UrlUpdateNotSupportedError(HTTPException):
+    """
+    Exception ``Url can not be updated in this storage``.
+    """
+
+    pass
@@ -0,0 +1,123 @@
+from urllib.parse import quote
+
+from fastapi_cache import FastAPICache
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import settings
+from config.cache import cache_control_header, client_max_age
+from config.metrics import ROUTE_SCOPE_KEY, metrics
+from config.models.base import MAX_ID
+from .cache import REDIRECT_NAMESPACE, redirect_cache_key, revalidator
+from .clicks import click_counter
+from .short_codes import short_codes
+from .snapshot import redirect_snapshot
+
+
+_LOCATION_SAFE = ":/%#?=@[]!$&'()*+,;"
+_REDIRECT_BODY = {'type': 'http.response.body', 'body': b''}
+
+redirect_lookups = metrics.counter(
+    'redirect_cache_lookups_total',
+    'Redirect cache lookups of the fast path by result.',
+    labels=('result',),
+)
+
+
+class RedirectFastPathMiddleware:
+    """
+    Lean ASGI handler of cached redirects.
+
+    For `GET {API_PREFIX}/urls/{id}` and `GET /{code}` it reads the
+    in-process redirect snapshot (if it is loaded) or redirect cache
+    directly and sends `307` with `Location`, skipping routing,
+    dependency injection, validation and response classes of FastAPI.
+    Cache misses and all other requests are passed to the application,
+    so Data Base session is opened only on a miss and errors are
+    handled as usual. Entries due for refresh are passed to the
+    application too, it serves them from cache and refreshes in
+    background.
+
+    ## Args:
+        app (ASGIApp): Next ASGI application.
+        reserved_paths (Iterable[str]): Root paths of application routes,
+            which must not be treated as short codes (`/docs`, ...).
+    """
+    def __init__(self, app: ASGIApp, reserved_paths: tuple[str, ...] = ()) -> None:
+        self.app = app
+        self.reserved_paths = frozenset(reserved_paths)
+        self.prefix = f'{settings.API_PREFIX}/urls/'
+        self.max_code_length = settings.short_codes.MAX_LENGTH + 1
+        self.id_route = f'{self.prefix}{{url_id}}'
+        self.code_route = '/{code}'
+
+    def _match(self, path: str) -> int | None:
+        if path.startswith(self.prefix):
+            url_id = path[len(self.prefix):]
+            if not url_id.isdigit() or not url_id.isascii():
+                return None
+            url_id = int(url_id)
+        elif (2 <= len(path) <= self.max_code_length
+              and path.count('/') == 1
+              and path not in self.reserved_paths):
+            url_id = short_codes.decode(path[1:])
+        else:
+            return None
+        if not url_id or url_id > MAX_ID:
+            return None
+        return url_id
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return await self.app(scope, receive, send)
+        url_id = self._match(scope['path'])
+        if url_id is None:
+            return await self.app(scope, receive, send)
+        url = redirect_snapshot.get(url_id)
+        if url is not None:
+            redirect_lookups.inc('snapshot')
+            return await self._redirect(scope, send, url_id, url, settings.cache.CLIENT_MAX_AGE)
+        try:
+            ttl, cached = await FastAPICache.get_backend().get_with_ttl(
+                redirect_cache_key(url_id),
+            )
+        except Exception:
+            redirect_lookups.inc('error')
+            return await self.app(scope, receive, send)
+        if cached is None:
+            redirect_lookups.inc('miss')
+            return await self.app(scope, receive, send)
+        if revalidator.is_due(REDIRECT_NAMESPACE, ttl, settings.cache.REDIRECT_EXPIRE):
+            redirect_lookups.inc('refresh')
+            return await self.app(scope, receive, send)
+        redirect_lookups.inc('hit')
+        await self._redirect(scope,
+                             send,
+                             url_id,
+                             FastAPICache.get_coder().decode(cached),
+                             client_max_age(ttl, settings.cache.CLIENT_MAX_AGE),
+                             )
+
+    async def _redirect(self,
+                        scope: Scope,
+                        send: Send,
+                        url_id: int,
+                        url: str,
+                        max_age: int,
+                        ) -> None:
+        scope[ROUTE_SCOPE_KEY] = (self.id_route
+                                  if scope['path'].startswith(self.prefix)
+                                  else self.code_route)
+        location = quote(url, safe=_LOCATION_SAFE)
+        if settings.analytics.CLICKS_ENABLED:
+            click_counter.hit(url_id)
+        await send({
+            'type': 'http.response.start',
+            'status': 307,
+            'headers': [
+                (b'location', location.encode('latin-1')),
+                (b'content-length', b'0'),
+                (b'cache-control', cache_control_header(max_age).encode()),
+                (b'x-fastapi-cache', b'HIT'),
+            ],
+        })
+        await send(_REDIRECT_BODY)
@@ -0,0 +1,274 @@
+import asyncio
+from dataclasses import dataclass, asdict
+from time import monotonic
+from typing import Iterable, Sequence
+
+from fastapi_cache import FastAPICache
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import db_connection, settings
+from config.cache import BloomFilter
+from config.database.routing import use_primary
+from .dao import UrlDAO
+
+
+MISSING_NAMESPACE = 'redirect-missing'
+
+
+def missing_cache_key(url_id: int) -> str:
+    """
+    Cache key of marker that short url with `id` does not exist
+    """
+    return f'{FastAPICache.get_prefix()}:{MISSING_NAMESPACE}:{url_id}'
+
+
+@dataclass
+class NegativeLookupStats:
+    """
+    Counters of negative lookups
+    """
+    rejected_by_filter: int = 0
+    rejected_by_cache: int = 0
+    passed: int = 0
+    refreshes: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class NegativeLookups:
+    """
+    Rejects ids of nonexistent short urls without Data Base query.
+
+    Two layers are checked on redirect cache miss:
+
+    - In-process Bloom filter of all existing ids plus `max_id` bound.
+      All ids up to `max_id` are loaded into the filter, so id absent
+      in the filter surely does not exist. Ids above `max_id` trigger
+      loading of newer ids (at most once per `refresh_interval`), so
+      urls created by other workers become visible.
+      Ids are allocated before commit, so an id may be committed after
+      a larger one was loaded (concurrent workers, batches, imports).
+      Missing ids below `max_id` are kept as gaps for `gap_timeout`
+      seconds: they are passed to Data Base and rechecked by refresh.
+    - Short-TTL marker in cache for ids that were looked up in Data Base
+      and not found, it absorbs repeated requests of false positives
+      and deleted urls.
+
+    Until the filter is loaded every id is passed to Data Base.
+
+    ## Example
+    ```python
+    lookups = NegativeLookups(session_factory=db_connection.session)
+    await lookups.start()
+    if not await lookups.might_exist(url_id):
+        raise UrlNotFoundError(...)
+    ```
+    """
+    def __init__(self,
+                 session_factory: async_sessionmaker[AsyncSession],
+                 capacity: int = 1_000_000,
+                 error_rate: float = 0.001,
+                 refresh_interval: float = 1.0,
+                 expire: int = 30,
+                 gap_timeout: float = 30.0,
+                 chunk_size: int = 10_000,
+                 ) -> None:
+        self.session_factory = session_factory
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.expire = expire
+        self.gap_timeout = gap_timeout
+        self.chunk_size = chunk_size
+        self.stats = NegativeLookupStats()
+        self.max_id = 0
+        self._bloom: BloomFilter | None = None
+        self._gaps: dict[int, float] = dict()
+        # Ids created by this process while the filter is loading
+        self._added_while_loading: set[int] = set()
+        self._last_refresh = 0.0
+        self._refreshing: asyncio.Task | None = None
+        self._loading: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def _add_gaps(self, url_id: int, deadline: float) -> None:
+        # Not more than `chunk_size` ids below a jump of the sequence
+        for gap in range(max(self.max_id + 1, url_id - self.chunk_size), url_id):
+            self._gaps[gap] = deadline
+
+    def _is_gap(self, url_id: int) -> bool:
+        return self._gaps.get(url_id, 0.0) > monotonic()
+
+    async def _load_ids(self, bloom: BloomFilter, track_gaps: bool = True) -> None:
+        now = monotonic()
+        deadline = now + self.gap_timeout
+        self._gaps = {url_id: until for url_id, until in self._gaps.items() if until > now}
+        async with self.session_factory() as session:
+            use_primary(session)
+            async for url_id in UrlDAO.stream_field_values(
+                session=session,
+                field='id',
+                after_id=self.max_id,
+                chunk_size=self.chunk_size,
+            ):
+                if track_gaps:
+                    self._add_gaps(url_id, deadline)
+                bloom.add(url_id)
+                self._gaps.pop(url_id, None)
+                self.max_id = url_id
+            if track_gaps and self._gaps:
+                late = await UrlDAO.find_items_by_values(
+                    session=session,
+                    field='id',
+                    values=list(self._gaps),
+                )
+                for url in late:
+                    bloom.add(url.id)
+                    self._gaps.pop(url.id, None)
+        self._last_refresh = monotonic()
+        self.stats.refreshes += 1
+
+    async def load(self) -> None:
+        """
+        Build the filter from all existing ids
+        """
+        bloom = BloomFilter(capacity=self.capacity, error_rate=self.error_rate)
+        self.max_id = 0
+        self._gaps = dict()
+        try:
+            await self._load_ids(bloom, track_gaps=False)
+        except Exception:
+            logger.opt(exception=True).error('Can not load ids of short urls, negative lookups are disabled')
+            return
+        for url_id in self._added_while_loading:
+            bloom.add(url_id)
+        self._added_while_loading.clear()
+        # Rows of transactions still open during loading may fill gaps in the tail
+        deadline = monotonic() + self.gap_timeout
+        self._gaps = {url_id: deadline
+                      for url_id in range(max(1, self.max_id - self.chunk_size), self.max_id + 1)
+                      if url_id not in bloom}
+        if bloom.count > bloom.capacity:
+            logger.warning('Bloom filter holds {} ids over capacity {}', bloom.count, bloom.capacity)
+        self._bloom = bloom
+        logger.info('Bloom filter loaded {} ids up to {}', bloom.count, self.max_id)
+
+    async def start(self) -> None:
+        """
+        Start loading of the filter in background
+        """
+        if self._loading is None:
+            self._loading = asyncio.create_task(self.load())
+
+    async def stop(self) -> None:
+        for task in (self._loading, self._refreshing):
+            if task is not None and not task.done():
+                task.cancel()
+        self._loading = None
+
+    async def _refresh(self) -> None:
+        try:
+            await self._load_ids(self._bloom)
+        except Exception:
+            logger.opt(exception=True).warning('Can not refresh ids of short urls')
+            self._last_refresh = monotonic()
+
+    async def refresh(self) -> None:
+        """
+        Load ids created after `max_id` and recheck gaps, throttled and
+        shared between callers
+        """
+        if self._refreshing is None or self._refreshing.done():
+            if monotonic() - self._last_refresh < self.refresh_interval:
+                return
+            self._refreshing = asyncio.create_task(self._refresh())
+        await asyncio.shield(self._refreshing)
+
+    async def might_exist(self, url_id: int) -> bool:
+        """
+        False if short url with `url_id` surely does not exist
+        """
+        if self._bloom is not None and url_id not in self._bloom:
+            if url_id > self.max_id or self._is_gap(url_id):
+                await self.refresh()
+            if url_id not in self._bloom and (url_id > self.max_id or not self._is_gap(url_id)):
+                self.stats.rejected_by_filter += 1
+                return False
+        try:
+            missing = await FastAPICache.get_backend().get(missing_cache_key(url_id))
+        except Exception:
+            missing = None
+        if missing is not None:
+            self.stats.rejected_by_cache += 1
+            return False
+        self.stats.passed += 1
+        return True
+
+    async def remember_missing(self, url_id: int) -> None:
+        """
+        Cache that short url with `url_id` was not found
+        """
+        try:
+            await FastAPICache.get_backend().set(missing_cache_key(url_id),
+                                                 b'1',
+                                                 expire=self.expire,
+                                                 )
+        except Exception:
+            logger.warning('Can not cache missing url {}', url_id)
+
+    async def added(self, url_id: int) -> None:
+        """
+        Register created short url
+        """
+        self.added_many((url_id,))
+        try:
+            await FastAPICache.get_backend().clear(key=missing_cache_key(url_id))
+        except Exception:
+            logger.warning('Can not clear missing marker of url {}', url_id)
+
+    async def added_batch(self, url_ids: Sequence[int]) -> None:
+        """
+        Register short urls created in batch or imported, clears their
+        missing markers with one request
+        """
+        self.added_many(url_ids)
+        if not url_ids:
+            return
+        try:
+            await FastAPICache.get_backend().clear_many([missing_cache_key(url_id) for url_id in url_ids])
+        except Exception:
+            logger.warning('Can not clear missing markers of {} created urls', len(url_ids))
+
+    def added_many(self, url_ids: Iterable[int]) -> None:
+        """
+        Register short urls created in batch, only in the filter
+        """
+        if self._bloom is None:
+            if self._loading is not None and not self._loading.done():
+                self._added_while_loading.update(url_ids)
+            return
+        for url_id in url_ids:
+            if url_id not in self._bloom:
+                self._bloom.add(url_id)
+            self._gaps.pop(url_id, None)
+
+    async def deleted(self, url_id: int) -> None:
+        """
+        Register deleted short url, filter keeps the id as false positive
+        """
+        await self.remember_missing(url_id)
+
+
+negative_lookups = NegativeLookups(
+    session_factory=db_connection.session,
+    capacity=settings.cache.BLOOM_CAPACITY,
+    error_rate=settings.cache.BLOOM_ERROR_RATE,
+    refresh_interval=settings.cache.BLOOM_REFRESH_INTERVAL,
+    expire=settings.cache.NEGATIVE_EXPIRE,
+    gap_timeout=settings.cache.BLOOM_GAP_TIMEOUT,
+)
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, PositiveInt, Field
+from pydantic import BaseModel, ConfigDict, PositiveInt, Field, computed_field
 
 from config import settings
+from .short_codes import short_codes
 
 
 class UrlSchema(BaseModel):
@@ -9,6 +10,7 @@ class UrlSchema(BaseModel):
     """
     url: str = Field(
         pattern=settings.regex.URL_VALIDATION,
+        max_length=settings.MAX_URL_LENGTH,
         examples=['/employee?age=10&prof="super"'],
         )
 
@@ -17,4 +19,46 @@ class ViewUrlSchema(UrlSchema):
     """
     View Url Schema
     """
+    model_config = ConfigDict(from_attributes=True)
+
+    id: PositiveInt
+
+    @computed_field(examples=['aZ3'])
+    @property
+    def code(self) -> str:
+        return short_codes.encode(self.id)
+
+
+class BatchUrlSchema(BaseModel):
+    """
+    Batch of Urls for shortening
+    """
+    urls: list[UrlSchema] = Field(
+        min_length=1,
+        max_length=settings.batch.MAX_SIZE,
+        )
+
+
+class BatchUrlResultSchema(ViewUrlSchema):
+    """
+    Result of shortening one Url from batch
+    """
+    created: bool
+
+
+class ResolveUrlsSchema(BaseModel):
+    """
+    Ids of short urls for bulk resolve
+    """
+    ids: list[PositiveInt] = Field(
+        min_length=1,
+        max_length=settings.batch.MAX_SIZE,
+        )
+
+
+class ResolvedUrlSchema(BaseModel):
+    """
+    Original url of short url, `null` if not found
+    """
     id: PositiveInt
+    url: str | None
@@ -0,0 +1,85 @@
+from hashlib import sha256
+from random import Random
+from string import ascii_letters, digits
+
+from config import settings
+
+
+BASE62_ALPHABET = digits + ascii_letters
+
+
+class ShortCodeCodec:
+    """
+    Base62 codec of short url `id`.
+
+    With `salt` the alphabet is shuffled and the lower `bits` bits of
+    `id` are mapped by an affine bijection modulo ``2 ** bits``, so
+    consecutive ids give unrelated codes, while every code still decodes
+    straight into primary key without any lookup.
+
+    Encoding emits two characters per step using precomputed pairs,
+    decoding is one dict lookup per character.
+
+    ## Example
+    ```python
+    codec = ShortCodeCodec(salt='secret')
+    code = codec.encode(23)
+    assert codec.decode(code) == 23
+    ```
+    """
+    def __init__(self, salt: str = '', bits: int = 40) -> None:
+        alphabet = list(BASE62_ALPHABET)
+        multiplier, offset = 1, 0
+        if salt:
+            seed = int.from_bytes(sha256(salt.encode()).digest(), 'big')
+            Random(seed).shuffle(alphabet)
+            multiplier = (seed >> 64 | 1) & ((1 << bits) - 1)
+            offset = seed & ((1 << bits) - 1)
+        self.alphabet = ''.join(alphabet)
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._multiplier = multiplier
+        self._inverse = pow(multiplier, -1, 1 << bits)
+        self._offset = offset
+        self._pairs = tuple(first + second
+                            for first in self.alphabet
+                            for second in self.alphabet)
+        self._digits = {char: index for index, char in enumerate(self.alphabet)}
+
+    def encode(self, value: int) -> str:
+        """
+        Short code of non negative `value`
+        """
+        low = value & self._mask
+        value = value - low + ((low * self._multiplier + self._offset) & self._mask)
+        if value < 62:
+            return self.alphabet[value]
+        pairs = self._pairs
+        parts = []
+        while value >= 3844:
+            value, rest = divmod(value, 3844)
+            parts.append(pairs[rest])
+        parts.append(pairs[value] if value >= 62 else self.alphabet[value])
+        return ''.join(reversed(parts))
+
+    def decode(self, code: str) -> int | None:
+        """
+        `id` encoded in `code`, None for malformed code
+        """
+        if not code or (len(code) > 1 and code[0] == self.alphabet[0]):
+            return None
+        table = self._digits
+        value = 0
+        for char in code:
+            digit = table.get(char)
+            if digit is None:
+                return None
+            value = value * 62 + digit
+        low = value & self._mask
+        return value - low + (((low - self._offset) * self._inverse) & self._mask)
+
+
+short_codes = ShortCodeCodec(
+    salt=settings.short_codes.SALT,
+    bits=settings.short_codes.BITS,
+)
@@ -0,0 +1,223 @@
+import asyncio
+from dataclasses import dataclass, asdict
+from time import monotonic
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import db_connection, settings
+from config.cache import UrlTable
+from config.database.routing import use_primary
+from .dao import RedirectServiseDAO
+
+
+@dataclass
+class SnapshotStats:
+    """
+    Counters of redirect snapshot
+    """
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    refreshes: int = 0
+    deletions: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class RedirectSnapshot:
+    """
+    In-process replica of all short urls for redirects without Redis
+    and Data Base.
+
+    Urls are kept in `UrlTable`: one UTF-8 buffer and an array of
+    offsets by `id`. The table is loaded in bulk at startup and then
+    every `refresh_interval` seconds it reads rows with `id` above the
+    largest seen one and new records of the deletion log, all from
+    primary.
+
+    Ids are allocated before commit, so an id may appear after a larger
+    one. Missing ids below the largest seen one are rechecked for
+    `gap_timeout` seconds, after that they are treated as absent.
+
+    Urls created and deleted by this process are applied immediately,
+    changes of other workers are visible after the next refresh.
+
+    ## Example
+    ```python
+    snapshot = RedirectSnapshot(session_factory=db_connection.session)
+    await snapshot.start()
+    url = snapshot.get(23)
+    ```
+    """
+    def __init__(self,
+                 session_factory: async_sessionmaker[AsyncSession],
+                 refresh_interval: float = 1.0,
+                 gap_timeout: float = 30.0,
+                 chunk_size: int = 10_000,
+                 ) -> None:
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.gap_timeout = gap_timeout
+        self.chunk_size = chunk_size
+        self.stats = SnapshotStats()
+        self.last_deletion = 0
+        self._table: UrlTable | None = None
+        self._gaps: dict[int, float] = dict()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._table is not None
+
+    @property
+    def size(self) -> int:
+        return len(self._table) if self._table is not None else 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._table.nbytes() if self._table is not None else 0
+
+    def get(self, url_id: int) -> str | None:
+        """
+        Url by `id`, None if snapshot is not loaded or does not know the url
+        """
+        if self._table is None:
+            return None
+        url = self._table.get(url_id)
+        if url is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return url
+
+    def surely_missing(self, url_id: int) -> bool:
+        """
+        True if short url with `url_id` does not exist as of the last refresh
+        """
+        return (self._table is not None
+                and url_id <= self._table.max_id
+                and url_id not in self._gaps
+                and self._table.get(url_id) is None)
+
+    def _put(self, url_id: int, url: str, deadline: float) -> None:
+        table = self._table
+        # Not more than `chunk_size` ids below a jump of the sequence
+        for gap in range(max(table.max_id + 1, url_id - self.chunk_size), url_id):
+            self._gaps[gap] = deadline
+        self._gaps.pop(url_id, None)
+        table.put(url_id, url.encode())
+
+    def added(self, url_id: int, url: str) -> None:
+        """
+        Register short url created by this process
+        """
+        if self._table is not None:
+            self._put(url_id, url, monotonic() + self.gap_timeout)
+
+    def deleted(self, url_id: int) -> None:
+        """
+        Register short url deleted by this process
+        """
+        if self._table is not None:
+            self._table.delete(url_id)
+            self._gaps.pop(url_id, None)
+
+    async def load(self) -> None:
+        """
+        Build the table from all existing urls
+        """
+        table = UrlTable()
+        async with self.session_factory() as session:
+            # Log position is taken first, deletions during loading are replayed
+            last_deletion = await RedirectServiseDAO.last_deletion(use_primary(session))
+            async for url_id, url in RedirectServiseDAO.stream_id_urls(
+                session=session,
+                chunk_size=self.chunk_size,
+            ):
+                table.append(url_id, url.encode())
+        self._table, self.last_deletion = table, last_deletion
+        # Rows of transactions still open during loading may fill gaps in the tail
+        deadline = monotonic() + self.gap_timeout
+        self._gaps = {url_id: deadline
+                      for url_id in range(max(1, table.max_id - self.chunk_size), table.max_id + 1)
+                      if table.get(url_id) is None}
+        self.stats.loads += 1
+        logger.info('Redirect snapshot loaded {} urls up to {} in {} bytes',
+                    len(table), table.max_id, table.nbytes())
+
+    async def refresh(self) -> None:
+        """
+        Apply urls created and deleted since the previous refresh
+        """
+        now = monotonic()
+        self._gaps = {url_id: deadline for url_id, deadline in self._gaps.items() if deadline > now}
+        async with self.session_factory() as session:
+            use_primary(session)
+            deadline = now + self.gap_timeout
+            async for url_id, url in RedirectServiseDAO.stream_id_urls(
+                session=session,
+                after_id=self._table.max_id,
+                chunk_size=self.chunk_size,
+            ):
+                self._put(url_id, url, deadline)
+            if self._gaps:
+                late = await RedirectServiseDAO.find_items_by_values(
+                    session=session,
+                    field='id',
+                    values=list(self._gaps),
+                )
+                for url in late:
+                    self._put(url.id, url.url, deadline)
+            deletions = await RedirectServiseDAO.find_deletions(
+                session=session,
+                after_id=self.last_deletion,
+                limit=self.chunk_size,
+            )
+        for position, url_id in deletions:
+            self._table.delete(url_id)
+            self._gaps.pop(url_id, None)
+            self.last_deletion = position
+        self.stats.deletions += len(deletions)
+        self.stats.refreshes += 1
+
+    async def _run(self) -> None:
+        while self._table is None:
+            try:
+                await self.load()
+            except Exception:
+                self.stats.errors += 1
+                logger.opt(exception=True).error('Can not load redirect snapshot')
+                await asyncio.sleep(self.refresh_interval)
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                self.stats.errors += 1
+                logger.opt(exception=True).warning('Can not refresh redirect snapshot')
+
+    async def start(self) -> None:
+        """
+        Start loading and refreshing of the snapshot in background
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+redirect_snapshot = RedirectSnapshot(
+    session_factory=db_connection.session,
+    refresh_interval=settings.cache.SNAPSHOT_REFRESH_INTERVAL,
+    gap_timeout=settings.cache.SNAPSHOT_GAP_TIMEOUT,
+)
@@ -1,82 +1,248 @@
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 
-from fastapi import APIRouter, status, Depends, Path
+from fastapi import APIRouter, status, Depends, Path, Query
+from fastapi_cache import FastAPICache
 from fastapi_cache.decorator import cache
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 
 from loguru import logger
 
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from config import db_connection
 from config import settings
+from config.cache import client_cache_control, single_flight, stale_while_revalidate
+from config.models.base import MAX_ID
+from config.models.urls import url_digest
 from api_v1.error_models import CustomErrorModel
-from .schemas import UrlSchema, ViewUrlSchema
-from .dao import RedirectServiseDAO
-from .exceptions import (
-    UrlNotFoundError,
-    UrlAlreadyExistsError,
+from .schemas import (
+    UrlSchema,
+    ViewUrlSchema,
+    BatchUrlSchema,
+    BatchUrlResultSchema,
+    ResolveUrlsSchema,
+    ResolvedUrlSchema,
     )
+from .cache import (
+    LIST_NAMESPACE,
+    REDIRECT_NAMESPACE,
+    flights,
+    revalidator,
+    list_key_builder,
+    redirect_cache_key,
+    redirect_key_builder,
+    )
+from .dao import UrlDAO
+from .exceptions import UrlNotFoundError
 from .common import ErrorCode
+from .clicks import count_clicks
+from .short_codes import short_codes
+from .negative import negative_lookups
+from .snapshot import redirect_snapshot
 
 
 router = APIRouter(
     prefix='/urls',
     tags=['URL'],
 )
+short_router = APIRouter(
+    tags=['URL'],
+)
 
 
 @router.get(path='',
             name='urls:list',
-            description='Getting `list` of short urls.',
+            description=('Getting `page` of short urls ordered by `id`. '
+                         'Pass `id` of the last item as `after_id` '
+                         'to get the next page.'),
             response_model=list[ViewUrlSchema],
             )
-@cache(expire=settings.MAX_CACHE_EXPIRE)
-async def get_list_urls(session: AsyncSession = Depends(db_connection.session_geter)):
-    return await RedirectServiseDAO.find_all_items_by_args(session=session)
+@client_cache_control(max_age=settings.cache.CLIENT_MAX_AGE)
+@single_flight(flights, namespace=LIST_NAMESPACE)
+@stale_while_revalidate(revalidator,
+                        expire=settings.cache.LIST_EXPIRE,
+                        namespace=LIST_NAMESPACE,
+                        key_builder=list_key_builder,
+                        )
+@cache(expire=settings.cache.LIST_EXPIRE,
+       namespace=LIST_NAMESPACE,
+       key_builder=list_key_builder,
+       )
+async def get_list_urls(after_id: Annotated[int | None,
+                                            Query(title='Last id of previous page',
+                                                  ge=0,
+                                                  )] = None,
+                        limit: Annotated[int,
+                                         Query(title='Page size',
+                                               ge=1,
+                                               le=settings.pagination.MAX_LIMIT,
+                                               )] = settings.pagination.DEFAULT_LIMIT,
+                        session: AsyncSession = Depends(db_connection.session_geter),
+                        ):
+    return await UrlDAO.find_page_by_args(
+        session=session,
+        after_id=after_id,
+        limit=limit,
+    )
+
+
+@router.get(path='/stream',
+            name='urls:stream',
+            description='`Stream` all short urls as `NDJSON` ordered by `id`.',
+            response_class=StreamingResponse,
+            responses={
+                status.HTTP_200_OK: {
+                    'content': {'application/x-ndjson': {}},
+                },
+            },
+            )
+async def stream_urls(after_id: Annotated[int | None,
+                                          Query(title='Start after this id',
+                                                ge=0,
+                                                )] = None,
+                      session_factory: async_sessionmaker[AsyncSession] = Depends(
+                          db_connection.get_session_factory,
+                          ),
+                      ):
+    async def ndjson_lines() -> AsyncIterator[str]:
+        chunk_size = settings.pagination.STREAM_CHUNK_SIZE
+        async with session_factory() as session:
+            chunk = []
+            async for url in UrlDAO.stream_items_by_args(
+                session=session,
+                after_id=after_id,
+                chunk_size=chunk_size,
+            ):
+                chunk.append(ViewUrlSchema.model_validate(url).model_dump_json())
+                if len(chunk) >= chunk_size:
+                    yield '\n'.join(chunk) + '\n'
+                    chunk.clear()
+            if chunk:
+                yield '\n'.join(chunk) + '\n'
+
+    return StreamingResponse(ndjson_lines(), media_type='application/x-ndjson')
 
 
 @router.post(path='',
              name='urls:create',
-             description='`Create` new short url.',
+             description=('`Create` new short url. If url already exists '
+                          'returns existing short url with status `200`.'),
              response_model=ViewUrlSchema,
              responses={
-                 status.HTTP_422_UNPROCESSABLE_ENTITY: {
-                     'model': CustomErrorModel,
-                     'content': {
-                         'application/json': {
-                             'examples': {
-                                 ErrorCode.URL_ALREADY_EXISTS_ERROR: {
-                                     'summary': 'Url already exists',
-                                     'value': {
-                                         'status': False,
-                                         'error_code': status.HTTP_422_UNPROCESSABLE_ENTITY,
-                                         'detail': ErrorCode.URL_ALREADY_EXISTS_ERROR,
-                                     }
-                                 }
-                             },
-                         }
-                     }
-                 }
+                 status.HTTP_200_OK: {
+                     'model': ViewUrlSchema,
+                     'description': 'Url already exists',
+                 },
              },
              status_code=status.HTTP_201_CREATED,
              )
 async def create_short_url(short_url: UrlSchema,
+                           response: Response,
                            session: AsyncSession = Depends(db_connection.session_geter)):
-    logger.info(f'POST method get data {short_url}')
+    logger.info('POST method get data {}', short_url)
+    url, created = await UrlDAO.get_or_create_url(
+        session=session,
+        url=short_url.url,
+    )
+    if not created:
+        response.status_code = status.HTTP_200_OK
+        return url
+    await negative_lookups.added(url.id)
+    redirect_snapshot.added(url.id, url.url)
     try:
-        url = await RedirectServiseDAO.add(
-            session=session,
-            url=short_url.url,
+        await FastAPICache.get_backend().set(
+            redirect_cache_key(url.id),
+            FastAPICache.get_coder().encode(url.url),
+            expire=settings.cache.REDIRECT_EXPIRE,
         )
-    except IntegrityError:
-        raise UrlAlreadyExistsError(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                                    detail=ErrorCode.URL_ALREADY_EXISTS_ERROR,
-                                    )
+    except Exception:
+        logger.warning('Can not cache created url {}', url.id)
     return url
 
 
+@router.post(path='/batch',
+             name='urls:batch',
+             description=('`Create` short urls in batch. Each item of result '
+                          'tells whether url was `created` or already existed.'),
+             response_model=list[BatchUrlResultSchema],
+             status_code=status.HTTP_200_OK,
+             )
+async def create_short_urls_batch(batch: BatchUrlSchema,
+                                  session: AsyncSession = Depends(db_connection.session_geter),
+                                  ):
+    urls = list(dict.fromkeys(item.url for item in batch.urls))
+    created = await UrlDAO.add_many(
+        session=session,
+        values=[dict(url=url, url_hash=url_digest(url)) for url in urls],
+        index_elements=('url_hash',),
+    )
+    created_ids = {item.url: item.id for item in created}
+    existing_ids = dict()
+    if len(created_ids) < len(urls):
+        existing = await UrlDAO.find_items_by_values(
+            session=session,
+            field='url_hash',
+            values=[url_digest(url) for url in urls if url not in created_ids],
+        )
+        existing_ids = {item.url: item.id for item in existing}
+    results = list()
+    for item in batch.urls:
+        url_id = created_ids.pop(item.url, None)
+        results.append(dict(
+            id=url_id or existing_ids.get(item.url),
+            url=item.url,
+            created=url_id is not None,
+        ))
+        existing_ids.setdefault(item.url, url_id)
+    await negative_lookups.added_batch([item.id for item in created])
+    for item in created:
+        redirect_snapshot.added(item.id, item.url)
+    return results
+
+
+@router.post(path='/resolve',
+             name='urls:resolve',
+             description=('`Resolve` many short urls to original urls at once. '
+                          '`url` is `null` for unknown `id`.'),
+             response_model=list[ResolvedUrlSchema],
+             status_code=status.HTTP_200_OK,
+             )
+async def resolve_urls(batch: ResolveUrlsSchema,
+                       session: AsyncSession = Depends(db_connection.session_geter),
+                       ):
+    ids = list(dict.fromkeys(batch.ids))
+    backend = FastAPICache.get_backend()
+    coder = FastAPICache.get_coder()
+    try:
+        cached = await backend.get_many([redirect_cache_key(url_id) for url_id in ids])
+    except Exception:
+        logger.warning('Bulk resolve can not read cache, fallback to Data Base')
+        cached = [None] * len(ids)
+    resolved = {url_id: coder.decode(value)
+                for url_id, value
+                in zip(ids, cached)
+                if value is not None}
+    missing = [url_id for url_id in ids if url_id not in resolved]
+    if missing:
+        urls = await UrlDAO.find_items_by_values(
+            session=session,
+            field='id',
+            values=missing,
+        )
+        found = {url.id: url.url for url in urls}
+        resolved.update(found)
+        try:
+            await backend.set_many(
+                {redirect_cache_key(url_id): coder.encode(url)
+                 for url_id, url
+                 in found.items()},
+                expire=settings.cache.REDIRECT_EXPIRE,
+            )
+        except Exception:
+            logger.warning('Bulk resolve can not write cache')
+    return [dict(id=url_id, url=resolved.get(url_id)) for url_id in batch.ids]
+
+
 @router.get(path='/{url_id}',
             name='urls:get',
             description='`Get` and `Redirect Temporary` from short `url`.',
@@ -102,7 +268,21 @@ async def create_short_url(short_url: UrlSchema,
                 },
             response_class=RedirectResponse,
             )
-@cache(expire=settings.MAX_CACHE_EXPIRE)
+@count_clicks
+@client_cache_control(max_age=settings.cache.CLIENT_MAX_AGE)
+@single_flight(flights,
+               namespace=REDIRECT_NAMESPACE,
+               key_builder=redirect_key_builder,
+               )
+@stale_while_revalidate(revalidator,
+                        expire=settings.cache.REDIRECT_EXPIRE,
+                        namespace=REDIRECT_NAMESPACE,
+                        key_builder=redirect_key_builder,
+                        )
+@cache(expire=settings.cache.REDIRECT_EXPIRE,
+       namespace=REDIRECT_NAMESPACE,
+       key_builder=redirect_key_builder,
+       )
 async def get_and_redirect_url(url_id: Annotated[int,
                                                  Path(title='Id short url',
                                                       ge=1,
@@ -110,17 +290,71 @@ async def get_and_redirect_url(url_id: Annotated[int,
                                                       )],
                                session: AsyncSession = Depends(db_connection.session_geter),
                                ):
-    url = await RedirectServiseDAO.find_item_by_args(
+    if redirect_snapshot.ready:
+        url = redirect_snapshot.get(url_id)
+        if url is not None:
+            return url
+        if redirect_snapshot.surely_missing(url_id):
+            raise UrlNotFoundError(status_code=status.HTTP_404_NOT_FOUND,
+                                   detail=ErrorCode.URL_NOT_FOUND_ERROR,
+                                   )
+    if not await negative_lookups.might_exist(url_id):
+        raise UrlNotFoundError(status_code=status.HTTP_404_NOT_FOUND,
+                               detail=ErrorCode.URL_NOT_FOUND_ERROR,
+                               )
+    url = await UrlDAO.find_url(
         session=session,
-        id=url_id,
+        url_id=url_id,
     )
     if not url:
+        await negative_lookups.remember_missing(url_id)
         raise UrlNotFoundError(status_code=status.HTTP_404_NOT_FOUND,
                                detail=ErrorCode.URL_NOT_FOUND_ERROR,
                                )
     return url.url
 
 
+@short_router.get(path='/{code}',
+                  name='urls:short',
+                  description='`Redirect Temporary` from short `code` of url.',
+                  status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+                  responses={
+                      status.HTTP_404_NOT_FOUND: {
+                          'model': CustomErrorModel,
+                          'content': {
+                              'application/json': {
+                                  'examples': {
+                                      ErrorCode.URL_NOT_FOUND_ERROR: {
+                                          'summary': 'Url with this `code` not `contains` in `Data Base`',
+                                          'value': {
+                                              'status': False,
+                                              'error_code': status.HTTP_404_NOT_FOUND,
+                                              'detail': ErrorCode.URL_NOT_FOUND_ERROR,
+                                          }
+                                      }
+                                  }
+                              },
+                          }
+                      }
+                  },
+                  response_class=RedirectResponse,
+                  )
+async def redirect_by_code(code: Annotated[str,
+                                           Path(title='Short code of url',
+                                                pattern=settings.regex.SHORT_CODE,
+                                                max_length=settings.short_codes.MAX_LENGTH,
+                                                examples=['aZ3'],
+                                                )],
+                           session: AsyncSession = Depends(db_connection.session_geter),
+                           ):
+    url_id = short_codes.decode(code)
+    if not url_id or url_id > MAX_ID:
+        raise UrlNotFoundError(status_code=status.HTTP_404_NOT_FOUND,
+                               detail=ErrorCode.URL_NOT_FOUND_ERROR,
+                               )
+    return await get_and_redirect_url(url_id=url_id, session=session)
+
+
 @router.delete(path='/{url_id}',
                name='urls:delete',
                description='`Delete` exists short url by `id`.',
@@ -152,15 +386,17 @@ async def delete_short_url(url_id: Annotated[int,
                                                   )],
                            session: AsyncSession = Depends(db_connection.session_geter),
                            ):
-    url = await RedirectServiseDAO.find_item_by_args(
+    url = await UrlDAO.find_url(
         session=session,
-        id=url_id,
+        url_id=url_id,
     )
     if not url:
         raise UrlNotFoundError(status_code=status.HTTP_404_NOT_FOUND,
                                detail=ErrorCode.URL_NOT_FOUND_ERROR,
                                )
-    return await RedirectServiseDAO.delete(
+    await UrlDAO.delete(
         session=session,
         instance=url,
         )
+    await negative_lookups.deleted(url_id)
+    redirect_snapshot.deleted(url_id)
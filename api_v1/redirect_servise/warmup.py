@@ -0,0 +1,97 @@
+import asyncio
+from time import perf_counter
+
+from fastapi_cache import FastAPICache
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import db_connection, settings
+from .cache import redirect_cache_key
+from .dao import RedirectClickDAO, UrlDAO
+
+
+class CacheWarmer:
+    """
+    Preloads hot redirects into cache before application starts serving.
+
+    Takes `size` most clicked urls, topped up with most recently created
+    ones, fetches them in batches of `batch_size` with one query per
+    batch and writes every batch to cache with one pipeline. Warm-up
+    is cut off after `budget` seconds, whatever was loaded stays cached.
+
+    ## Example
+    ```python
+    warmer = CacheWarmer(session_factory=db_connection.session)
+    await warmer.warm_up()
+    ```
+    """
+    def __init__(self,
+                 session_factory: async_sessionmaker[AsyncSession],
+                 size: int = 10_000,
+                 batch_size: int = 1_000,
+                 budget: float = 10.0,
+                 ) -> None:
+        self.session_factory = session_factory
+        self.size = size
+        self.batch_size = batch_size
+        self.budget = budget
+        self.warmed = 0
+
+    async def _select_ids(self, session: AsyncSession) -> list[int]:
+        ids = list()
+        if settings.analytics.CLICKS_ENABLED:
+            ids = await RedirectClickDAO.find_most_clicked_ids(
+                session=session,
+                limit=self.size,
+            )
+        if len(ids) < self.size:
+            latest = await UrlDAO.find_latest_ids(
+                session=session,
+                limit=self.size,
+            )
+            ids = list(dict.fromkeys([*ids, *latest]))[:self.size]
+        return ids
+
+    async def _warm_up(self) -> None:
+        backend = FastAPICache.get_backend()
+        coder = FastAPICache.get_coder()
+        async with self.session_factory() as session:
+            ids = await self._select_ids(session)
+            for start in range(0, len(ids), self.batch_size):
+                urls = await UrlDAO.find_items_by_values(
+                    session=session,
+                    field='id',
+                    values=ids[start:start + self.batch_size],
+                )
+                await backend.set_many(
+                    {redirect_cache_key(url.id): coder.encode(url.url) for url in urls},
+                    expire=settings.cache.REDIRECT_EXPIRE,
+                )
+                self.warmed += len(urls)
+                logger.info('Cache warm-up: {}/{} redirects', self.warmed, len(ids))
+
+    async def warm_up(self) -> int:
+        """
+        Warm up redirect cache, returns count of cached redirects
+        """
+        self.warmed = 0
+        started = perf_counter()
+        try:
+            await asyncio.wait_for(self._warm_up(), timeout=self.budget)
+        except asyncio.TimeoutError:
+            logger.warning('Cache warm-up stopped by time budget {}s', self.budget)
+        except Exception:
+            logger.opt(exception=True).error('Cache warm-up failed')
+        logger.info('Cache warm-up cached {} redirects in {:.2f}s',
+                    self.warmed,
+                    perf_counter() - started,
+                    )
+        return self.warmed
+
+
+cache_warmer = CacheWarmer(
+    session_factory=db_connection.session,
+    size=settings.cache.WARMUP_SIZE,
+    batch_size=settings.cache.WARMUP_BATCH_SIZE,
+    budget=settings.cache.WARMUP_BUDGET,
+)
@@ -2,6 +2,8 @@ from fastapi import FastAPI
 
 from config import settings
 from api_v1.redirect_servise.views import router as redirect_servise
+from api_v1.redirect_servise.views import short_router as short_urls
+from api_v1.internal_servise.views import router as internal_servise
 
 
 def register_routers(app: FastAPI) -> None:
@@ -39,3 +41,11 @@ def register_routers(app: FastAPI) -> None:
         router=redirect_servise,
         prefix=settings.API_PREFIX,
         )
+    app.include_router(
+        router=internal_servise,
+        prefix=settings.API_PREFIX,
+        )
+    # Короткие ссылки обслуживаются от корня, без префикса API
+    app.include_router(
+        router=short_urls,
+        )
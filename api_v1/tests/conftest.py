@@ -8,8 +8,16 @@ from fastapi import FastAPI
 from sqlalchemy.pool import NullPool
 
 from config import test_connection, settings, db_connection
+from config.database.db_helper import asyncpg_dsn
 from config.models.base import Base
 from main import app
+from api_v1.redirect_servise.cache import revalidator
+from api_v1.redirect_servise.change_feed import change_feed
+from api_v1.redirect_servise.clicks import click_counter
+from api_v1.redirect_servise.dao import MmapRedirectServiseDAO
+from api_v1.redirect_servise.negative import negative_lookups
+from api_v1.redirect_servise.snapshot import redirect_snapshot
+from api_v1.redirect_servise.warmup import cache_warmer
 
 
 db_setup = test_connection(
@@ -24,8 +32,17 @@ async def override_get_async_session():
 
 
 @pytest_asyncio.fixture(scope='session', autouse=True)
-async def test_app() -> AsyncGenerator[LifespanManager, Any]:
+async def test_app(tmp_path_factory: pytest.TempPathFactory) -> AsyncGenerator[LifespanManager, Any]:
     app.dependency_overrides[db_connection.session_geter] = override_get_async_session
+    app.dependency_overrides[db_connection.get_session_factory] = lambda: db_setup.session
+    click_counter.session_factory = db_setup.session
+    negative_lookups.session_factory = db_setup.session
+    redirect_snapshot.session_factory = db_setup.session
+    cache_warmer.session_factory = db_setup.session
+    revalidator.session_factory = db_setup.session
+    change_feed.session_factory = db_setup.session
+    change_feed.dsn = asyncpg_dsn(settings.test_db.url)
+    MmapRedirectServiseDAO.store.path = tmp_path_factory.mktemp('url_store')
 
     async with LifespanManager(app) as manager:
         yield manager.app
@@ -41,6 +58,9 @@ async def client(test_app: FastAPI) -> AsyncGenerator[httpx.AsyncClient, Any]:
             ),
         base_url=current_home + current_api,
     ) as client:
+        if settings.storage.BACKEND == 'mmap':
+            yield client
+            return
         async with db_setup.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         yield client
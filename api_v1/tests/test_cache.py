@@ -0,0 +1,160 @@
+import time
+
+import pytest
+
+from config.cache import TinyLFUCache, BloomFilter, L1RedisBackend
+
+
+def test_l1_cache_get_set():
+    l1 = TinyLFUCache(max_size=100, ttl=30)
+    l1.set('key', b'value')
+    assert l1.get('key') == b'value'
+    assert l1.get('other') is None
+    assert l1.stats.hits == 1
+    assert l1.stats.misses == 1
+
+
+def test_l1_cache_ttl():
+    l1 = TinyLFUCache(max_size=100, ttl=30)
+    l1.set('key', b'value', ttl=0.01)
+    time.sleep(0.02)
+    assert l1.get('key') is None
+    assert l1.stats.expirations == 1
+
+
+def test_l1_cache_bounded():
+    l1 = TinyLFUCache(max_size=100, ttl=30)
+    for key in range(1000):
+        l1.set(key, key)
+    assert len(l1) <= 100
+    assert l1.stats.evictions >= 900
+
+
+def test_l1_cache_keeps_hot_keys():
+    l1 = TinyLFUCache(max_size=100, ttl=30)
+    hot = range(50)
+    for _ in range(10):
+        for key in hot:
+            if l1.get(key) is None:
+                l1.set(key, key)
+    for key in range(1000, 5000):
+        l1.get(key)
+        l1.set(key, key)
+    assert sum(key in l1 for key in hot) >= 45
+
+
+def test_l1_cache_clear_prefix():
+    l1 = TinyLFUCache(max_size=100, ttl=30)
+    l1.set('a:1', 1)
+    l1.set('b:1', 1)
+    assert l1.clear(prefix='a:') == 1
+    assert 'a:1' not in l1
+    assert 'b:1' in l1
+
+
+
+class PipelineRedis:
+    def __init__(self, values: dict[str, bytes], ttls: dict[str, int]) -> None:
+        self.values = values
+        self.ttls = ttls
+        self.executed = 0
+
+    def pipeline(self, transaction=True):
+        return Pipeline(self)
+
+
+class Pipeline:
+    def __init__(self, redis: PipelineRedis) -> None:
+        self.redis = redis
+        self.commands = list()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def mget(self, keys):
+        self.commands.append([self.redis.values.get(key) for key in keys])
+
+    def ttl(self, key):
+        self.commands.append(self.redis.ttls.get(key, -2))
+
+    async def execute(self):
+        self.redis.executed += 1
+        return self.commands
+
+
+@pytest.mark.asyncio
+async def test_l1_get_many_keeps_redis_ttl():
+    redis = PipelineRedis(values={'a': b'1', 'b': b'2'}, ttls={'a': 40, 'b': -1})
+    backend = L1RedisBackend(redis, l1=TinyLFUCache(max_size=100, ttl=60))
+    assert await backend.get_many(['a', 'b', 'c']) == [b'1', b'2', None]
+    assert redis.executed == 1
+    ttl, value = await backend.get_with_ttl('a')
+    assert 39 <= ttl <= 40 and value == b'1'
+    assert await backend.get_with_ttl('b') == (-1, b'2')
+    assert redis.executed == 1
+
+def test_bloom_filter_no_false_negatives():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    for value in range(1, 10_001):
+        bloom.add(value)
+    assert all(value in bloom for value in range(1, 10_001))
+
+
+def test_bloom_filter_error_rate():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    for value in range(1, 10_001):
+        bloom.add(value)
+    false_positives = sum(value in bloom for value in range(20_000, 120_000))
+    assert false_positives < 2_000
+
+
+@pytest.mark.asyncio
+async def test_negative_lookups_pass_ids_committed_late(monkeypatch):
+    from types import SimpleNamespace
+
+    from api_v1.redirect_servise import negative
+
+    committed = {1, 2, 4}
+
+    class Session:
+        info = dict()
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    async def stream_field_values(session, field, after_id, chunk_size):
+        for url_id in sorted(committed):
+            if url_id > after_id:
+                yield url_id
+
+    async def find_items_by_values(session, field, values):
+        return [SimpleNamespace(id=url_id) for url_id in values if url_id in committed]
+
+    async def get(key):
+        return None
+
+    monkeypatch.setattr(negative.UrlDAO, 'stream_field_values', stream_field_values)
+    monkeypatch.setattr(negative.UrlDAO, 'find_items_by_values', find_items_by_values)
+    monkeypatch.setattr(negative.FastAPICache, 'get_backend', lambda: SimpleNamespace(get=get))
+    lookups = negative.NegativeLookups(session_factory=Session, refresh_interval=0)
+    await lookups.load()
+    assert lookups.max_id == 4
+
+    committed.add(6)
+    assert await lookups.might_exist(6)
+    assert await lookups.might_exist(3)
+    committed.update((3, 5))
+    assert await lookups.might_exist(3)
+    assert 3 not in lookups._gaps and 5 not in lookups._gaps
+    committed.add(10)
+    assert await lookups.might_exist(10)
+    lookups._gaps[8] = 0.0
+    assert not await lookups.might_exist(8)
+    assert await lookups.might_exist(9)
+    assert not await lookups.might_exist(11)
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+from api_v1.redirect_servise import change_feed as feed_module
+from api_v1.redirect_servise.change_feed import ChangeFeed
+from api_v1.redirect_servise.dao import RedirectServiseDAO
+from api_v1.redirect_servise.snapshot import RedirectSnapshot
+from config.cache import L1RedisBackend, TinyLFUCache, UrlTable
+from config.dao import base_dao
+
+
+def test_change_feed_evicts_local_cache(monkeypatch):
+    backend = L1RedisBackend(redis=None, l1=TinyLFUCache(max_size=100, ttl=60))
+    snapshot = RedirectSnapshot(session_factory=None)
+    snapshot._table = UrlTable()
+    snapshot.added(7, '/deleted')
+    monkeypatch.setattr(feed_module.FastAPICache, 'get_backend', lambda: backend)
+    monkeypatch.setattr(feed_module, 'redirect_snapshot', snapshot)
+    for key in ('redirect:7', 'redirect:8', 'redirect-missing:9', 'urls-list:version'):
+        backend.l1.set(f'{feed_module.FastAPICache.get_prefix()}:{key}', (b'1', None))
+    feed = ChangeFeed(session_factory=None, dsn='', channel='url_changes')
+
+    feed._on_notify(None, 1, 'url_changes', json.dumps(dict(op='delete', ids=[7])))
+    feed._on_notify(None, 1, 'url_changes', json.dumps(dict(op='insert', ids=[9])))
+    feed._on_notify(None, 1, 'url_changes', 'not json')
+    assert len(backend.l1) == 1
+    assert snapshot.get(7) is None
+    assert (feed.stats.events, feed.stats.evictions, feed.stats.errors) == (3, 3, 1)
+
+
+@pytest.mark.asyncio
+async def test_change_feed_reconnects_with_backoff():
+    feed = ChangeFeed(session_factory=None,
+                      dsn='postgresql://user@127.0.0.1:1/urls',
+                      channel='url_changes',
+                      min_backoff=0.01,
+                      max_backoff=0.02,
+                      )
+    assert all(0.005 <= feed.backoff(attempt) <= 0.02 for attempt in range(10))
+    await feed.start()
+    await asyncio.sleep(0.2)
+    await feed.stop()
+    assert feed.stats.errors >= 2
+    assert not feed.connected and feed.stats.connects == 0
+
+
+@pytest.mark.asyncio
+async def test_notify_changes_splits_payload(monkeypatch):
+    statements = list()
+
+    class RecordingSession:
+        async def execute(self, statement):
+            statements.append(statement.compile().params)
+
+    monkeypatch.setattr(RedirectServiseDAO, 'change_channel', 'url_changes')
+    ids = list(range(base_dao.NOTIFY_CHUNK_SIZE + 1))
+    await RedirectServiseDAO.notify_changes(RecordingSession(), 'delete', ids)
+    channels, payloads = zip(*(params.values() for params in statements))
+    assert set(channels) == {'url_changes'}
+    assert all(len(payload) < 8000 for payload in payloads)
+    assert ([len(json.loads(payload)['ids']) for payload in payloads]
+            == [base_dao.NOTIFY_CHUNK_SIZE, 1])
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from api_v1.redirect_servise import clicks as clicks_module
+from api_v1.redirect_servise.clicks import ClickCounter
+
+
+def unavailable_session():
+    raise ConnectionError('Data Base is unavailable')
+
+
+def test_click_counter_accumulates():
+    counter = ClickCounter(session_factory=unavailable_session, max_pending=2)
+    for url_id in (1, 1, 2, 3):
+        counter.hit(url_id)
+    assert counter._pending[1][0] == 2
+    assert 3 not in counter._pending
+    assert counter.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_click_counter_keeps_clicks_on_failed_flush():
+    counter = ClickCounter(session_factory=unavailable_session)
+    counter.hit(1)
+    await counter.flush()
+    counter.hit(1)
+    assert counter._pending[1][0] == 2
+
+
+def test_click_counter_restore_keeps_latest_access():
+    counter = ClickCounter(session_factory=unavailable_session)
+    counter._pending = {1: [1, 50.0], 2: [1, 300.0]}
+    counter._restore({1: [2, 100.0], 2: [3, 200.0]})
+    assert counter._pending == {1: [3, 100.0], 2: [4, 300.0]}
+
+
+@pytest.mark.asyncio
+async def test_click_counter_flushes_on_stop_during_flush(monkeypatch):
+    flushed = list()
+    writing = asyncio.Event()
+
+    class Session:
+        hang = True
+
+        async def __aenter__(self):
+            if Session.hang:
+                Session.hang = False
+                writing.set()
+                await asyncio.Event().wait()
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    async def add_clicks(session, clicks):
+        flushed.append({url_id: count for url_id, (count, _) in clicks.items()})
+
+    monkeypatch.setattr(clicks_module.RedirectClickDAO, 'add_clicks', add_clicks)
+    counter = ClickCounter(session_factory=Session, flush_interval=0.01)
+    await counter.start()
+    counter.hit(1)
+    counter.hit(2)
+    await writing.wait()
+    counter.hit(1)
+    await counter.stop()
+    assert flushed == [{1: 2, 2: 1}]
+    assert not counter._pending
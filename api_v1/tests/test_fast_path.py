@@ -0,0 +1,66 @@
+import pytest
+from fastapi_cache.coder import JsonCoder
+from starlette.responses import Response
+
+from api_v1.redirect_servise import fast_path
+from api_v1.redirect_servise.fast_path import RedirectFastPathMiddleware
+from api_v1.redirect_servise.short_codes import short_codes
+from config import settings
+from config.cache import cache_control_header, client_cache_control, client_max_age
+from config.models.base import MAX_ID
+
+
+
+def test_fast_path_match():
+    middleware = RedirectFastPathMiddleware(app=None, reserved_paths=('/docs',))
+    assert middleware._match(f'{settings.API_PREFIX}/urls/23') == 23
+    assert middleware._match(f'/{short_codes.encode(23)}') == 23
+    assert middleware._match(f'{settings.API_PREFIX}/urls/0') is None
+    assert middleware._match(f'{settings.API_PREFIX}/urls/23/') is None
+    assert middleware._match(f'{settings.API_PREFIX}/urls/stream') is None
+    assert middleware._match(f'{settings.API_PREFIX}/urls/{MAX_ID + 1}') is None
+    assert middleware._match('/docs') is None
+    assert middleware._match('/some/path') is None
+
+
+def test_client_max_age_is_short_and_not_negative():
+    assert client_max_age(ttl=86_400, max_age=60) == 60
+    assert client_max_age(ttl=10, max_age=60) == 10
+    assert client_max_age(ttl=-1, max_age=60) == 60
+    assert client_max_age(ttl=-2, max_age=-5) == 0
+    assert cache_control_header(60) == 'max-age=60'
+    assert cache_control_header(0) == 'no-store'
+
+
+@pytest.mark.asyncio
+async def test_client_cache_control_overrides_server_expire():
+    @client_cache_control(max_age=0)
+    async def endpoint(url_id: int, response: Response):
+        response.headers['Cache-Control'] = 'max-age=86400'
+        return url_id
+
+    response = Response()
+    assert await endpoint(url_id=1, response=response) == 1
+    assert response.headers['Cache-Control'] == 'no-store'
+
+
+@pytest.mark.asyncio
+async def test_fast_path_sends_client_max_age(monkeypatch):
+    class Backend:
+        async def get_with_ttl(self, key):
+            return -1, b'"/cached"'
+
+    monkeypatch.setattr(fast_path.FastAPICache, 'get_backend', lambda: Backend())
+    monkeypatch.setattr(fast_path.FastAPICache, 'get_coder', lambda: JsonCoder)
+    monkeypatch.setattr(fast_path.settings.analytics, 'CLICKS_ENABLED', False)
+    messages = list()
+
+    async def send(message):
+        messages.append(message)
+
+    middleware = RedirectFastPathMiddleware(app=None)
+    scope = dict(type='http', method='GET', path=f'{settings.API_PREFIX}/urls/{MAX_ID}')
+    await middleware(scope, None, send)
+    headers = dict(messages[0]['headers'])
+    assert headers[b'location'] == b'/cached'
+    assert headers[b'cache-control'] == f'max-age={settings.cache.CLIENT_MAX_AGE}'.encode()
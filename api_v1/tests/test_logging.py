@@ -0,0 +1,40 @@
+import io
+import json
+
+from loguru import logger
+
+from config.setup_logs.sinks import BatchedJsonSink, RateSampler
+
+
+def test_json_sink_writes_batches_without_traceback_below_error():
+    stream = io.StringIO()
+    sink = BatchedJsonSink(stream, batch_size=2, flush_interval=60)
+    handler = logger.add(sink, format='{message}', level='INFO')
+    try:
+        logger.bind(error_code=404).info('Url {} not found', 23)
+        assert stream.getvalue() == ''
+        try:
+            raise LookupError('missing')
+        except LookupError:
+            logger.opt(exception=True).warning('Lookup failed')
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert lines[0]['message'] == 'Url 23 not found'
+        assert lines[0]['error_code'] == 404
+        assert lines[1]['exception'] == {'type': 'LookupError', 'value': 'missing'}
+        try:
+            raise LookupError('broken')
+        except LookupError:
+            logger.exception('Unexpected')
+        error = json.loads(stream.getvalue().splitlines()[2])
+        assert 'LookupError: broken' in error['exception']['traceback']
+    finally:
+        logger.remove(handler)
+
+
+def test_rate_sampler_counts_suppressed():
+    sampler = RateSampler(limit=2, window=60)
+    assert [sampler.allow('404') for _ in range(4)] == [0, 0, None, None]
+    assert sampler.allow('422') == 0
+    sampler._windows['404'][0] -= 60
+    assert sampler.allow('404') == 2
+    assert RateSampler(limit=0).allow('404') == 0
@@ -0,0 +1,82 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from config.cache import BulkRedisBackend
+from config.metrics import MetricsMiddleware, MetricsRegistry, MultiProcessCollector
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests.', labels=('route',))
+    latency = registry.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+    registry.gauge('pool_size', 'Pool size.', lambda: {(): 10})
+    requests.inc('/urls')
+    requests.inc('/urls')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{route="/urls"} 2' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert 'latency_seconds_count 2' in text
+    assert 'pool_size 10' in text
+    assert registry.counter('requests_total', 'Requests.') is requests
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_by_route():
+    registry = MetricsRegistry()
+    app = FastAPI()
+
+    @app.get('/items/{item_id}')
+    async def get_item(item_id: int):
+        return item_id
+
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                 base_url='http://test',
+                                 ) as client:
+        await client.get('/items/1')
+        await client.get('/items/2')
+        await client.get('/missing')
+    requests = registry.counter('http_requests_total', '')
+    assert requests.value('GET', '/items/{item_id}', '200') == 2
+    assert requests.value('GET', 'unmatched', '404') == 1
+    assert registry.histogram('http_request_duration_seconds', '').count('GET', '/items/{item_id}') == 2
+
+
+def test_multiprocess_collector_sums_workers(tmp_path):
+    workers = list()
+    for pid, requests_count in ((101, 2), (102, 3)):
+        registry = MetricsRegistry()
+        registry.counter('requests_total', 'Requests.', labels=('route',)).inc('/urls', amount=requests_count)
+        registry.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0)).observe(0.05)
+        registry.gauge('pool_size', 'Pool size.', lambda: {(): 10})
+        collector = MultiProcessCollector(registry, path=tmp_path)
+        collector.pid = pid
+        workers.append(collector)
+    workers[1].dump(final=True)
+    text = workers[0].render()
+    assert 'requests_total{route="/urls"} 5' in text
+    assert 'latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'latency_seconds_count 2' in text
+    assert 'pool_size{pid="101"} 10' in text
+    assert 'pid="102"' not in text
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_counts_errors():
+    class BrokenRedis:
+        async def mget(self, keys):
+            raise ConnectionError('Redis is unavailable')
+
+        async def incr(self, key):
+            raise ConnectionError('Redis is unavailable')
+
+    backend = BulkRedisBackend(BrokenRedis())
+    for call in (backend.get_many(['key']), backend.incr('key')):
+        with pytest.raises(ConnectionError):
+            await call
+    assert backend.stats() == dict(l1=None, redis=dict(hits=0, misses=0, errors=2))
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from api_v1.redirect_servise.dao import MmapRedirectServiseDAO
+from api_v1.redirect_servise.exceptions import UrlUpdateNotSupportedError
+from config.storage import MmapUrlStore
+
+
+def test_add_get_and_deduplicate(tmp_path):
+    store = MmapUrlStore(tmp_path, sync=False)
+    store.open()
+    assert store.add('/path/one') == (1, True)
+    assert store.add_many(['/path/two', '/path/one', '/path/two']) == [(2, True), (1, False), (2, False)]
+    assert bytes(store.get_bytes(2)) == b'/path/two'
+    assert store.get(3) is None
+    store.close()
+
+
+def test_delete_survives_reopen(tmp_path):
+    store = MmapUrlStore(tmp_path, sync=False)
+    store.open()
+    store.add_many(['/a', '/b', '/c'])
+    assert store.delete(2)
+    assert not store.delete(2)
+    store.close()
+    store.open()
+    assert store.get(2) is None
+    assert list(store.iter_ids()) == [1, 3]
+    assert list(store.iter_ids(reverse=True)) == [3, 1]
+    assert store.add('/b') == (4, True)
+    store.close()
+
+
+def test_recovers_unindexed_records_and_cuts_broken_tail(tmp_path):
+    store = MmapUrlStore(tmp_path, sync=False)
+    store.open()
+    store.add('/a')
+    store.checkpoint()
+    store.add('/b')
+    # Index is lost after checkpoint, the last append is torn
+    os.write(store._data_fd, b'\x01\x03\x00\x00\x00\x10\x00')
+    os.ftruncate(store._index_fd, 0)
+    reopened = MmapUrlStore(tmp_path, sync=False)
+    reopened.open()
+    assert reopened.get(1) == '/a'
+    assert reopened.get(2) == '/b'
+    assert reopened.add('/c') == (3, True)
+    reopened.close()
+
+
+def test_compact_drops_deleted_urls_and_keeps_ids(tmp_path):
+    store = MmapUrlStore(tmp_path, sync=False)
+    store.open()
+    store.add_many([f'/path/{number}' for number in range(10)])
+    for url_id in range(2, 11):
+        store.delete(url_id)
+    result = store.compact()
+    assert result['urls'] == 1
+    assert result['bytes_after'] < result['bytes_before']
+    assert store.get(1) == '/path/0'
+    assert store.add('/path/1') == (11, True)
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_mmap_dao_rejects_update_and_other_indexes(tmp_path, monkeypatch):
+    store = MmapUrlStore(tmp_path, sync=False)
+    store.open()
+    store.add('/a')
+    monkeypatch.setattr(MmapRedirectServiseDAO, 'store', store)
+    url = await MmapRedirectServiseDAO.find_url(session=None, url_id=1)
+    with pytest.raises(UrlUpdateNotSupportedError):
+        await MmapRedirectServiseDAO.update(session=None, instance=url, url='/b')
+    with pytest.raises(ValueError):
+        await MmapRedirectServiseDAO.get_or_create(session=None, index_elements=('url',), url='/b')
+    with pytest.raises(ValueError):
+        await MmapRedirectServiseDAO.add_many(session=None, values=[dict(url='/b')], index_elements=['id'])
+    assert store.get(1) == '/a' and store.get(2) is None
+    store.close()
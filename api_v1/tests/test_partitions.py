@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from api_v1.redirect_servise.dao import CLAIM_URLS, RedirectServiseDAO
+from api_v1.redirect_servise.exceptions import UrlAlreadyExistsError
+from config.models import HashPartitions, RangePartitions, RedirectURL
+from config.models.urls import URL_PARTITIONS
+
+
+def test_hash_partitions_statements():
+    assert HashPartitions('id', modulus=2).statements('urls') == [
+        'CREATE TABLE urls_p0 PARTITION OF urls FOR VALUES WITH (MODULUS 2, REMAINDER 0)',
+        'CREATE TABLE urls_p1 PARTITION OF urls FOR VALUES WITH (MODULUS 2, REMAINDER 1)',
+    ]
+
+
+def test_range_partitions_bounds():
+    partitions = RangePartitions('id', step=10, count=2)
+    assert partitions.clause == 'RANGE (id)'
+    assert partitions.bounds() == [('p0', 'FOR VALUES FROM (0) TO (10)'),
+                                   ('p1', 'FOR VALUES FROM (10) TO (20)'),
+                                   ('default', 'DEFAULT'),
+                                   ]
+
+
+def test_url_table_is_partitioned_by_bigint_identity():
+    table = RedirectURL.__table__
+    ddl = str(CreateTable(table).compile(dialect=postgresql.dialect()))
+    assert 'id BIGINT GENERATED BY DEFAULT AS IDENTITY' in ddl
+    assert 'PARTITION BY HASH (id)' in ddl
+    assert not any(index.unique for index in table.indexes)
+    assert len(table.dispatch.after_create) == URL_PARTITIONS
+
+
+def test_claim_urls_goes_through_digests():
+    sql = str(CLAIM_URLS.compile(dialect=postgresql.dialect()))
+    assert sql.index('INSERT INTO redirectdigests') < sql.index('INSERT INTO redirecturls')
+    assert 'ON CONFLICT (url_hash) DO NOTHING' in sql
+
+
+class Session:
+    def __init__(self) -> None:
+        self.info = dict()
+        self.commits = 0
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_retries_digest_of_deleted_url(monkeypatch):
+    found = [[], [SimpleNamespace(id=7, url='/a')]]
+
+    async def claim_urls(session, urls):
+        return []
+
+    async def find_items_by_values(session, field, values):
+        return found.pop(0) if found else []
+
+    monkeypatch.setattr(RedirectServiseDAO, '_claim_urls', claim_urls)
+    monkeypatch.setattr(RedirectServiseDAO, 'find_items_by_values', find_items_by_values)
+    session = Session()
+    instance, created = await RedirectServiseDAO.get_or_create(session=session, url='/a')
+    assert (instance.id, created, session.commits) == (7, False, 2)
+    with pytest.raises(UrlAlreadyExistsError) as error:
+        await RedirectServiseDAO.get_or_create(session=session, url='/a')
+    assert error.value.status_code == 409
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from config.database.pool import InstrumentedQueuePool
+
+
+class Connection:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_pool_counts_checkouts_and_overflow():
+    pool = InstrumentedQueuePool(Connection, pool_size=2, max_overflow=1)
+    connections = [await greenlet_spawn(pool.connect) for _ in range(3)]
+    stats = pool.stats_dict()
+    assert stats['checked_out'] == 3
+    assert stats['overflow'] == 1
+    assert stats['checkouts'] == 3
+    assert stats['connects'] == 3
+    connections[0].close()
+    connections[0] = await greenlet_spawn(pool.connect)
+    stats = pool.stats_dict()
+    assert stats['checkouts'] == 4
+    assert stats['connects'] == 3
+    for connection in connections:
+        connection.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_counts_timeouts():
+    pool = InstrumentedQueuePool(Connection, pool_size=1, max_overflow=0, timeout=0.01)
+    connection = await greenlet_spawn(pool.connect)
+    with pytest.raises(exc.TimeoutError):
+        await greenlet_spawn(pool.connect)
+    stats = pool.stats_dict()
+    assert stats['timeouts'] == 1
+    assert stats['max_wait_ms'] >= 10
+    connection.close()
@@ -0,0 +1,49 @@
+from sqlalchemy import Select, insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config.database.routing import (
+    REPLICA_READ,
+    ReplicaRouter,
+    RoutingSession,
+    use_primary,
+    )
+from config.models import RedirectURL
+
+
+primary = create_async_engine('postgresql+asyncpg://postgres@primary/db')
+replicas = [create_async_engine(f'postgresql+asyncpg://postgres@replica{index}/db')
+            for index in range(2)]
+
+
+class Session(RoutingSession):
+    router = ReplicaRouter(replicas)
+
+
+def test_replica_router_round_robin():
+    router = ReplicaRouter(replicas)
+    hosts = [router.choose().url.host for _ in range(4)]
+    assert hosts == ['replica0', 'replica1', 'replica0', 'replica1']
+
+
+def test_routing_session_reads_from_replica():
+    session = Session(bind=primary.sync_engine)
+    select = Select(RedirectURL)
+    assert session.get_bind(clause=select) is primary.sync_engine
+    replica = session.get_bind(clause=select, **REPLICA_READ)
+    assert replica.url.host.startswith('replica')
+    assert session.get_bind(clause=select, **REPLICA_READ) is replica
+
+
+def test_routing_session_reads_own_writes_from_primary():
+    session = Session(bind=primary.sync_engine)
+    assert session.get_bind(clause=insert(RedirectURL)) is primary.sync_engine
+    assert session.get_bind(clause=Select(RedirectURL), **REPLICA_READ) is primary.sync_engine
+
+    session = Session(bind=primary.sync_engine)
+    use_primary(session)
+    assert session.get_bind(clause=Select(RedirectURL), **REPLICA_READ) is primary.sync_engine
+
+
+def test_routing_session_without_replicas():
+    session = RoutingSession(bind=primary.sync_engine)
+    assert session.get_bind(clause=Select(RedirectURL), **REPLICA_READ) is primary.sync_engine
@@ -0,0 +1,27 @@
+import os
+
+import server
+from config import settings
+
+
+def test_worker_count_defaults_to_cpu_count():
+    assert server.worker_count(0) == (os.cpu_count() or 1)
+    assert server.worker_count(3) == 3
+
+
+def test_server_options_from_settings():
+    options = server.server_options()
+    assert options['port'] == settings.server.PORT
+    assert options['backlog'] == settings.server.BACKLOG
+    assert options['timeout_graceful_shutdown'] == settings.server.GRACEFUL_TIMEOUT
+    assert options['limit_concurrency'] is None
+
+
+def test_prepare_metrics_directory_for_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings.metrics, 'MULTIPROCESS_DIR', str(tmp_path))
+    monkeypatch.delenv('METRICS_MULTIPROCESS_DIR', raising=False)
+    (tmp_path / '1.json').write_text('{}')
+    assert server.prepare_metrics(1) is None
+    assert server.prepare_metrics(4) == tmp_path
+    assert not list(tmp_path.iterdir())
+    assert os.environ['METRICS_MULTIPROCESS_DIR'] == str(tmp_path)
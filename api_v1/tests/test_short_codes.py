@@ -0,0 +1,29 @@
+from random import randrange
+
+from api_v1.redirect_servise.short_codes import ShortCodeCodec
+
+
+def test_short_codes_roundtrip():
+    for codec in (ShortCodeCodec(), ShortCodeCodec(salt='secret')):
+        for url_id in (*range(1, 5000), *(randrange(2 ** 62) for _ in range(5000))):
+            assert codec.decode(codec.encode(url_id)) == url_id
+
+
+def test_short_codes_plain_base62():
+    codec = ShortCodeCodec()
+    assert codec.encode(61) == 'Z'
+    assert codec.encode(62) == '10'
+    assert codec.encode(3844) == '100'
+
+
+def test_short_codes_salted_not_sequential():
+    codec = ShortCodeCodec(salt='secret')
+    assert codec.encode(1) != ShortCodeCodec(salt='other').encode(1)
+    assert len({codec.encode(url_id)[-1] for url_id in range(1, 20)}) > 10
+
+
+def test_short_codes_malformed():
+    codec = ShortCodeCodec()
+    assert codec.decode('') is None
+    assert codec.decode('ab-c') is None
+    assert codec.decode('0a') is None
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+from sqlalchemy.pool import NullPool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config.cache import SingleFlight, single_flight
+from config.database.db_helper import DataBaseHelper
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 'https://example.com'
+
+    results = await asyncio.gather(*(flights.do('key', load) for _ in range(10)))
+    assert results == ['https://example.com'] * 10
+    assert calls == 1
+    assert flights.stats.leaders == 1
+    assert flights.stats.coalesced == 9
+    assert not flights._inflight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_and_forgets_key():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise LookupError('missing')
+
+    results = await asyncio.gather(*(flights.do('key', fail) for _ in range(3)),
+                                   return_exceptions=True,
+                                   )
+    assert all(isinstance(result, LookupError) for result in results)
+    assert flights.stats.leaders == 1
+    assert flights.stats.coalesced == 2
+
+    async def load():
+        return 'https://example.com'
+
+    assert await flights.do('key', load) == 'https://example.com'
+    assert flights.stats.leaders == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_decorator_keys_by_arguments():
+    flights = SingleFlight()
+    calls = []
+
+    @single_flight(flights, namespace='test')
+    async def endpoint(url_id: int):
+        calls.append(url_id)
+        await asyncio.sleep(0.01)
+        return url_id
+
+    results = await asyncio.gather(endpoint(url_id=1),
+                                   endpoint(url_id=1),
+                                   endpoint(url_id=2),
+                                   )
+    assert results == [1, 1, 2]
+    assert sorted(calls) == [1, 2]
+    assert flights.stats.coalesced == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_keeps_scoped_session_of_request():
+    helper = DataBaseHelper('postgresql+asyncpg://user@127.0.0.1:1/urls', poolclass=NullPool)
+    flights = SingleFlight()
+    registries = []
+
+    @single_flight(flights, namespace='test')
+    async def endpoint(url_id: int, session):
+        session.registry()
+        await asyncio.sleep(0.01)
+        return url_id
+
+    async def request():
+        sessions = helper.session_geter()
+        session = await anext(sessions)
+        registries.append(session.registry.registry)
+        try:
+            return await endpoint(url_id=1, session=session)
+        finally:
+            await anext(sessions, None)
+
+    assert await asyncio.gather(request(), request()) == [1, 1]
+    assert flights.stats.coalesced == 1
+    assert not any(registries)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_follower_takes_over_cancelled_leader():
+    flights = SingleFlight()
+    started = asyncio.Event()
+
+    async def load():
+        started.set()
+        await asyncio.sleep(0.05)
+        return 'https://example.com'
+
+    leader = asyncio.ensure_future(flights.do('key', load))
+    await started.wait()
+    follower = asyncio.ensure_future(flights.do('key', load))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == 'https://example.com'
+    assert leader.cancelled()
+    assert flights.stats.leaders == 2
+    assert not flights._inflight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_does_not_share_not_modified():
+    flights = SingleFlight()
+    calls = 0
+
+    @single_flight(flights, key_builder=lambda *args, **kwargs: 'key')
+    async def endpoint(request: Request, response: Response):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        response.headers['ETag'] = 'W/1'
+        if request.headers.get('if-none-match') == 'W/1':
+            response.status_code = 304
+            return response
+        return '/path'
+
+    def request(*headers: tuple[bytes, bytes]) -> Request:
+        return Request(dict(type='http', method='GET', path='/', headers=list(headers)))
+
+    responses = [Response(), Response(), Response()]
+    results = await asyncio.gather(
+        endpoint(request=request((b'if-none-match', b'W/1')), response=responses[0]),
+        endpoint(request=request(), response=responses[1]),
+        endpoint(request=request(), response=responses[2]),
+    )
+    assert results[0] is responses[0] and results[0].status_code == 304
+    assert results[1:] == ['/path', '/path']
+    assert [response.headers.get('etag') for response in responses] == ['W/1'] * 3
+    assert calls == 2
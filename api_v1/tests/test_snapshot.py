@@ -0,0 +1,75 @@
+import pytest
+
+from api_v1.redirect_servise.fast_path import RedirectFastPathMiddleware
+from api_v1.redirect_servise.snapshot import RedirectSnapshot
+from config import settings
+from config.cache import UrlTable
+
+
+def test_url_table_appends_late_and_deleted_urls():
+    table = UrlTable()
+    table.extend([(1, b'/a'), (4, b'/d')])
+    assert (table.max_id, len(table)) == (4, 2)
+    assert table.get(2) is None
+    table.put(2, '/б'.encode())
+    table.delete(4)
+    assert [table.get(url_id) for url_id in range(6)] == [None, '/a', '/б', None, None, None]
+    assert len(table) == 2
+    assert table.nbytes() == len('/a/d') + len('/б'.encode()) + 8 * 6
+
+
+def test_url_table_keeps_far_ids_out_of_index():
+    table = UrlTable(max_gap=10)
+    table.extend([(1, b'/a'), (2 ** 63 - 1, b'/far'), (3, b'/c'), (2 ** 63 - 2, b'/near')])
+    assert (table.max_id, len(table)) == (2 ** 63 - 1, 4)
+    assert [table.get(url_id) for url_id in (1, 2, 3, 2 ** 63 - 2, 2 ** 63 - 1)] == [
+        '/a', None, '/c', '/near', '/far']
+    table.delete(2 ** 63 - 1)
+    assert table.get(2 ** 63 - 1) is None and len(table) == 3
+    assert table.nbytes() == len('/a/c/near/far') + 8 * 5
+
+
+def test_snapshot_bounds_gaps_below_far_id():
+    snapshot = RedirectSnapshot(session_factory=None, chunk_size=100)
+    snapshot._table = UrlTable()
+    snapshot.added(1, '/a')
+    snapshot.added(2 ** 62, '/far')
+    assert len(snapshot._gaps) == 100
+    assert snapshot.get(2 ** 62) == '/far'
+    assert not snapshot.surely_missing(2 ** 62 - 1)
+    assert snapshot._table.nbytes() < 1_000
+
+
+def test_snapshot_tracks_gaps_of_not_committed_ids():
+    snapshot = RedirectSnapshot(session_factory=None, gap_timeout=30)
+    assert not snapshot.ready and snapshot.get(1) is None
+    snapshot._table = UrlTable()
+    snapshot.added(1, '/a')
+    snapshot.added(3, '/c')
+    assert snapshot.get(3) == '/c'
+    assert not snapshot.surely_missing(2)
+    assert not snapshot.surely_missing(4)
+    snapshot.added(2, '/b')
+    snapshot.deleted(3)
+    assert snapshot.get(2) == '/b'
+    assert snapshot.surely_missing(3)
+
+
+@pytest.mark.asyncio
+async def test_fast_path_serves_snapshot(monkeypatch):
+    from api_v1.redirect_servise import fast_path
+
+    snapshot = RedirectSnapshot(session_factory=None)
+    snapshot._table = UrlTable()
+    snapshot.added(23, '/path with space')
+    monkeypatch.setattr(fast_path, 'redirect_snapshot', snapshot)
+    messages = list()
+
+    async def send(message):
+        messages.append(message)
+
+    middleware = RedirectFastPathMiddleware(app=None)
+    scope = dict(type='http', method='GET', path=f'{settings.API_PREFIX}/urls/23')
+    await middleware(scope, None, send)
+    assert messages[0]['status'] == 307
+    assert (b'location', b'/path%20with%20space') in messages[0]['headers']
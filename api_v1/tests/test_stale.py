@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+from fastapi_cache import FastAPICache
+from fastapi_cache.coder import JsonCoder
+from fastapi_cache.decorator import cache
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import NullPool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config.cache import StaleWhileRevalidate, stale_while_revalidate
+from config.database.db_helper import DataBaseHelper
+
+
+def unavailable_session():
+    raise ConnectionError('Data Base is unavailable')
+
+
+def test_stale_entry_is_due():
+    revalidator = StaleWhileRevalidate(session_factory=unavailable_session, stale=60, beta=0)
+    assert revalidator.is_due('redirect', ttl=30, expire=3600)
+    assert revalidator.is_stale(ttl=30, expire=3600)
+    assert not revalidator.is_due('redirect', ttl=3000, expire=3600)
+    assert not revalidator.is_due('redirect', ttl=-1, expire=3600)
+    assert revalidator.is_due('redirect', ttl=50, expire=100)
+
+
+def test_early_refresh_depends_on_recompute_time():
+    revalidator = StaleWhileRevalidate(session_factory=unavailable_session, stale=60, beta=1.0)
+    assert not revalidator.is_due('redirect', ttl=61, expire=3600)
+    revalidator.record_delta('redirect', 10.0)
+    due = sum(revalidator.is_due('redirect', ttl=61, expire=3600) for _ in range(1000))
+    assert 0 < due < 1000
+    assert not any(revalidator.is_due('other', ttl=61, expire=3600) for _ in range(100))
+
+
+@pytest.mark.asyncio
+async def test_refresh_is_scheduled_once_per_key():
+    revalidator = StaleWhileRevalidate(session_factory=unavailable_session)
+
+    async def load():
+        return 'https://example.com'
+
+    revalidator.schedule('key', 'redirect', load, (), {}, expire=3600)
+    revalidator.schedule('key', 'redirect', load, (), {}, expire=3600)
+    assert len(revalidator._refreshing) == 1
+    await asyncio.gather(*revalidator._refreshing.values())
+    assert revalidator.stats.failures == 1
+    assert not revalidator._refreshing
+
+
+@pytest.mark.asyncio
+async def test_refresh_replaces_scoped_session_of_request(monkeypatch):
+    helper = DataBaseHelper('postgresql+asyncpg://user@127.0.0.1:1/urls', poolclass=NullPool)
+    revalidator = StaleWhileRevalidate(session_factory=helper.session, stale=60, beta=0)
+    written = dict()
+    sessions = list()
+
+    class StaleBackend:
+        async def get_with_ttl(self, key):
+            return 30, b'"https://example.com"'
+
+        async def set(self, key, value, expire=None):
+            written[key] = value
+
+    monkeypatch.setattr(FastAPICache, 'get_backend', lambda: StaleBackend())
+    monkeypatch.setattr(FastAPICache, 'get_coder', lambda: JsonCoder)
+    monkeypatch.setattr(FastAPICache, 'get_prefix', lambda: 'test')
+
+    @stale_while_revalidate(revalidator, expire=3600, namespace='redirect')
+    async def endpoint(url_id: int, session: AsyncSession):
+        sessions.append(session)
+        return 'https://example.org'
+
+    session_geter = helper.session_geter()
+    request_session = await anext(session_geter)
+    await endpoint(url_id=1, session=request_session)
+    await anext(session_geter, None)
+    await asyncio.gather(*revalidator._refreshing.values())
+
+    assert revalidator.stats.refreshes == 1
+    assert list(written.values()) == [b'"https://example.org"']
+    refresh_call, = sessions
+    assert refresh_call is not request_session
+    assert type(refresh_call) is AsyncSession
+    assert not request_session.registry.registry
+
+
+@pytest.mark.asyncio
+async def test_cached_request_reads_backend_once(monkeypatch):
+    revalidator = StaleWhileRevalidate(session_factory=unavailable_session, stale=60, beta=0)
+    reads = list()
+    values = dict()
+    calls = 0
+
+    class CountingBackend:
+        async def get_with_ttl(self, key):
+            reads.append(key)
+            return (3000, values[key]) if key in values else (0, None)
+
+        async def set(self, key, value, expire=None):
+            values[key] = value
+
+    monkeypatch.setattr(FastAPICache, '_backend', CountingBackend())
+    monkeypatch.setattr(FastAPICache, '_coder', JsonCoder)
+    monkeypatch.setattr(FastAPICache, '_prefix', 'test')
+    monkeypatch.setattr(FastAPICache, '_expire', 3600)
+    monkeypatch.setattr(FastAPICache, '_key_builder', lambda *args, **kwargs: 'unused')
+    monkeypatch.setattr(FastAPICache, '_init', True)
+
+    def key_builder(func, namespace='', *, request=None, response=None, args, kwargs):
+        return f'{namespace}:{kwargs["url_id"]}'
+
+    @stale_while_revalidate(revalidator, expire=3600, namespace='redirect', key_builder=key_builder)
+    @cache(expire=3600, namespace='redirect', key_builder=key_builder)
+    async def endpoint(url_id: int):
+        nonlocal calls
+        calls += 1
+        return 'https://example.org'
+
+    def call(*headers: tuple[bytes, bytes]):
+        request = Request(dict(type='http', method='GET', path='/', headers=list(headers)))
+        response = Response()
+        return endpoint(url_id=1,
+                        __fastapi_cache_request=request,
+                        __fastapi_cache_response=response,
+                        ), response
+
+    result, response = call()
+    assert (await result, response.headers['x-fastapi-cache']) == ('https://example.org', 'MISS')
+    result, response = call()
+    assert (await result, response.headers['x-fastapi-cache']) == ('https://example.org', 'HIT')
+    assert (calls, reads) == (1, ['test:redirect:1'] * 2)
+    etag = response.headers['etag']
+    result, response = call((b'if-none-match', etag.encode()))
+    assert (await result).status_code == 304
+    assert len(reads) == 3
@@ -0,0 +1,18 @@
+from config.dao.base_dao import cached_options_statment
+from config.models import RedirectURL
+
+
+def test_statement_is_reused_with_params():
+    stmt, params = cached_options_statment(model=RedirectURL, id=23)
+    other, other_params = cached_options_statment(model=RedirectURL, id=42)
+    assert stmt is other
+    assert params == {'id': 23}
+    assert other_params == {'id': 42}
+    assert 'redirecturls.id = :id' in str(stmt)
+
+
+def test_statement_compares_none_with_is_null():
+    stmt, params = cached_options_statment(model=RedirectURL, id=23, url=None)
+    assert stmt is not cached_options_statment(model=RedirectURL, id=23)[0]
+    assert params == {'id': 23}
+    assert 'redirecturls.url IS NULL' in str(stmt)
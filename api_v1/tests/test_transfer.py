@@ -0,0 +1,153 @@
+import asyncio
+import io
+import json
+from pathlib import Path
+
+import asyncpg
+import pytest
+from httpx import AsyncClient
+
+from config import settings
+from config.alembic.transfer import (
+    detect_format,
+    export_urls,
+    import_urls,
+    read_rows,
+    rows_writer,
+    valid_url,
+    )
+from config.database.db_helper import asyncpg_dsn
+
+
+def test_asyncpg_dsn_drops_driver():
+    assert (asyncpg_dsn('postgresql+asyncpg://user:secret@db:5432/urls')
+            == 'postgresql://user:secret@db:5432/urls')
+
+
+def test_detect_format():
+    assert detect_format(Path('urls.jsonl')) == 'ndjson'
+    assert detect_format(Path('urls.txt')) == 'csv'
+    with pytest.raises(ValueError):
+        detect_format(Path('urls.csv'), 'xml')
+
+
+def test_read_csv_with_and_without_header():
+    with_header = io.StringIO('url,id\n/a,7\n/b,x\n\n/c\n')
+    assert list(read_rows(with_header, 'csv')) == [(7, '/a'), (None, '/b'), (None, '/c')]
+    assert list(read_rows(io.StringIO('/a\n/b\n'), 'csv')) == [(None, '/a'), (None, '/b')]
+
+
+def test_read_ndjson_marks_broken_lines_invalid():
+    rows = list(read_rows(io.StringIO('{"id": 3, "url": "/a"}\n{broken\n\n{"url": 1}\n'), 'ndjson'))
+    assert rows == [(3, '/a'), (None, ''), (None, '')]
+    assert [valid_url(url) for _, url in rows] == [True, False, False]
+    assert not valid_url('/path@§ds')
+
+
+@pytest.mark.parametrize('format', ('csv', 'ndjson'))
+def test_exported_rows_read_back(format: str):
+    file = io.StringIO(newline='')
+    rows = [(1, '/a'), (2, '/b?q="1",2')]
+    rows_writer(file, format)(rows)
+    file.seek(0)
+    assert list(read_rows(file, format)) == rows
+
+
+postgres_only = pytest.mark.skipif(settings.storage.BACKEND != 'postgres',
+                                   reason='bulk import works with Postgres only',
+                                   )
+
+
+async def next_id(connection: asyncpg.Connection) -> int:
+    return await connection.fetchval("SELECT nextval(pg_get_serial_sequence('redirecturls', 'id'))")
+
+
+@postgres_only
+@pytest.mark.asyncio
+async def test_import_skips_duplicates(client: AsyncClient, tmp_path: Path):
+    path = tmp_path / 'urls.csv'
+    path.write_text('url\n/import/one\n/import/two\n/import/one\n/path@§ds\n', encoding='utf-8')
+    connection = await asyncpg.connect(asyncpg_dsn(settings.test_db.url))
+    try:
+        events = list()
+        await connection.add_listener('url_import_test',
+                                      lambda *args: events.append(json.loads(args[-1])),
+                                      )
+        chunks = list()
+
+        async def after_chunk(ids: list[int]) -> None:
+            chunks.append(ids)
+
+        stats = await import_urls(connection,
+                                  path=path,
+                                  chunk_size=2,
+                                  notify_channel='url_import_test',
+                                  after_chunk=after_chunk,
+                                  )
+        assert (stats.read, stats.written, stats.duplicates, stats.invalid) == (4, 2, 1, 1)
+        await asyncio.sleep(0.1)
+        ids = [url_id for chunk in chunks for url_id in chunk]
+        assert events == [dict(op='insert', ids=chunk) for chunk in chunks]
+        rows = await connection.fetch('SELECT url FROM redirecturls WHERE id = any($1::bigint[])', ids)
+        assert sorted(row['url'] for row in rows) == ['/import/one', '/import/two']
+
+        stats = await import_urls(connection, path=path)
+        assert (stats.written, stats.duplicates, stats.invalid) == (0, 3, 1)
+    finally:
+        await connection.close()
+
+
+@postgres_only
+@pytest.mark.asyncio
+async def test_import_keeps_ids_and_moves_sequence(client: AsyncClient, tmp_path: Path):
+    path = tmp_path / 'urls.ndjson'
+    path.write_text('{"id": 700001, "url": "/import/kept"}\n'
+                    '{"id": 700002, "url": "/import/kept-too"}\n'
+                    '{"url": "/import/without-id"}\n',
+                    encoding='utf-8',
+                    )
+    connection = await asyncpg.connect(asyncpg_dsn(settings.test_db.url))
+    try:
+        stats = await import_urls(connection, path=path, keep_ids=True)
+        assert (stats.written, stats.duplicates, stats.invalid) == (2, 0, 1)
+        assert await connection.fetchval('SELECT url FROM redirecturls WHERE id = 700001') == '/import/kept'
+        assert await next_id(connection) == 700003
+        stats = await import_urls(connection, path=path, keep_ids=True)
+        assert (stats.written, stats.duplicates) == (0, 2)
+    finally:
+        await connection.close()
+    response = await client.post(
+        'urls',
+        json=dict(url='/import/after'),
+    )
+    assert response.json()['id'] > 700003
+
+
+@postgres_only
+@pytest.mark.asyncio
+async def test_import_does_not_move_sequence_back(client: AsyncClient, tmp_path: Path):
+    path = tmp_path / 'urls.csv'
+    path.write_text('id,url\n800001,/import/below\n', encoding='utf-8')
+    connection = await asyncpg.connect(asyncpg_dsn(settings.test_db.url))
+    try:
+        await connection.execute("SELECT setval(pg_get_serial_sequence('redirecturls', 'id'), 900000)")
+        stats = await import_urls(connection, path=path, keep_ids=True)
+        assert stats.written == 1
+        assert await next_id(connection) > 900000
+    finally:
+        await connection.close()
+
+
+@postgres_only
+@pytest.mark.asyncio
+async def test_export_reads_back(client: AsyncClient, tmp_path: Path):
+    path = tmp_path / 'urls.ndjson'
+    connection = await asyncpg.connect(asyncpg_dsn(settings.test_db.url))
+    try:
+        stats = await export_urls(connection, path=path, chunk_size=2)
+        rows = [tuple(row) for row in await connection.fetch('SELECT id, url FROM redirecturls ORDER BY id')]
+    finally:
+        await connection.close()
+    with path.open(encoding='utf-8') as file:
+        assert list(read_rows(file, 'ndjson')) == rows
+    assert stats.written == len(rows) > 0
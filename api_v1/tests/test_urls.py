@@ -1,7 +1,11 @@
+import json
+
 import pytest
 
 from httpx import AsyncClient
 
+from config import settings
+
 
 @pytest.mark.asyncio
 async def test_create_short_url(client: AsyncClient, url_data):
@@ -19,7 +23,25 @@ async def test_create_unique_short_url(client: AsyncClient, url_data):
         'urls',
         json=url_data,
     )
-    assert response.status_code == 422
+    assert response.status_code == 200
+    assert response.json()['url'] == '/path/some/path'
+
+
+@pytest.mark.asyncio
+async def test_create_long_short_url(client: AsyncClient):
+    long_url = '/long' * 1000
+    response = await client.post(
+        'urls',
+        json=dict(url=long_url),
+    )
+    assert response.status_code == 201
+    created_id = response.json()['id']
+    response = await client.post(
+        'urls',
+        json=dict(url=long_url),
+    )
+    assert response.status_code == 200
+    assert response.json()['id'] == created_id
 
 
 @pytest.mark.asyncio
@@ -62,3 +84,128 @@ async def test_delete_url(client: AsyncClient):
         f'urls/{id_path}',
         )
     assert response.status_code == 204
+    response = await client.get(
+        f'urls/{id_path}',
+        )
+    assert response.status_code == 404
+    response = await client.get(
+        'urls',
+        )
+    assert id_path not in [item['id'] for item in response.json()]
+
+
+@pytest.mark.asyncio
+async def test_list_urls_pagination(client: AsyncClient):
+    for path in ('/page/one', '/page/two', '/page/three'):
+        await client.post('urls', json=dict(url=path))
+    response = await client.get('urls', params=dict(limit=2))
+    first_page = response.json()
+    assert response.status_code == 200
+    assert len(first_page) == 2
+    response = await client.get(
+        'urls',
+        params=dict(after_id=first_page[-1]['id'], limit=2),
+        )
+    next_page = response.json()
+    assert next_page
+    assert next_page[0]['id'] > first_page[-1]['id']
+
+
+@pytest.mark.asyncio
+async def test_stream_urls(client: AsyncClient):
+    response = await client.get('urls/stream')
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    ids = [line['id'] for line in lines]
+    assert ids == sorted(ids)
+
+
+@pytest.mark.asyncio
+async def test_create_short_urls_batch(client: AsyncClient):
+    batch = [dict(url='/batch/one'), dict(url='/batch/two'), dict(url='/batch/one')]
+    response = await client.post(
+        'urls/batch',
+        json=dict(urls=batch),
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [item['created'] for item in results] == [True, True, False]
+    assert results[0]['id'] == results[2]['id']
+    response = await client.post(
+        'urls/batch',
+        json=dict(urls=[dict(url='/batch/two')]),
+    )
+    assert response.json()[0]['created'] is False
+    assert response.json()[0]['id'] == results[1]['id']
+
+
+class MarkerBackend:
+    def __init__(self) -> None:
+        self.values = dict()
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, expire=None):
+        self.values[key] = value
+
+    async def clear_many(self, keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+
+@pytest.mark.asyncio
+async def test_batch_clears_missing_marker(client: AsyncClient, monkeypatch):
+    from fastapi_cache import FastAPICache
+
+    from api_v1.redirect_servise.negative import missing_cache_key, negative_lookups
+
+    backend = MarkerBackend()
+    monkeypatch.setattr(FastAPICache, 'get_backend', lambda: backend)
+    response = await client.post(
+        'urls/batch',
+        json=dict(urls=[dict(url='/batch/marker/one')]),
+    )
+    next_id = response.json()[0]['id'] + 1
+    await negative_lookups.remember_missing(next_id)
+    assert not await negative_lookups.might_exist(next_id)
+    response = await client.post(
+        'urls/batch',
+        json=dict(urls=[dict(url='/batch/marker/two')]),
+    )
+    assert response.json()[0]['id'] == next_id
+    assert missing_cache_key(next_id) not in backend.values
+    assert await negative_lookups.might_exist(next_id)
+
+
+@pytest.mark.asyncio
+async def test_resolve_urls(client: AsyncClient):
+    response = await client.post(
+        'urls/batch',
+        json=dict(urls=[dict(url='/resolve/one'), dict(url='/resolve/two')]),
+    )
+    ids = [item['id'] for item in response.json()]
+    for _ in range(2):
+        response = await client.post(
+            'urls/resolve',
+            json=dict(ids=[*ids, 999_999]),
+        )
+        assert response.status_code == 200
+        assert response.json() == [
+            dict(id=ids[0], url='/resolve/one'),
+            dict(id=ids[1], url='/resolve/two'),
+            dict(id=999_999, url=None),
+        ]
+
+
+@pytest.mark.asyncio
+async def test_redirect_by_code(client: AsyncClient):
+    response = await client.post(
+        'urls',
+        json=dict(url='/code/path'),
+    )
+    code = response.json()['code']
+    response = await client.get(
+        f'{settings.CURRENT_ORIGIN}/{code}',
+        )
+    assert response.status_code == 307
+    assert response.headers['location'] == '/code/path'
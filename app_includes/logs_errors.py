@@ -5,7 +5,7 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from http import HTTPStatus
 
-from config.setup_logs.logging import logger
+from config.setup_logs.logging import logger, error_sampler
 from api_v1.exeptions import ValidationError
 from api_v1.redirect_servise.exceptions import (
     UrlNotFoundError,
@@ -13,6 +13,30 @@ from api_v1.redirect_servise.exceptions import (
 )
 
 
+def log_expected_error(request: Request, exc: StarletteHTTPException) -> None:
+    """
+    Логирование ожидаемой ошибки клиента
+
+    Без трассировки, с ограничением частоты по типу и статусу ошибки,
+    сообщение форматируется только если запись не отброшена.
+    """
+    suppressed = error_sampler.allow((type(exc).__name__, exc.status_code))
+    if suppressed is None:
+        return
+    logger.bind(
+        error=type(exc).__name__,
+        error_code=exc.status_code,
+        path=request.scope['path'],
+        suppressed=suppressed,
+    ).warning('{} {} {}: {}{}',
+              request.method,
+              request.scope['path'],
+              exc.status_code,
+              exc.detail,
+              f' ({suppressed} similar suppressed)' if suppressed else '',
+              )
+
+
 def register_errors(app: FastAPI) -> None:
     """
     Крючек для логирования различных исключений
@@ -72,7 +96,7 @@ def register_errors(app: FastAPI) -> None:
         """
         Logging all exceptions UrlNotFoundError
         """
-        logger.opt(exception=True).warning(exc)
+        log_expected_error(request, exc)
         response = dict(
             status=False,
             error_code=exc.status_code,
@@ -88,7 +112,7 @@ def register_errors(app: FastAPI) -> None:
         """
         Logging all exceptions UrlAlreadyExistsError
         """
-        logger.opt(exception=True).warning(exc)
+        log_expected_error(request, exc)
         response = dict(
             status=False,
             error_code=exc.status_code,
@@ -104,7 +128,7 @@ def register_errors(app: FastAPI) -> None:
         """
         Логирование всех ValidationError
         """
-        logger.opt(exception=True).warning(exc)
+        log_expected_error(request, exc)
         response = dict(
             status=False,
             error_code=exc.status_code,
@@ -120,7 +144,7 @@ def register_errors(app: FastAPI) -> None:
         """
         Логирование всех HTTPException
         """
-        logger.opt(exception=True).warning(exc)
+        log_expected_error(request, exc)
         response = dict(
             status=False,
             error_code=exc.status_code,
@@ -152,7 +176,7 @@ def register_errors(app: FastAPI) -> None:
         """
         Логирование всех StarletteHTTPException
         """
-        logger.opt(exception=True).warning(exc)
+        log_expected_error(request, exc)
         response = dict(
             status=False,
             error_code=exc.status_code,
@@ -2,6 +2,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
 
 from config import settings
+from config.metrics import MetricsMiddleware, metrics
 
 
 def register_middlewares(app: FastAPI) -> None:
@@ -50,3 +51,9 @@ def register_middlewares(app: FastAPI) -> None:
         allow_methods=['*'],
         allow_headers=['*'],
     )
+    # Учет запросов подключается последним, чтобы охватывать все middleware
+    if settings.metrics.ENABLED:
+        app.add_middleware(
+            MetricsMiddleware,
+            registry=metrics,
+        )
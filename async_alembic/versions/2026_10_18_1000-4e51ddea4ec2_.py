@@ -0,0 +1,34 @@
+"""redirect clicks
+
+Revision ID: 4e51ddea4ec2
+Revises: 1c56a922c8b0
+Create Date: 2026-10-18 10:00:12.402113
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4e51ddea4ec2"
+down_revision: Union[str, None] = "1c56a922c8b0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "redirectclicks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("clicks", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("last_access", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["id"], ["redirecturls.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("redirectclicks")
@@ -0,0 +1,53 @@
+"""url hash
+
+Revision ID: 4109af3ed874
+Revises: 4e51ddea4ec2
+Create Date: 2026-10-18 11:00:41.870215
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4109af3ed874"
+down_revision: Union[str, None] = "4e51ddea4ec2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "redirecturls",
+        sa.Column("url_hash", sa.LargeBinary(length=32), nullable=True),
+    )
+    op.execute("UPDATE redirecturls SET url_hash = sha256(convert_to(url, 'UTF8'))")
+    op.alter_column("redirecturls", "url_hash", nullable=False)
+    op.create_index(
+        op.f("ix_redirecturls_url_hash"), "redirecturls", ["url_hash"], unique=True
+    )
+    op.drop_constraint("redirecturls_url_key", "redirecturls", type_="unique")
+    op.alter_column(
+        "redirecturls",
+        "url",
+        type_=sa.Text(),
+        existing_type=sa.String(length=256),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    # Urls longer than 256 characters must be removed before downgrade
+    op.alter_column(
+        "redirecturls",
+        "url",
+        type_=sa.String(length=256),
+        existing_type=sa.Text(),
+        existing_nullable=False,
+    )
+    op.create_unique_constraint("redirecturls_url_key", "redirecturls", ["url"])
+    op.drop_index(op.f("ix_redirecturls_url_hash"), table_name="redirecturls")
+    op.drop_column("redirecturls", "url_hash")
@@ -0,0 +1,42 @@
+"""redirect deletions
+
+Revision ID: 1b92dc958415
+Revises: 4109af3ed874
+Create Date: 2026-10-18 12:00:27.518304
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1b92dc958415"
+down_revision: Union[str, None] = "4109af3ed874"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "redirectdeletions",
+        sa.Column("url_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "deleted_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_redirectdeletions_id"), "redirectdeletions", ["id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_redirectdeletions_id"), table_name="redirectdeletions")
+    op.drop_table("redirectdeletions")
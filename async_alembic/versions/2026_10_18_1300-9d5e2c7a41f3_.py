@@ -0,0 +1,255 @@
+"""bigint identity and hash partitions of redirect urls
+
+Revision ID: 9d5e2c7a41f3
+Revises: 1b92dc958415
+Create Date: 2026-10-18 13:00:12.604931
+
+`redirecturls` is moved to a new table partitioned by hash of a
+`BIGINT GENERATED BY DEFAULT AS IDENTITY` `id`, uniqueness of urls moves
+to `redirectdigests`. The application keeps working during migration:
+
+1. `redirectclicks.id` and `redirectdeletions` become `BIGINT` (these
+   tables are rewritten under their own locks, `redirecturls` is not
+   locked), serial `redirectdeletions.id` becomes identity continuing
+   from its sequence. The new tables are created and a trigger copies every
+   insert, update and delete of `redirecturls` into them.
+2. Existing rows are copied in batches of `BATCH_SIZE` ids, each batch
+   is committed separately and locks only its rows (`FOR KEY SHARE`).
+3. Cutover takes `ACCESS EXCLUSIVE` lock on `redirecturls` only to
+   rename tables, indexes and sequences, `lock_timeout` keeps it from
+   queueing behind long transactions.
+4. The foreign key of clicks is validated without blocking writes and
+   the old table is dropped.
+
+Steps before cutover can be repeated, if cutover times out run the
+upgrade again.
+Restart the application with the code of this revision right after
+cutover: creation of urls now claims digests in `redirectdigests`, and
+cached prepared statements still describe `id` as `INTEGER`.
+
+Downgrade copies urls back into one unpartitioned table in a single
+transaction, stop the application first. It fails while any id is
+above `INTEGER`.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d5e2c7a41f3"
+down_revision: Union[str, None] = "1b92dc958415"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+BATCH_SIZE = 50_000
+LOCK_TIMEOUT = "3s"
+MAX_INTEGER = 2**31 - 1
+
+COPY_FUNCTION = """
+CREATE OR REPLACE FUNCTION redirecturls_copy() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM redirecturls_new WHERE id = OLD.id;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    INSERT INTO redirectdigests (url_hash, id)
+    VALUES (NEW.url_hash, NEW.id)
+    ON CONFLICT DO NOTHING;
+    INSERT INTO redirecturls_new (id, url, url_hash)
+    VALUES (NEW.id, NEW.url, NEW.url_hash)
+    ON CONFLICT DO NOTHING;
+    RETURN NEW;
+END
+$$
+"""
+
+DELETIONS_IDENTITY = """
+DO $$
+DECLARE
+    last_id BIGINT;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        AND table_name = 'redirectdeletions'
+        AND column_name = 'id'
+        AND is_identity = 'NO'
+    ) THEN
+        LOCK TABLE redirectdeletions IN ACCESS EXCLUSIVE MODE;
+        SELECT greatest(
+            (SELECT last_value FROM redirectdeletions_id_seq),
+            (SELECT coalesce(max(id), 0) FROM redirectdeletions),
+            1
+        ) INTO last_id;
+        ALTER TABLE redirectdeletions ALTER COLUMN id DROP DEFAULT;
+        DROP SEQUENCE redirectdeletions_id_seq;
+        ALTER TABLE redirectdeletions ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;
+        PERFORM setval(pg_get_serial_sequence('redirectdeletions', 'id'), last_id);
+    END IF;
+END
+$$
+"""
+
+BACKFILL = """
+WITH batch AS (
+    SELECT id, url, url_hash FROM redirecturls
+    WHERE id > :start AND id <= :end
+    FOR KEY SHARE
+), digests AS (
+    INSERT INTO redirectdigests (url_hash, id)
+    SELECT url_hash, id FROM batch
+    ON CONFLICT DO NOTHING
+)
+INSERT INTO redirecturls_new (id, url, url_hash)
+SELECT id, url, url_hash FROM batch
+ON CONFLICT DO NOTHING
+"""
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # Foreign key is dropped first, so the rewrite of clicks does not lock urls
+        op.execute("ALTER TABLE redirectclicks DROP CONSTRAINT IF EXISTS redirectclicks_id_fkey")
+        op.execute("ALTER TABLE redirectclicks ALTER COLUMN id TYPE BIGINT")
+        op.execute(
+            "ALTER TABLE redirectdeletions "
+            "ALTER COLUMN id TYPE BIGINT, ALTER COLUMN url_id TYPE BIGINT"
+        )
+        # The model declares `Identity()`, positions of the log go on from the serial
+        op.execute(DELETIONS_IDENTITY)
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS redirecturls_new ("
+        "url TEXT NOT NULL, "
+        "url_hash BYTEA NOT NULL, "
+        "id BIGINT GENERATED BY DEFAULT AS IDENTITY, "
+        "PRIMARY KEY (id)"
+        ") PARTITION BY HASH (id)"
+    )
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS redirecturls_p{remainder} "
+            f"PARTITION OF redirecturls_new "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_redirecturls_new_id ON redirecturls_new (id)")
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS redirectdigests ("
+        "url_hash BYTEA NOT NULL, "
+        "id BIGINT NOT NULL, "
+        "PRIMARY KEY (url_hash), "
+        "UNIQUE (id), "
+        "FOREIGN KEY (id) REFERENCES redirecturls_new (id) "
+        "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED"
+        ")"
+    )
+    op.execute(COPY_FUNCTION)
+    op.execute(
+        "CREATE OR REPLACE TRIGGER redirecturls_copy "
+        "AFTER INSERT OR UPDATE OR DELETE ON redirecturls "
+        "FOR EACH ROW EXECUTE FUNCTION redirecturls_copy()"
+    )
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        last_id = bind.scalar(sa.text("SELECT coalesce(max(id), 0) FROM redirecturls"))
+        for start in range(0, last_id, BATCH_SIZE):
+            bind.execute(sa.text(BACKFILL), dict(start=start, end=start + BATCH_SIZE))
+
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    op.execute("LOCK TABLE redirecturls IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER redirecturls_copy ON redirecturls")
+    op.execute("DROP FUNCTION redirecturls_copy()")
+    op.execute("ALTER TABLE redirecturls RENAME TO redirecturls_old")
+    op.execute("ALTER INDEX redirecturls_pkey RENAME TO redirecturls_old_pkey")
+    op.execute("ALTER INDEX ix_redirecturls_id RENAME TO ix_redirecturls_old_id")
+    op.execute("ALTER INDEX ix_redirecturls_url_hash RENAME TO ix_redirecturls_old_url_hash")
+    op.execute("ALTER SEQUENCE redirecturls_id_seq RENAME TO redirecturls_old_id_seq")
+    op.execute("ALTER TABLE redirecturls_new RENAME TO redirecturls")
+    op.execute("ALTER INDEX redirecturls_new_pkey RENAME TO redirecturls_pkey")
+    op.execute("ALTER INDEX ix_redirecturls_new_id RENAME TO ix_redirecturls_id")
+    op.execute("ALTER SEQUENCE redirecturls_new_id_seq RENAME TO redirecturls_id_seq")
+    op.execute(
+        "SELECT setval('redirecturls_id_seq', greatest("
+        "(SELECT last_value FROM redirecturls_old_id_seq), "
+        "(SELECT coalesce(max(id), 0) FROM redirecturls), "
+        "1))"
+    )
+    op.execute(
+        "ALTER TABLE redirectclicks ADD CONSTRAINT redirectclicks_id_fkey "
+        "FOREIGN KEY (id) REFERENCES redirecturls (id) ON DELETE CASCADE NOT VALID"
+    )
+
+    with op.get_context().autocommit_block():
+        # Clicks of urls deleted while the foreign key was dropped
+        op.execute(
+            "DELETE FROM redirectclicks AS clicks WHERE NOT EXISTS "
+            "(SELECT 1 FROM redirecturls AS urls WHERE urls.id = clicks.id)"
+        )
+        op.execute("ALTER TABLE redirectclicks VALIDATE CONSTRAINT redirectclicks_id_fkey")
+        op.execute("DROP TABLE redirecturls_old")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    largest = bind.scalar(sa.text(
+        "SELECT greatest("
+        "(SELECT coalesce(max(id), 0) FROM redirecturls), "
+        "(SELECT coalesce(max(greatest(id, url_id)), 0) FROM redirectdeletions), "
+        "(SELECT last_value FROM redirecturls_id_seq))"
+    ))
+    if largest > MAX_INTEGER:
+        raise RuntimeError(f"Id {largest} does not fit INTEGER, can not downgrade 9d5e2c7a41f3")
+
+    op.execute("LOCK TABLE redirecturls IN ACCESS EXCLUSIVE MODE")
+    op.execute(
+        "CREATE TABLE redirecturls_old ("
+        "url TEXT NOT NULL, "
+        "url_hash BYTEA NOT NULL, "
+        "id SERIAL NOT NULL, "
+        "PRIMARY KEY (id)"
+        ")"
+    )
+    op.execute(
+        "INSERT INTO redirecturls_old (id, url, url_hash) "
+        "SELECT id, url, url_hash FROM redirecturls"
+    )
+    last_id = bind.scalar(sa.text("SELECT last_value FROM redirecturls_id_seq"))
+    op.execute("ALTER TABLE redirectclicks DROP CONSTRAINT IF EXISTS redirectclicks_id_fkey")
+    op.execute("DROP TABLE redirectdigests")
+    op.execute("DROP TABLE redirecturls")
+    op.execute("ALTER TABLE redirecturls_old RENAME TO redirecturls")
+    op.execute("ALTER INDEX redirecturls_old_pkey RENAME TO redirecturls_pkey")
+    op.execute("ALTER SEQUENCE redirecturls_old_id_seq RENAME TO redirecturls_id_seq")
+    op.execute(sa.text("SELECT setval('redirecturls_id_seq', :last_id)").bindparams(last_id=last_id))
+    op.execute("CREATE INDEX ix_redirecturls_id ON redirecturls (id)")
+    op.execute("CREATE UNIQUE INDEX ix_redirecturls_url_hash ON redirecturls (url_hash)")
+
+    op.execute("ALTER TABLE redirectclicks ALTER COLUMN id TYPE INTEGER")
+    op.execute(
+        "ALTER TABLE redirectclicks ADD CONSTRAINT redirectclicks_id_fkey "
+        "FOREIGN KEY (id) REFERENCES redirecturls (id) ON DELETE CASCADE"
+    )
+
+    last_deletion = bind.scalar(sa.text(
+        "SELECT last_value FROM redirectdeletions_id_seq"
+    ))
+    op.execute("ALTER TABLE redirectdeletions ALTER COLUMN id DROP IDENTITY")
+    op.execute(
+        "ALTER TABLE redirectdeletions "
+        "ALTER COLUMN id TYPE INTEGER, ALTER COLUMN url_id TYPE INTEGER"
+    )
+    op.execute("CREATE SEQUENCE redirectdeletions_id_seq AS INTEGER OWNED BY redirectdeletions.id")
+    op.execute(
+        "ALTER TABLE redirectdeletions "
+        "ALTER COLUMN id SET DEFAULT nextval('redirectdeletions_id_seq')"
+    )
+    op.execute(
+        sa.text("SELECT setval('redirectdeletions_id_seq', :last_id)").bindparams(last_id=last_deletion)
+    )
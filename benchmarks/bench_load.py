@@ -0,0 +1,362 @@
+r"""
+End-to-end load and latency of the URL service.
+
+Drives the whole application through HTTP requests, so numbers include
+routing, validation, cache, Redis and Postgres. Workloads:
+
+- `redirect` - `GET /urls/{id}` of seeded urls, ids are drawn from
+  a Zipf distribution (`--zipf` exponent), a few hot urls get most hits.
+- `create` - `POST /urls` in bursts of `--burst` concurrent requests,
+  `--duplicates` share of them repeats already created urls.
+- `list` - `GET /urls` pages after a random `after_id`.
+- `not_found` - `GET /urls/{id}` of random ids that do not exist.
+
+Targets:
+
+- `asgi` - application in this process through `httpx.ASGITransport`
+  with its lifespan, Postgres and Redis from **.env**.
+  `--memory-cache` replaces Redis with the in-process cache backend.
+- `http` - running server at `--url`, with `--spawn` a local uvicorn
+  with `--workers` processes is started for the run.
+
+Each workload reports throughput and p50/p95/p99/max latency. Results
+are written as JSON to `benchmarks/results/` (or `--output`),
+`--compare` prints the change against a previous result file.
+
+Run from project root::
+
+    python -m benchmarks.bench_load --target asgi --requests 5000
+    python -m benchmarks.bench_load --target http --spawn --workers 4 \
+        --compare benchmarks/results/load-20260101-120000.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import accumulate
+from pathlib import Path
+from random import Random
+from time import perf_counter
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+import httpx
+
+from config import settings
+from config.models.base import MAX_ID
+
+
+RESULTS_DIR = Path(__file__).parent.joinpath('results')
+
+
+@dataclass
+class LoadState:
+    """
+    Seeded urls shared by workloads
+    """
+    ids: list[int]
+    urls: list[str]
+    zipf: Callable[[Random], int]
+    duplicates: float = 0.1
+    page_size: int = 50
+    created: int = 0
+    run_id: str = field(default_factory=lambda: uuid4().hex[:8])
+
+    @property
+    def max_id(self) -> int:
+        return max(self.ids)
+
+    def new_url(self) -> str:
+        self.created += 1
+        return f'/bench/{self.run_id}/{self.created}'
+
+
+def zipf_sampler(size: int, exponent: float) -> Callable[[Random], int]:
+    """
+    Index in `range(size)` with probability of rank `k` proportional to `1 / k ** exponent`
+    """
+    weights = list(accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+    total = weights[-1]
+    return lambda rng: min(bisect_left(weights, rng.random() * total), size - 1)
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+Request = Callable[[httpx.AsyncClient, LoadState, Random], Awaitable[bool]]
+
+
+async def redirect(client: httpx.AsyncClient, state: LoadState, rng: Random) -> bool:
+    url_id = state.ids[state.zipf(rng)]
+    response = await client.get(f'{settings.API_PREFIX}/urls/{url_id}')
+    return response.status_code == 307
+
+
+async def create(client: httpx.AsyncClient, state: LoadState, rng: Random) -> bool:
+    if rng.random() < state.duplicates:
+        url, expected = rng.choice(state.urls), 200
+    else:
+        url, expected = state.new_url(), 201
+    response = await client.post(f'{settings.API_PREFIX}/urls', json=dict(url=url))
+    return response.status_code == expected
+
+
+async def list_page(client: httpx.AsyncClient, state: LoadState, rng: Random) -> bool:
+    response = await client.get(f'{settings.API_PREFIX}/urls',
+                                params=dict(after_id=rng.randrange(state.max_id),
+                                            limit=state.page_size,
+                                            ),
+                                )
+    return response.status_code == 200
+
+
+async def not_found(client: httpx.AsyncClient, state: LoadState, rng: Random) -> bool:
+    high = min(MAX_ID, state.max_id * 100 + 10_000)
+    response = await client.get(f'{settings.API_PREFIX}/urls/{rng.randint(state.max_id + 1, high)}')
+    return response.status_code == 404
+
+
+WORKLOADS: dict[str, Request] = {
+    'redirect': redirect,
+    'create': create,
+    'list': list_page,
+    'not_found': not_found,
+}
+
+
+async def seed(client: httpx.AsyncClient, count: int, run_id: str) -> tuple[list[int], list[str]]:
+    """
+    Create `count` urls through batch endpoint
+    """
+    ids, urls = list(), list()
+    for start in range(0, count, settings.batch.MAX_SIZE):
+        batch = [dict(url=f'/bench/{run_id}/seed/{number}')
+                 for number in range(start, min(count, start + settings.batch.MAX_SIZE))]
+        response = await client.post(f'{settings.API_PREFIX}/urls/batch', json=dict(urls=batch))
+        response.raise_for_status()
+        for item in response.json():
+            ids.append(item['id'])
+            urls.append(item['url'])
+    return ids, urls
+
+
+async def drive(client: httpx.AsyncClient,
+                request: Request,
+                state: LoadState,
+                requests: int,
+                concurrency: int,
+                burst: int = 1,
+                seed: int = 0,
+                ) -> dict[str, float]:
+    """
+    Run `requests` requests by `concurrency` workers, each worker sends `burst` at once
+    """
+    latencies: list[float] = list()
+    errors = 0
+    remaining = requests
+
+    async def timed(rng: Random) -> None:
+        nonlocal errors
+        started = perf_counter()
+        try:
+            ok = await request(client, state, rng)
+        except httpx.HTTPError:
+            ok = False
+        latencies.append(perf_counter() - started)
+        errors += not ok
+
+    async def worker(number: int) -> None:
+        nonlocal remaining
+        rng = Random(seed * 1_000 + number)
+        while remaining > 0:
+            size = min(burst, remaining)
+            remaining -= size
+            await asyncio.gather(*(timed(rng) for _ in range(size)))
+
+    started = perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    duration = perf_counter() - started
+    latencies.sort()
+    return dict(
+        requests=len(latencies),
+        errors=errors,
+        duration_s=round(duration, 3),
+        requests_per_sec=round(len(latencies) / duration, 1),
+        p50_ms=round(percentile(latencies, 50) * 1e3, 3),
+        p95_ms=round(percentile(latencies, 95) * 1e3, 3),
+        p99_ms=round(percentile(latencies, 99) * 1e3, 3),
+        max_ms=round(latencies[-1] * 1e3, 3) if latencies else 0.0,
+    )
+
+
+async def run_workloads(client: httpx.AsyncClient, options: argparse.Namespace) -> dict[str, dict]:
+    state = LoadState(ids=list(), urls=list(), zipf=lambda rng: 0,
+                      duplicates=options.duplicates,
+                      page_size=options.page_size,
+                      )
+    state.ids, state.urls = await seed(client, options.urls, state.run_id)
+    state.zipf = zipf_sampler(len(state.ids), options.zipf)
+    results = dict()
+    for name in options.workloads:
+        burst = options.burst if name == 'create' else 1
+        if options.warmup:
+            await drive(client, WORKLOADS[name], state, options.warmup,
+                        options.concurrency, burst, seed=options.seed + 1)
+        results[name] = await drive(client, WORKLOADS[name], state, options.requests,
+                                    options.concurrency, burst, seed=options.seed)
+    return results
+
+
+async def run_asgi(options: argparse.Namespace) -> dict[str, dict]:
+    from asgi_lifespan import LifespanManager
+    from fastapi_cache import FastAPICache
+    from fastapi_cache.backends.inmemory import InMemoryBackend
+
+    from config.cache import request_key_builder
+    from main import start_app
+
+    if options.memory_cache:
+        settings.cache.WARMUP_ENABLED = False
+    app = start_app()
+    async with LifespanManager(app) as manager:
+        if options.memory_cache:
+            FastAPICache.init(InMemoryBackend(),
+                              prefix=settings.cache.PREFIX,
+                              key_builder=request_key_builder,
+                              )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=manager.app),
+                                     base_url=settings.CURRENT_ORIGIN,
+                                     timeout=options.timeout,
+                                     ) as client:
+            return await run_workloads(client, options)
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = perf_counter() + timeout
+    while True:
+        try:
+            response = await client.get('/openapi.json')
+            if response.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if perf_counter() > deadline:
+            raise TimeoutError(f'Server {client.base_url} is not ready in {timeout}s')
+        await asyncio.sleep(0.2)
+
+
+async def run_http(options: argparse.Namespace) -> dict[str, dict]:
+    server = None
+    if options.spawn:
+        url = httpx.URL(options.url)
+        server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app',
+                                   '--host', url.host,
+                                   '--port', str(url.port or 80),
+                                   '--workers', str(options.workers),
+                                   '--log-level', 'warning',
+                                   '--no-access-log',
+                                   ])
+    limits = httpx.Limits(max_connections=options.concurrency * options.burst,
+                          max_keepalive_connections=options.concurrency * options.burst,
+                          )
+    try:
+        async with httpx.AsyncClient(base_url=options.url,
+                                     limits=limits,
+                                     timeout=options.timeout,
+                                     ) as client:
+            await wait_ready(client, timeout=30)
+            return await run_workloads(client, options)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True,
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict[str, dict], previous: dict[str, dict]) -> None:
+    for name, current in results.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        changes = ', '.join(
+            f'{metric} {(current[metric] - before[metric]) / before[metric] * 100:+.1f}%'
+            for metric in ('requests_per_sec', 'p50_ms', 'p95_ms', 'p99_ms')
+            if before.get(metric))
+        print(f'{name:>10} vs previous: {changes}')
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_load',
+                                     description='End-to-end load and latency of the URL service.')
+    parser.add_argument('--target', choices=('asgi', 'http'), default='asgi')
+    parser.add_argument('--url', default='http://127.0.0.1:8000',
+                        help='server of http target')
+    parser.add_argument('--spawn', action='store_true',
+                        help='start local uvicorn for http target')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='uvicorn workers with --spawn')
+    parser.add_argument('--memory-cache', action='store_true',
+                        help='in-process cache instead of Redis for asgi target')
+    parser.add_argument('--workloads', nargs='+', choices=tuple(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument('--requests', type=int, default=2_000, help='requests per workload')
+    parser.add_argument('--warmup', type=int, default=200, help='unmeasured requests per workload')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--urls', type=int, default=1_000, help='seeded urls')
+    parser.add_argument('--zipf', type=float, default=1.1, help='exponent of redirect mix')
+    parser.add_argument('--burst', type=int, default=8, help='concurrent requests of create burst')
+    parser.add_argument('--duplicates', type=float, default=0.3, help='share of duplicate creates')
+    parser.add_argument('--page-size', type=int, default=settings.pagination.DEFAULT_LIMIT)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help='result file, default benchmarks/results/')
+    parser.add_argument('--compare', type=Path, help='previous result file')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> dict:
+    options = parse_args(argv)
+    runner = run_asgi if options.target == 'asgi' else run_http
+    results = asyncio.run(runner(options))
+    started = datetime.now(timezone.utc)
+    report = dict(
+        created_at=started.isoformat(),
+        revision=git_revision(),
+        python=platform.python_version(),
+        cpus=os.cpu_count(),
+        options={name: str(value) if isinstance(value, Path) else value
+                 for name, value in vars(options).items()},
+        results=results,
+    )
+    output = options.output or RESULTS_DIR.joinpath(f'load-{started:%Y%m%d-%H%M%S}.json')
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    for name, values in results.items():
+        print(f'{name:>10}: {values["requests_per_sec"]:>10,.1f} req/s  '
+              f'p50 {values["p50_ms"]:.2f} ms  p95 {values["p95_ms"]:.2f} ms  '
+              f'p99 {values["p99_ms"]:.2f} ms  errors {values["errors"]}')
+    if options.compare:
+        compare(results, json.loads(options.compare.read_text())['results'])
+    print(f'Saved to {output}')
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+r"""
+CPU time of logging a flood of handled `404` errors.
+
+Compares the previous handler logging (four `enqueue=True` text sinks,
+`opt(exception=True)` with rendered traceback) against
+`log_expected_error` with text sinks, with one batched JSON sink, and
+with JSON sink plus per error code sampling. CPU time includes sink
+threads, log files go to a temporary directory, console output to
+`os.devnull`.
+
+Run from project root::
+
+    python -m benchmarks.bench_logging
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import process_time
+
+from loguru import logger
+from starlette.requests import Request
+
+from api_v1.redirect_servise.exceptions import UrlNotFoundError
+from app_includes import logs_errors
+from config.setup_logs import logging as setup_logs
+from config.setup_logs.sinks import RateSampler
+
+
+def make_request() -> Request:
+    return Request({
+        'type': 'http',
+        'method': 'GET',
+        'path': '/api/v1/urls/404',
+        'headers': [],
+        'query_string': b'',
+    })
+
+
+def raise_not_found() -> None:
+    raise UrlNotFoundError(status_code=404, detail='URL_NOT_FOUND_ERROR')
+
+
+def previous(request: Request) -> None:
+    try:
+        raise_not_found()
+    except UrlNotFoundError as exc:
+        logger.opt(exception=True).warning(exc)
+
+
+def current(request: Request) -> None:
+    try:
+        raise_not_found()
+    except UrlNotFoundError as exc:
+        logs_errors.log_expected_error(request, exc)
+
+
+def measure(handler, count: int) -> float:
+    request = make_request()
+    start = process_time()
+    for _ in range(count):
+        handler(request)
+    logger.complete()
+    logger.remove()
+    return (process_time() - start) / count * 1e6
+
+
+def run(count: int = 5_000) -> dict[str, float]:
+    results = dict()
+    stdout, stderr = sys.stdout, sys.stderr
+    with open(os.devnull, 'w') as devnull, tempfile.TemporaryDirectory() as log_dir:
+        sys.stdout = sys.stderr = devnull
+        try:
+            logs_errors.error_sampler = RateSampler(limit=0)
+            setup_logs.setup_text_logging(Path(log_dir))
+            results['text_traceback_us'] = measure(previous, count)
+            setup_logs.setup_text_logging(Path(log_dir))
+            results['text_no_traceback_us'] = measure(current, count)
+            setup_logs.setup_json_logging(devnull, level='INFO')
+            results['json_us'] = measure(current, count)
+            logs_errors.error_sampler = RateSampler(limit=10)
+            setup_logs.setup_json_logging(devnull, level='INFO')
+            results['json_sampled_us'] = measure(current, count)
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:>22}: {value:,.1f} us CPU per error')
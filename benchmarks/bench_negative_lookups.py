@@ -0,0 +1,62 @@
+r"""
+Benchmark of Data Base queries under a flood of random ids.
+
+Even ids up to `2 * existing` are loaded into :class:`NegativeLookups`
+filter as existing urls, then random nonexistent ids (odd ids inside
+the range and ids above it) are checked at full speed. Every id that
+passes the filter would cost one `SELECT` on a redirect cache miss.
+
+Run from project root::
+
+    python -m benchmarks.bench_negative_lookups
+"""
+
+import asyncio
+from random import randrange
+from time import perf_counter
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+
+from api_v1.redirect_servise.negative import NegativeLookups
+from config.cache import BloomFilter
+
+
+async def flood(lookups: NegativeLookups, ids: list[int]) -> tuple[float, int]:
+    passed = 0
+    started = perf_counter()
+    for url_id in ids:
+        if await lookups.might_exist(url_id):
+            passed += 1
+            await lookups.remember_missing(url_id)
+    return perf_counter() - started, passed
+
+
+async def run(existing: int = 1_000_000, requests: int = 200_000) -> dict[str, float]:
+    FastAPICache.init(InMemoryBackend(), prefix='bench')
+    lookups = NegativeLookups(session_factory=None, capacity=existing)
+    bloom = BloomFilter(capacity=existing, error_rate=lookups.error_rate)
+    for url_id in range(2, 2 * existing + 1, 2):
+        bloom.add(url_id)
+    lookups._bloom, lookups.max_id = bloom, 2 * existing
+    lookups._last_refresh = float('inf')
+    floods = dict(
+        in_range=[randrange(1, 2 * existing, 2) for _ in range(requests)],
+        above_range=[randrange(2 * existing + 1, 2 ** 31) for _ in range(requests)],
+    )
+    results = dict()
+    for flood_name, ids in floods.items():
+        for name, guard in (('without_filter', NegativeLookups(session_factory=None)),
+                            ('with_filter', lookups)):
+            await FastAPICache.clear()
+            elapsed, passed = await flood(guard, ids)
+            results[f'{flood_name}_{name}_requests_per_sec'] = requests / elapsed
+            results[f'{flood_name}_{name}_db_queries_per_sec'] = passed / elapsed
+            results[f'{flood_name}_{name}_db_query_ratio'] = passed / requests
+    results['bloom_bytes'] = bloom.__sizeof__()
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in asyncio.run(run()).items():
+        print(f'{name:>46}: {value:,.4f}')
@@ -0,0 +1,98 @@
+r"""
+Requests per second of cached redirects with and without the fast path.
+
+Application is called directly as ASGI callable (no HTTP client or
+server), redirect cache is an in-memory backend prefilled with `urls`
+entries, so the numbers show per-request overhead of the application,
+not of network, Redis or Postgres.
+
+Run from project root::
+
+    python -m benchmarks.bench_redirect_fast_path
+"""
+
+import asyncio
+from random import randrange
+from time import perf_counter
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+
+from api_v1.redirect_servise.cache import redirect_cache_key
+from config import settings
+from config.cache import request_key_builder
+from main import start_app
+
+
+async def receive() -> dict:
+    return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+
+async def request(app, path: str) -> int:
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('127.0.0.1', 8000),
+        'app': app,
+    }
+    status = 0
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+async def drive(app, requests: int, concurrency: int, urls: int) -> float:
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            path = f'{settings.API_PREFIX}/urls/{randrange(1, urls + 1)}'
+            assert await request(app, path) == 307
+
+    started = perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency)
+                           for _ in range(concurrency)))
+    return requests / (perf_counter() - started)
+
+
+async def run(requests: int = 20_000,
+              concurrency: int = 50,
+              urls: int = 1_000,
+              ) -> dict[str, float]:
+    FastAPICache.init(InMemoryBackend(),
+                      prefix=settings.cache.PREFIX,
+                      key_builder=request_key_builder,
+                      )
+    backend = FastAPICache.get_backend()
+    for url_id in range(1, urls + 1):
+        await backend.set(redirect_cache_key(url_id),
+                          FastAPICache.get_coder().encode(f'/bench/{url_id}'),
+                          expire=3600,
+                          )
+    settings.analytics.CLICKS_ENABLED = False
+    results = dict()
+    for name, enabled in (('fastapi', False), ('fast_path', True)):
+        settings.cache.FAST_PATH_ENABLED = enabled
+        results[f'{name}_requests_per_sec'] = await drive(start_app(),
+                                                          requests,
+                                                          concurrency,
+                                                          urls,
+                                                          )
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in asyncio.run(run()).items():
+        print(f'{name:>28}: {value:,.0f}')
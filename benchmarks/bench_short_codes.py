@@ -0,0 +1,40 @@
+r"""
+Micro-benchmark of short code encode/decode throughput.
+
+Run from project root::
+
+    python -m benchmarks.bench_short_codes
+"""
+
+from random import randrange
+from timeit import repeat
+
+from api_v1.redirect_servise.short_codes import ShortCodeCodec
+
+
+def run(count: int = 100_000) -> dict[str, float]:
+    ids = [randrange(1, 2 ** 31) for _ in range(count)]
+    results = dict()
+    for name, codec in (('plain', ShortCodeCodec()),
+                        ('salted', ShortCodeCodec(salt='benchmark'))):
+        codes = [codec.encode(url_id) for url_id in ids]
+        encode = min(repeat(lambda: [codec.encode(url_id) for url_id in ids],
+                            number=1,
+                            repeat=5,
+                            ))
+        decode = min(repeat(lambda: [codec.decode(code) for code in codes],
+                            number=1,
+                            repeat=5,
+                            ))
+        results[f'{name}_encode_per_sec'] = count / encode
+        results[f'{name}_decode_per_sec'] = count / decode
+    results['str_int_per_sec'] = count / min(repeat(lambda: [int(str(url_id)) for url_id in ids],
+                                                     number=1,
+                                                     repeat=5,
+                                                     ))
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:>24}: {value:,.0f}')
@@ -0,0 +1,65 @@
+r"""
+Memory per million urls and lookups per second of the redirect snapshot.
+
+Compares `UrlTable` (one UTF-8 buffer and an array of offsets) with
+a plain `dict[int, str]` holding the same urls. Memory is measured
+with `tracemalloc`, urls are about 40 bytes like typical paths with
+a query string.
+
+Run from project root::
+
+    python -m benchmarks.bench_snapshot
+"""
+
+import tracemalloc
+from random import randrange
+from time import perf_counter
+
+from config.cache import UrlTable
+
+
+def make_url(number: int) -> str:
+    return f'/catalog/item/{number}?utm_source=campaign-{number % 97}'
+
+
+def traced(build) -> tuple[object, int]:
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+
+def lookups_per_sec(get, urls: int, count: int) -> float:
+    started = perf_counter()
+    for _ in range(count):
+        get(randrange(1, urls + 1))
+    return count / (perf_counter() - started)
+
+
+def run(urls: int = 1_000_000, lookups: int = 500_000) -> dict[str, float]:
+    def build_table() -> UrlTable:
+        table = UrlTable()
+        for number in range(1, urls + 1):
+            table.append(number, make_url(number).encode())
+        return table
+
+    def build_dict() -> dict[int, str]:
+        return {number: make_url(number) for number in range(1, urls + 1)}
+
+    url_bytes = sum(len(make_url(number)) for number in range(1, urls + 1))
+    table, table_size = traced(build_table)
+    mapping, dict_size = traced(build_dict)
+    millions = urls / 1_000_000
+    return {
+        'url_bytes_mb_per_million': url_bytes / millions / 2 ** 20,
+        'url_table_mb_per_million': table_size / millions / 2 ** 20,
+        'dict_mb_per_million': dict_size / millions / 2 ** 20,
+        'url_table_lookups_per_sec': lookups_per_sec(table.get, urls, lookups),
+        'dict_lookups_per_sec': lookups_per_sec(mapping.get, urls, lookups),
+    }
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:>26}: {value:,.1f}')
@@ -0,0 +1,55 @@
+r"""
+Micro-benchmark of statement preparation of the redirect lookup.
+
+Compares building `SELECT` with `struct_options_statment` on every call
+against `cached_options_statment`. Both paths then go through the same
+SQLAlchemy compiled cache lookup as `session.execute` does, so the
+difference is the cost of statement construction and cache key
+generation. No Data Base is needed.
+
+Run from project root::
+
+    python -m benchmarks.bench_statement_cache
+"""
+
+from random import randrange
+from timeit import repeat
+
+from sqlalchemy.dialects.postgresql.asyncpg import dialect
+from sqlalchemy.util import LRUCache
+
+from config.dao.base_dao import cached_options_statment, struct_options_statment
+from config.models import RedirectURL
+
+
+def run(count: int = 20_000) -> dict[str, float]:
+    ids = [randrange(1, 2 ** 31) for _ in range(count)]
+    pg_dialect = dialect()
+    compiled_cache = LRUCache(500)
+
+    def prepare(stmt) -> None:
+        stmt._compile_w_cache(pg_dialect,
+                              compiled_cache=compiled_cache,
+                              column_keys=['id'],
+                              )
+
+    def current() -> None:
+        for url_id in ids:
+            prepare(struct_options_statment(model=RedirectURL, id=url_id))
+
+    def cached() -> None:
+        for url_id in ids:
+            stmt, params = cached_options_statment(model=RedirectURL, id=url_id)
+            prepare(stmt)
+
+    results = dict()
+    for name, func in (('struct_per_sec', current), ('cached_per_sec', cached)):
+        func()
+        results[name] = count / min(repeat(func, number=1, repeat=5))
+    results['speedup'] = results['cached_per_sec'] / results['struct_per_sec']
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:>16}: {value:,.2f}')
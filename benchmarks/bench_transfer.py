@@ -0,0 +1,45 @@
+r"""
+Client side rows per second of bulk import and export of short urls.
+
+Import reads and validates rows before `COPY`, export formats rows
+fetched by the server-side cursor. Both run on the process of the
+command, so they bound its rate regardless of Data Base; files are
+kept in memory.
+
+Run from project root::
+
+    python -m benchmarks.bench_transfer
+"""
+
+import io
+from time import perf_counter
+
+from config.alembic.transfer import read_rows, rows_writer, valid_url
+
+
+def measure_import(data: str, format: str) -> float:
+    started = perf_counter()
+    count = sum(1 for _, url in read_rows(io.StringIO(data, newline=''), format) if valid_url(url))
+    return count / (perf_counter() - started)
+
+
+def measure_export(rows: list[tuple[int, str]], format: str) -> float:
+    started = perf_counter()
+    rows_writer(io.StringIO(newline=''), format)(rows)
+    return len(rows) / (perf_counter() - started)
+
+
+def run(rows: int = 500_000) -> dict[str, float]:
+    urls = [(number, f'/bench/path/{number}?query=value') for number in range(1, rows + 1)]
+    results = dict()
+    for format in ('csv', 'ndjson'):
+        file = io.StringIO(newline='')
+        rows_writer(file, format)(urls)
+        results[f'import_{format}_rows_per_sec'] = measure_import(file.getvalue(), format)
+        results[f'export_{format}_rows_per_sec'] = measure_export(urls, format)
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:>28}: {value:,.0f}')
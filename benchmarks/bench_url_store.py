@@ -0,0 +1,45 @@
+r"""
+Lookups and appends per second of the memory-mapped url store.
+
+`get_bytes` returns `memoryview` of the mapped data file, `get`
+decodes it to `str` (the only copy). Appends are measured one url per
+write with and without `fdatasync`, files go to a temporary directory.
+
+Run from project root::
+
+    python -m benchmarks.bench_url_store
+"""
+
+import tempfile
+from pathlib import Path
+from random import randrange
+from time import perf_counter
+
+from config.storage import MmapUrlStore
+
+
+def measure(func, count: int) -> float:
+    started = perf_counter()
+    for _ in range(count):
+        func()
+    return count / (perf_counter() - started)
+
+
+def run(urls: int = 100_000, lookups: int = 500_000, appends: int = 2_000) -> dict[str, float]:
+    results = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        store = MmapUrlStore(Path(directory), sync=False)
+        store.open()
+        store.add_many([f'/bench/path/{number}?query=value' for number in range(urls)])
+        results['get_bytes_per_sec'] = measure(lambda: store.get_bytes(randrange(1, urls + 1)), lookups)
+        results['get_per_sec'] = measure(lambda: store.get(randrange(1, urls + 1)), lookups)
+        for name, sync in (('append_per_sec', False), ('append_fdatasync_per_sec', True)):
+            store.sync = sync
+            results[name] = measure(lambda: store.add(f'/bench/new/{perf_counter()}'), appends)
+        store.close()
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:>26}: {value:,.0f}')
@@ -0,0 +1,82 @@
+r"""
+Перенос коротких ссылок в Базу Данных и из нее
+
+Импорт CSV или NDJSON через `COPY` и экспорт серверным курсором::
+
+    python -m config.alembic import urls.csv
+    python -m config.alembic import urls.ndjson --keep-ids
+    python -m config.alembic export urls.csv
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+import asyncpg
+from fastapi_cache import FastAPICache
+from redis import asyncio as aioredis
+
+from api_v1.redirect_servise.cache import invalidate_urls
+from api_v1.redirect_servise.dao import RedirectServiseDAO
+from api_v1.redirect_servise.negative import negative_lookups
+from config import settings
+from config.cache import BulkRedisBackend
+from config.database.db_helper import asyncpg_dsn
+from .transfer import FORMATS, Progress, export_urls, import_urls
+
+
+async def invalidate_imported(url_ids: list[int]) -> None:
+    """
+    Сброс кэшей Redis после пачки импорта: отметок отсутствия `id`
+    и версии списка ссылок
+    """
+    await negative_lookups.added_batch(url_ids)
+    await invalidate_urls()
+
+
+async def run(options: argparse.Namespace) -> None:
+    connection = await asyncpg.connect(asyncpg_dsn(settings.db.url))
+    redis = aioredis.from_url(settings.redis.redis_url)
+    FastAPICache.init(BulkRedisBackend(redis), prefix=settings.cache.PREFIX)
+    try:
+        progress = Progress(interval=options.progress)
+        if options.command == 'import':
+            await import_urls(connection,
+                              path=options.file,
+                              format=options.format,
+                              keep_ids=options.keep_ids,
+                              chunk_size=options.chunk_size,
+                              progress=progress,
+                              notify_channel=RedirectServiseDAO.change_channel,
+                              after_chunk=invalidate_imported,
+                              )
+        else:
+            await export_urls(connection,
+                              path=options.file,
+                              format=options.format,
+                              chunk_size=options.chunk_size,
+                              progress=progress,
+                              )
+    finally:
+        await connection.close()
+        await redis.aclose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m config.alembic',
+                                     description='Импорт и экспорт коротких ссылок')
+    parser.add_argument('command', choices=('import', 'export'))
+    parser.add_argument('file', type=Path)
+    parser.add_argument('--format', choices=FORMATS, default=None,
+                        help='формат файла, по умолчанию по расширению')
+    parser.add_argument('--keep-ids', action='store_true',
+                        help='сохранить id из файла при импорте')
+    parser.add_argument('--chunk-size', type=int, default=100_000,
+                        help='строк в одной транзакции или выборке курсора')
+    parser.add_argument('--progress', type=float, default=1.0,
+                        help='интервал вывода хода переноса, секунд')
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
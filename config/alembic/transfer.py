@@ -0,0 +1,332 @@
+import csv
+import json
+import re
+import sys
+from dataclasses import dataclass, asdict, field
+from itertools import islice
+from pathlib import Path
+from time import monotonic
+from typing import Awaitable, Callable, Iterable, Iterator, TextIO
+
+import asyncpg
+
+from config import settings
+from config.dao.base_dao import NOTIFY_CHUNK_SIZE
+from config.models import RedirectURL, RedirectDigest
+from config.models.base import MAX_ID
+
+
+TABLE = RedirectURL.__tablename__
+DIGEST_TABLE = RedirectDigest.__tablename__
+STAGING_TABLE = 'redirecturls_import'
+FORMATS = ('csv', 'ndjson')
+
+_URL_PATTERN = re.compile(settings.regex.URL_VALIDATION)
+
+
+@dataclass
+class TransferStats:
+    """
+    Счетчики импорта и экспорта коротких ссылок
+    """
+    read: int = 0
+    written: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    started: float = field(default_factory=monotonic)
+
+    @property
+    def rate(self) -> float:
+        """
+        Прочитанных строк в секунду
+        """
+        return self.read / max(monotonic() - self.started, 1e-9)
+
+    def as_dict(self) -> dict[str, int | float]:
+        stats = asdict(self)
+        del stats['started']
+        stats['rate'] = round(self.rate)
+        return stats
+
+
+class Progress:
+    """
+    Вывод хода переноса в одну строку не чаще раза в `interval` секунд
+    """
+    def __init__(self, stream: TextIO | None = sys.stderr, interval: float = 1.0) -> None:
+        self.stream = stream
+        self.interval = interval
+        self._last = 0.0
+
+    def __call__(self, stats: TransferStats, done: bool = False) -> None:
+        if self.stream is None:
+            return
+        now = monotonic()
+        if not done and now - self._last < self.interval:
+            return
+        self._last = now
+        self.stream.write(f'\r{stats.read} rows, {stats.written} written, '
+                          f'{stats.duplicates} duplicates, {stats.invalid} invalid, '
+                          f'{stats.rate:,.0f} rows/s')
+        if done:
+            self.stream.write('\n')
+        self.stream.flush()
+
+
+def detect_format(path: Path, format: str | None = None) -> str:
+    """
+    Формат файла из аргумента или расширения `.csv`, `.ndjson`, `.jsonl`
+    """
+    if format is None:
+        format = 'ndjson' if path.suffix in ('.ndjson', '.jsonl') else 'csv'
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format {format}, expected one of {FORMATS}')
+    return format
+
+
+def valid_url(url: str) -> bool:
+    """
+    Проверка url теми же правилами, что и в API
+    """
+    return len(url) <= settings.MAX_URL_LENGTH and _URL_PATTERN.match(url) is not None
+
+
+def _parse_id(value: object) -> int | None:
+    try:
+        url_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return url_id if 0 < url_id <= MAX_ID else None
+
+
+def read_csv(file: TextIO) -> Iterator[tuple[int | None, str]]:
+    """
+    Строки `(id, url)` из CSV
+
+    Первая строка с колонкой `url` считается заголовком, колонка `id`
+    необязательна. Без заголовка url берется из первой колонки.
+    Неверный `id` возвращается как None.
+    """
+    reader = csv.reader(file)
+    first = next(reader, None)
+    if first is None:
+        return
+    if 'url' in first:
+        url_index = first.index('url')
+        id_index = first.index('id') if 'id' in first else None
+    else:
+        url_index, id_index = 0, None
+        reader = (row for rows in ((first,), reader) for row in rows)
+    for row in reader:
+        if not row:
+            continue
+        url_id = _parse_id(row[id_index]) if id_index is not None and id_index < len(row) else None
+        yield url_id, row[url_index] if url_index < len(row) else ''
+
+
+def read_ndjson(file: TextIO) -> Iterator[tuple[int | None, str]]:
+    """
+    Строки `(id, url)` из NDJSON, по объекту `{"url": ..., "id": ...}` на строку
+
+    Неразобранная строка возвращается с пустым url и не проходит проверку.
+    """
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            url = item['url']
+        except (ValueError, TypeError, KeyError):
+            yield None, ''
+            continue
+        yield _parse_id(item.get('id')), url if isinstance(url, str) else ''
+
+
+def read_rows(file: TextIO, format: str) -> Iterator[tuple[int | None, str]]:
+    return read_csv(file) if format == 'csv' else read_ndjson(file)
+
+
+def rows_writer(file: TextIO, format: str) -> Callable[[Iterable[tuple[int, str]]], None]:
+    """
+    Функция записи строк `(id, url)` в CSV с заголовком или в NDJSON
+    """
+    if format == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(('id', 'url'))
+        return writer.writerows
+
+    def write(rows: Iterable[tuple[int, str]]) -> None:
+        file.writelines(f'{{"id":{url_id},"url":{json.dumps(url)}}}\n'
+                        for url_id, url in rows)
+    return write
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+async def _notify_inserted(connection: asyncpg.Connection, channel: str, ids: list[int]) -> None:
+    # Тот же формат, что и у `BaseDAO.notify_changes`
+    for start in range(0, len(ids), NOTIFY_CHUNK_SIZE):
+        payload = json.dumps(dict(op='insert', ids=ids[start:start + NOTIFY_CHUNK_SIZE]),
+                             separators=(',', ':'),
+                             )
+        await connection.execute('SELECT pg_notify($1, $2)', channel, payload)
+
+
+async def import_urls(connection: asyncpg.Connection,
+                      path: Path,
+                      format: str | None = None,
+                      keep_ids: bool = False,
+                      chunk_size: int = 100_000,
+                      progress: Progress | None = None,
+                      notify_channel: str | None = None,
+                      after_chunk: Callable[[list[int]], Awaitable[None]] | None = None,
+                      ) -> TransferStats:
+    """
+    Импорт коротких ссылок из CSV или NDJSON
+
+    Файл читается пачками по `chunk_size` строк. Строки прошедшие
+    проверку `settings.regex.URL_VALIDATION` передаются `COPY` во
+    временную таблицу и переносятся одним запросом: `url_hash`
+    вычисляется на сервере и занимается в `redirectdigests`, url с уже
+    занятым `url_hash` пропускаются (`ON CONFLICT DO NOTHING`). Каждая пачка фиксируется
+    отдельно, поэтому прерванный импорт можно повторить.
+
+    С `keep_ids` сохраняются `id` из файла (нужны для переноса коротких
+    кодов), после импорта последовательность `id` сдвигается за
+    наибольший из них, но никогда не назад.
+
+    Работающее приложение затрагивает импорт и без `keep_ids`: пачка
+    фиксируется позже `id`, выданных API во время ее записи. Фильтр
+    Блума и снимок считают такие `id` отсутствующими, пока не узнают
+    о них: с `notify_channel` каждая пачка публикует `id` в канал
+    ленты изменений при фиксации, без ленты `id` ниже известных
+    перепроверяются только `CACHE_BLOOM_GAP_TIMEOUT` секунд, поэтому
+    импорт без ленты изменений выполняется до запуска приложения или
+    с его перезапуском. `after_chunk` вызывается с `id` каждой
+    зафиксированной пачки (сброс кэшей).
+
+    Args:
+        connection (asyncpg.Connection): Соединение с основной Базой Данных
+
+        path (Path): Файл импорта
+
+        format (str | None, optional): `csv` или `ndjson`, по умолчанию
+            по расширению файла. Defaults to None.
+
+        keep_ids (bool, optional): Сохранять `id` из файла.
+            Defaults to False.
+
+        chunk_size (int, optional): Строк в одной транзакции.
+            Defaults to 100_000.
+
+        progress (Progress | None, optional): Вывод хода импорта.
+            Defaults to None.
+
+        notify_channel (str | None, optional): Канал ленты изменений.
+            Defaults to None.
+
+        after_chunk (Callable[[list[int]], Awaitable[None]] | None, optional):
+            Обработка `id` зафиксированной пачки. Defaults to None.
+
+    Returns:
+        TransferStats: Итоговые счетчики
+    """
+    format = detect_format(path, format)
+    stats = TransferStats()
+    columns = ('id', 'url') if keep_ids else ('url',)
+    await connection.execute(f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} '
+                             '(id bigint, url text) ON COMMIT DELETE ROWS')
+    new_id = 'id' if keep_ids else f"nextval(pg_get_serial_sequence('{TABLE}', 'id'))"
+    insert = (f'WITH rows AS (SELECT DISTINCT ON (url_hash) id, url, url_hash FROM '
+              f"(SELECT id, url, sha256(convert_to(url, 'UTF8')) AS url_hash FROM {STAGING_TABLE}) AS hashed), "
+              f'claimed AS (INSERT INTO {DIGEST_TABLE} (url_hash, id) '
+              f'SELECT url_hash, {new_id} FROM rows '
+              'ON CONFLICT DO NOTHING RETURNING url_hash, id) '
+              f'INSERT INTO {TABLE} (id, url, url_hash) '
+              'SELECT claimed.id, rows.url, claimed.url_hash FROM claimed JOIN rows USING (url_hash) '
+              'RETURNING id')
+    with path.open(newline='', encoding='utf-8') as file:
+        for chunk in _chunks(read_rows(file, format), chunk_size):
+            stats.read += len(chunk)
+            if keep_ids:
+                records = [(url_id, url) for url_id, url in chunk
+                           if url_id is not None and valid_url(url)]
+            else:
+                records = [(url,) for _, url in chunk if valid_url(url)]
+            stats.invalid += len(chunk) - len(records)
+            async with connection.transaction():
+                await connection.copy_records_to_table(STAGING_TABLE,
+                                                       records=records,
+                                                       columns=columns,
+                                                       )
+                ids = [row['id'] for row in await connection.fetch(insert)]
+                if notify_channel is not None and ids:
+                    await _notify_inserted(connection, notify_channel, ids)
+            stats.written += len(ids)
+            stats.duplicates += len(records) - len(ids)
+            if after_chunk is not None and ids:
+                await after_chunk(ids)
+            if progress is not None:
+                progress(stats)
+    if keep_ids:
+        # `nextval` вместо `max(id)`: id, уже выданные API, не повторяются
+        await connection.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f"greatest(nextval(pg_get_serial_sequence('{TABLE}', 'id')), "
+            f'(SELECT coalesce(max(id), 0) + 1 FROM {TABLE})), false)'
+        )
+    if progress is not None:
+        progress(stats, done=True)
+    return stats
+
+
+async def export_urls(connection: asyncpg.Connection,
+                      path: Path,
+                      format: str | None = None,
+                      chunk_size: int = 100_000,
+                      progress: Progress | None = None,
+                      ) -> TransferStats:
+    """
+    Экспорт коротких ссылок `(id, url)` по возрастанию `id` в CSV или NDJSON
+
+    Строки читаются серверным курсором пачками по `chunk_size` внутри
+    одной транзакции: выгрузка согласована и занимает постоянную
+    память независимо от размера таблицы. Файл пригоден для
+    :func:`import_urls`.
+
+    Args:
+        connection (asyncpg.Connection): Соединение с Базой Данных
+
+        path (Path): Файл экспорта, перезаписывается
+
+        format (str | None, optional): `csv` или `ndjson`, по умолчанию
+            по расширению файла. Defaults to None.
+
+        chunk_size (int, optional): Строк в одной выборке курсора.
+            Defaults to 100_000.
+
+        progress (Progress | None, optional): Вывод хода экспорта.
+            Defaults to None.
+
+    Returns:
+        TransferStats: Итоговые счетчики
+    """
+    format = detect_format(path, format)
+    stats = TransferStats()
+    with path.open('w', newline='', encoding='utf-8') as file:
+        write = rows_writer(file, format)
+        async with connection.transaction(isolation='repeatable_read', readonly=True):
+            cursor = await connection.cursor(f'SELECT id, url FROM {TABLE} ORDER BY id')
+            while rows := await cursor.fetch(chunk_size):
+                write(rows)
+                stats.read += len(rows)
+                stats.written += len(rows)
+                if progress is not None:
+                    progress(stats)
+    if progress is not None:
+        progress(stats, done=True)
+    return stats
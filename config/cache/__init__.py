@@ -0,0 +1,45 @@
+from .tiny_lfu import TinyLFUCache, CacheStats
+from .backends import BulkRedisBackend, L1RedisBackend
+from .key_builder import request_key_builder
+from .bloom import BloomFilter
+from .url_table import UrlTable
+from .versions import get_version, bump_version, version_cache_key
+from .single_flight import (
+    SingleFlight,
+    SingleFlightStats,
+    RedisSingleFlight,
+    single_flight,
+    )
+from .control import (
+    cache_control_header,
+    client_max_age,
+    client_cache_control,
+    )
+from .stale import (
+    StaleWhileRevalidate,
+    StaleStats,
+    stale_while_revalidate,
+    )
+
+
+__all__ = ('TinyLFUCache',
+           'CacheStats',
+           'BulkRedisBackend',
+           'L1RedisBackend',
+           'request_key_builder',
+           'BloomFilter',
+           'UrlTable',
+           'get_version',
+           'bump_version',
+           'version_cache_key',
+           'SingleFlight',
+           'SingleFlightStats',
+           'RedisSingleFlight',
+           'single_flight',
+           'cache_control_header',
+           'client_max_age',
+           'client_cache_control',
+           'StaleWhileRevalidate',
+           'StaleStats',
+           'stale_while_revalidate',
+           )
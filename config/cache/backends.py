@@ -0,0 +1,255 @@
+from dataclasses import dataclass, asdict
+from time import monotonic
+from typing import Mapping, Sequence
+
+from fastapi_cache.backends.redis import RedisBackend
+from redis.asyncio.client import Redis
+
+from .tiny_lfu import TinyLFUCache
+
+
+@dataclass
+class RemoteStats:
+    """
+    Счетчики обращений к Redis за L1 кэшем
+    """
+    hits: int = 0
+    misses: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class BulkRedisBackend(RedisBackend):
+    """
+    Backend `fastapi_cache` для Redis с пакетными операциями.
+
+    `get_many` выполняется одним `MGET`, `set_many` одним конвейером
+    `SET ... EX`, что позволяет разрешать множество ключей за один
+    сетевой обмен. Ошибки Redis считаются в `remote_stats.errors`,
+    `@cache` их только логирует.
+    """
+    def __init__(self, redis: Redis) -> None:
+        super().__init__(redis)
+        self.remote_stats = RemoteStats()
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        try:
+            return await super().get_with_ttl(key)
+        except Exception:
+            self.remote_stats.errors += 1
+            raise
+
+    async def get(self, key: str) -> bytes | None:
+        try:
+            return await super().get(key)
+        except Exception:
+            self.remote_stats.errors += 1
+            raise
+
+    async def set(self, key: str, value: bytes, expire: int | None = None) -> None:
+        try:
+            await super().set(key, value, expire)
+        except Exception:
+            self.remote_stats.errors += 1
+            raise
+
+    async def clear(self, namespace: str | None = None, key: str | None = None) -> int:
+        try:
+            return await super().clear(namespace, key)
+        except Exception:
+            self.remote_stats.errors += 1
+            raise
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        if not keys:
+            return list()
+        try:
+            return await self.redis.mget(keys)
+        except Exception:
+            self.remote_stats.errors += 1
+            raise
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[tuple[int, bytes | None]]:
+        """
+        Значения и оставшиеся сроки ключей одним конвейером `MGET` и `TTL`
+        """
+        if not keys:
+            return list()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.mget(keys)
+                for key in keys:
+                    pipe.ttl(key)
+                values, *ttls = await pipe.execute()
+        except Exception:
+            self.remote_stats.errors += 1
+            raise
+        return list(zip(ttls, values))
+
+    async def incr(self, key: str) -> int:
+        try:
+            return await self.redis.incr(key)
+        except Exception:
+            self.remote_stats.errors += 1
+            raise
+
+    async def set_many(self,
+                       items: Mapping[str, bytes],
+                       expire: int | None = None,
+                       ) -> None:
+        if not items:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(key, value, ex=expire)
+                await pipe.execute()
+        except Exception:
+            self.remote_stats.errors += 1
+            raise
+
+    async def clear_many(self, keys: Sequence[str]) -> int:
+        """
+        Удаление ключей одним `DEL`
+        """
+        if not keys:
+            return 0
+        try:
+            return await self.redis.delete(*keys)
+        except Exception:
+            self.remote_stats.errors += 1
+            raise
+
+    def stats(self) -> dict[str, dict[str, int] | None]:
+        """
+        Текущие счетчики обращений к Redis
+        """
+        return dict(l1=None, redis=self.remote_stats.as_dict())
+
+
+class L1RedisBackend(BulkRedisBackend):
+    """
+    Backend `fastapi_cache` с локальным кэшем процесса перед Redis.
+
+    Чтение сначала идет в :class:`TinyLFUCache`, и только при промахе
+    в Redis, ответ которого сохраняется в L1. Запись и очистка идут
+    в оба уровня. В L1 вместе со значением хранится срок жизни ключа
+    в Redis, поэтому `get_with_ttl` отдает корректный ttl и для
+    локальных попаданий.
+
+    ## Args:
+        redis (Redis): Клиент Redis.
+        l1 (TinyLFUCache): Локальный кэш процесса.
+
+    ## Примеры:
+    ```python
+    redis = aioredis.from_url(settings.redis.redis_url)
+    backend = L1RedisBackend(redis, l1=TinyLFUCache(max_size=10_000, ttl=30))
+    FastAPICache.init(backend, prefix='fastapi-cache')
+    ```
+    """
+    def __init__(self, redis: Redis, l1: TinyLFUCache) -> None:
+        super().__init__(redis)
+        self.l1 = l1
+
+    def _remember(self, key: str, value: bytes, ttl: int | None) -> None:
+        if ttl is None or ttl < 0:
+            self.l1.set(key, (value, None))
+            return
+        if ttl == 0:
+            return
+        self.l1.set(key,
+                    (value, monotonic() + ttl),
+                    ttl=min(self.l1.ttl, ttl),
+                    )
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        entry = self.l1.get(key)
+        if entry is not None:
+            value, deadline = entry
+            if deadline is None:
+                return -1, value
+            return max(int(deadline - monotonic()), 0), value
+        ttl, value = await super().get_with_ttl(key)
+        if value is None:
+            self.remote_stats.misses += 1
+            return ttl, value
+        self.remote_stats.hits += 1
+        self._remember(key, value, ttl)
+        return ttl, value
+
+    async def get(self, key: str) -> bytes | None:
+        ttl, value = await self.get_with_ttl(key)
+        return value
+
+    async def set(self, key: str, value: bytes, expire: int | None = None) -> None:
+        try:
+            await super().set(key, value, expire)
+        except Exception:
+            self.l1.pop(key)
+            raise
+        self._remember(key, value, expire)
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        values = list()
+        missing = list()
+        for index, key in enumerate(keys):
+            entry = self.l1.get(key)
+            values.append(None if entry is None else entry[0])
+            if entry is None:
+                missing.append(index)
+        if not missing:
+            return values
+        # Сроки читаются вместе со значениями, `get_with_ttl` по L1 отдает верный ttl
+        fetched = await super().get_many_with_ttl([keys[index] for index in missing])
+        for index, (ttl, value) in zip(missing, fetched):
+            if value is None:
+                self.remote_stats.misses += 1
+                continue
+            self.remote_stats.hits += 1
+            values[index] = value
+            self._remember(keys[index], value, ttl)
+        return values
+
+    async def set_many(self,
+                       items: Mapping[str, bytes],
+                       expire: int | None = None,
+                       ) -> None:
+        try:
+            await super().set_many(items, expire)
+        except Exception:
+            for key in items:
+                self.l1.pop(key)
+            raise
+        for key, value in items.items():
+            self._remember(key, value, expire)
+
+    async def incr(self, key: str) -> int:
+        self.l1.pop(key)
+        return await super().incr(key)
+
+    async def clear(self, namespace: str | None = None, key: str | None = None) -> int:
+        if namespace:
+            self.l1.clear(prefix=f'{namespace}:')
+        elif key:
+            self.l1.pop(key)
+        return await super().clear(namespace, key)
+
+    async def clear_many(self, keys: Sequence[str]) -> int:
+        for key in keys:
+            self.l1.pop(key)
+        return await super().clear_many(keys)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        Текущие счетчики обоих уровней кэша
+        """
+        return dict(
+            l1=dict(**self.l1.stats.as_dict(),
+                    size=len(self.l1),
+                    max_size=self.l1.max_size,
+                    ),
+            redis=self.remote_stats.as_dict(),
+        )
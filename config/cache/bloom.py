@@ -0,0 +1,66 @@
+from math import ceil, log
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(value: int) -> int:
+    """
+    Финализатор splitmix64: быстрое перемешивание целого ключа
+    """
+    value = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    value = (value ^ (value >> 27)) * 0x94D049BB133111EB & _MASK64
+    return value ^ (value >> 31)
+
+
+class BloomFilter:
+    """
+    Фильтр Блума для целых ключей.
+
+    Отвечает "точно нет" или "возможно есть" с вероятностью ложного
+    срабатывания `error_rate` при заполнении до `capacity` ключей.
+    Позиции битов считаются двойным хэшированием от одного перемешивания
+    ключа, без аллокаций на каждую проверку.
+
+    ## Args:
+        capacity (int): Ожидаемое количество ключей.
+        error_rate (float): Допустимая доля ложных срабатываний.
+
+    ## Примеры:
+    ```python
+    bloom = BloomFilter(capacity=1_000_000, error_rate=0.001)
+    bloom.add(23)
+    assert 23 in bloom
+    ```
+    """
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(8, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, value: int) -> None:
+        bits = self._bits
+        first = _mix64(value)
+        second = (first >> 32) | 1
+        size = self.size
+        for index in range(self.hashes):
+            position = (first + index * second) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: int) -> bool:
+        bits = self._bits
+        first = _mix64(value)
+        second = (first >> 32) | 1
+        size = self.size
+        for index in range(self.hashes):
+            position = (first + index * second) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + self._bits.__sizeof__()
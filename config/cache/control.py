@@ -0,0 +1,50 @@
+from functools import wraps
+from typing import Any, Awaitable, Callable
+
+from starlette.responses import Response
+
+
+def cache_control_header(max_age: int) -> str:
+    """
+    Значение `Cache-Control` для браузеров и CDN
+
+    Отрицательный или нулевой `max_age` запрещает кэширование.
+    """
+    return f'max-age={max_age}' if max_age > 0 else 'no-store'
+
+
+def client_max_age(ttl: int, max_age: int) -> int:
+    """
+    Срок кэширования клиентом записи с оставшимся `ttl`
+
+    Не больше `max_age` и оставшегося времени жизни, `ttl` меньше нуля
+    (запись без срока) не ограничивает.
+    """
+    return max(0, max_age if ttl < 0 else min(ttl, max_age))
+
+
+def client_cache_control(max_age: int) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Декоратор заголовка `Cache-Control` ответа endpoint
+
+    `@cache` отдает клиентам `max-age` равный сроку записи на сервере.
+    Версии и вытеснение ключей не достают до кэшей браузеров и CDN,
+    поэтому клиентам отдается свой короткий `max_age`. Ставится над
+    `@cache`, заголовок пишется в ответ, внедренный `@cache`.
+
+    ## Args:
+        max_age (int): Срок кэширования клиентом в секундах,
+            0 - `no-store`.
+    """
+    header = cache_control_header(max_age)
+
+    def wrapper(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            for value in kwargs.values():
+                if isinstance(value, Response):
+                    value.headers['Cache-Control'] = header
+            return result
+        return inner
+    return wrapper
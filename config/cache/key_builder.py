@@ -0,0 +1,45 @@
+from hashlib import md5
+from typing import Any, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_scoped_session
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+_UNHASHABLE_ARGS = (AsyncSession, async_scoped_session, Request, Response)
+
+
+def request_key_builder(func: Callable[..., Any],
+                        namespace: str = '',
+                        *,
+                        request: Request | None = None,
+                        response: Response | None = None,
+                        args: tuple[Any, ...],
+                        kwargs: dict[str, Any],
+                        ) -> str:
+    """
+    Построение ключа кэша по аргументам endpoint
+
+    В отличии от `fastapi_cache.default_key_builder` не учитывает сессию
+    Базы Данных и объекты запроса, repr которых уникален для каждого
+    вызова, из-за чего повторные запросы никогда не попадали в кэш.
+    """
+    params = sorted((name, value)
+                    for name, value
+                    in kwargs.items()
+                    if not isinstance(value, _UNHASHABLE_ARGS))
+    cache_key = md5(
+        f'{func.__module__}:{func.__name__}:{args}:{params}'.encode(),
+    ).hexdigest()
+    return f'{namespace}:{cache_key}'
+
+
+def injected(kwargs: dict[str, Any], kind: type) -> Any:
+    """
+    Аргумент endpoint типа `kind`, например запрос или ответ,
+    внедренные `@cache`
+    """
+    for value in kwargs.values():
+        if isinstance(value, kind):
+            return value
+    return None
@@ -0,0 +1,207 @@
+import asyncio
+from dataclasses import dataclass, asdict
+from functools import wraps
+from time import monotonic
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.types import KeyBuilder
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+from .key_builder import injected, request_key_builder
+
+
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class SingleFlightStats:
+    """
+    Счетчики объединения одновременных вызовов
+    """
+    leaders: int = 0
+    coalesced: int = 0
+    lock_waits: int = 0
+    lock_timeouts: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class SingleFlight:
+    """
+    Объединение одновременных вызовов с одинаковым ключом в процессе.
+
+    Первый вызов (лидер) выполняет функцию в своей задаче, все
+    одновременные вызовы с тем же ключом ждут ее результат или
+    исключение. Функция видит контекст лидера, поэтому сессия из
+    `async_scoped_session` (по `current_task`) остается сессией его
+    запроса и закрывается вместе с ним. При отмене лидера (например
+    разрыв соединения клиента) ожидающие вызовы выбирают нового лидера.
+
+    ## Примеры:
+    ```python
+    flights = SingleFlight()
+    url = await flights.do('redirect:23', lambda: load_url(23))
+    ```
+    """
+    def __init__(self) -> None:
+        self.stats = SingleFlightStats()
+        self._inflight: dict[str, asyncio.Future] = dict()
+
+    async def _run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        return await func()
+
+    async def _follow(self, key: str, future: asyncio.Future, func: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats.coalesced += 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+        # Лидер отменен, вызов повторяется
+        return await self.do(key, func)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            return await self._follow(key, future, func)
+        self.stats.leaders += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._run(key, func)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # Исключение уже получил лидер, без ожидающих оно не логируется
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+
+class RedisSingleFlight(SingleFlight):
+    """
+    Объединение вызовов между процессами через блокировку в Redis.
+
+    Лидер процесса берет блокировку `SET NX PX` на ключ. Лидеры других
+    процессов, не получившие блокировку, ждут ее освобождения (не более
+    `wait_timeout`) и затем выполняют функцию сами, к этому моменту
+    результат обычно уже лежит в кэше. При недоступности Redis функция
+    выполняется без блокировки.
+
+    ## Args:
+        lock_ttl (float): Время жизни блокировки в секундах.
+        wait_timeout (float): Максимальное ожидание блокировки.
+        poll_interval (float): Период проверки блокировки.
+    """
+    def __init__(self,
+                 lock_ttl: float = 5.0,
+                 wait_timeout: float = 5.0,
+                 poll_interval: float = 0.02,
+                 ) -> None:
+        super().__init__()
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    async def _wait_unlocked(self, redis, lock_key: str) -> None:
+        self.stats.lock_waits += 1
+        deadline = monotonic() + self.wait_timeout
+        while await redis.exists(lock_key):
+            if monotonic() >= deadline:
+                self.stats.lock_timeouts += 1
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        lock_key = f'{FastAPICache.get_prefix()}:lock:{key}'
+        token = uuid4().hex
+        try:
+            redis = FastAPICache.get_backend().redis
+            acquired = await redis.set(lock_key,
+                                       token,
+                                       nx=True,
+                                       px=int(self.lock_ttl * 1000),
+                                       )
+            if not acquired:
+                await self._wait_unlocked(redis, lock_key)
+        except Exception:
+            return await func()
+        if not acquired:
+            return await func()
+        try:
+            return await func()
+        finally:
+            try:
+                await redis.eval(_RELEASE_LOCK, 1, lock_key, token)
+            except Exception:
+                pass
+
+
+
+def single_flight(flights: SingleFlight,
+                  namespace: str = '',
+                  key_builder: KeyBuilder = request_key_builder,
+                  ) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Декоратор объединения одновременных вызовов endpoint
+
+    Ставится над `@cache`, тогда одновременные промахи по одному ключу
+    выполняют одно чтение кэша, один запрос к Базе Данных и одну запись
+    в кэш.
+
+    Запросы с разными `If-None-Match` и `Cache-Control` не объединяются,
+    иначе `304` условного запроса достался бы обычному. Ведомые получают
+    только результат лидера, заголовки ответа лидера (`ETag`,
+    `Cache-Control`) копируются в ответ каждого запроса.
+
+    ## Args:
+        flights (SingleFlight): Группа объединяемых вызовов.
+        namespace (str): Пространство имен ключей.
+        key_builder (KeyBuilder): Построение ключа по аргументам.
+    """
+    def wrapper(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            key = key_builder(func, namespace, args=args, kwargs=kwargs)
+            if asyncio.iscoroutine(key):
+                key = await key
+            request = injected(kwargs, Request)
+            response = injected(kwargs, Response)
+            if request is not None:
+                validators = (request.headers.get('if-none-match'), request.headers.get('cache-control'))
+                if any(validators):
+                    key = f'{key}:{validators}'
+
+            async def call() -> tuple[Any, dict[str, str]]:
+                result = await func(*args, **kwargs)
+                return result, dict() if response is None else dict(response.headers)
+
+            result, headers = await flights.do(key, call)
+            if response is None:
+                return result
+            response.headers.update(headers)
+            if isinstance(result, Response) and result.status_code == HTTP_304_NOT_MODIFIED:
+                # `304` от `@cache` лидера, ведомый отвечает своим объектом ответа
+                response.status_code = result.status_code
+                return response
+            return result
+        return inner
+    return wrapper
+
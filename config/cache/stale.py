@@ -0,0 +1,257 @@
+import asyncio
+import inspect
+from dataclasses import dataclass, asdict
+from functools import wraps
+from math import log
+from random import random
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Collection
+
+from fastapi.dependencies.utils import get_typed_return_annotation
+from fastapi_cache import FastAPICache
+from fastapi_cache.types import KeyBuilder
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_scoped_session, async_sessionmaker
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+from .key_builder import injected, request_key_builder
+
+
+@dataclass
+class StaleStats:
+    """
+    Счетчики устаревших записей кэша и их фонового обновления
+    """
+    stale_hits: int = 0
+    early_refreshes: int = 0
+    refreshes: int = 0
+    failures: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class StaleWhileRevalidate:
+    """
+    Фоновое обновление записей кэша до истечения их срока.
+
+    Последние `stale` секунд жизни записи (не больше половины `expire`)
+    считаются окном устаревания: запись продолжает отдаваться из кэша,
+    а одна фоновая задача на ключ пересчитывает ее и записывает заново
+    с полным `expire`. Раньше окна запись обновляется с вероятностью
+    по схеме XFetch: `-delta * beta * log(random()) >= осталось`, где
+    `delta` - среднее время пересчета пространства имен. Так горячие
+    ключи почти никогда не доживают до истечения и запросы не платят
+    за запрос к Базе Данных на границе срока. `beta=0` отключает
+    раннее обновление.
+
+    Срок свежести выводится из оставшегося TTL, формат записей
+    не меняется, поэтому их по-прежнему читают `@cache`, массовые
+    чтения и быстрый путь редиректов.
+
+    ## Args:
+        session_factory (async_sessionmaker): Фабрика сессий для
+            фонового пересчета, сессия запроса к тому моменту закрыта.
+        stale (int): Окно устаревания в секундах.
+        beta (float): Множитель раннего обновления XFetch.
+    """
+    def __init__(self,
+                 session_factory: async_sessionmaker[AsyncSession],
+                 stale: int = 600,
+                 beta: float = 1.0,
+                 ) -> None:
+        self.session_factory = session_factory
+        self.stale = stale
+        self.beta = beta
+        self.stats = StaleStats()
+        self._delta: dict[str, float] = dict()
+        self._refreshing: dict[str, asyncio.Task] = dict()
+
+    def record_delta(self, namespace: str, seconds: float) -> None:
+        """
+        Учесть время пересчета записи пространства имен
+        """
+        previous = self._delta.get(namespace)
+        self._delta[namespace] = seconds if previous is None else previous * 0.9 + seconds * 0.1
+
+    def is_stale(self, ttl: int, expire: int) -> bool:
+        return ttl <= min(self.stale, expire // 2)
+
+    def is_due(self, namespace: str, ttl: int, expire: int) -> bool:
+        """
+        Пора ли обновлять запись с оставшимся `ttl`
+        """
+        if ttl < 0:
+            return False
+        fresh = ttl - min(self.stale, expire // 2)
+        if fresh <= 0:
+            return True
+        delta = self._delta.get(namespace)
+        if not delta or not self.beta:
+            return False
+        return -delta * self.beta * log(random() or 1e-12) >= fresh
+
+    def schedule(self,
+                 key: str,
+                 namespace: str,
+                 func: Callable[..., Awaitable[Any]],
+                 args: tuple[Any, ...],
+                 kwargs: dict[str, Any],
+                 expire: int,
+                 sessions: Collection[str] = (),
+                 ) -> None:
+        """
+        Запустить пересчет записи `key`, если он еще не запущен
+
+        Аргументы `sessions` получают новую сессию из `session_factory`
+        вместо сессии запроса.
+        """
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, namespace, func, args, kwargs, expire, sessions))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self,
+                       key: str,
+                       namespace: str,
+                       func: Callable[..., Awaitable[Any]],
+                       args: tuple[Any, ...],
+                       kwargs: dict[str, Any],
+                       expire: int,
+                       sessions: Collection[str] = (),
+                       ) -> None:
+        start = perf_counter()
+        try:
+            async with self.session_factory() as session:
+                kwargs = {name: session if name in sessions else value
+                          for name, value
+                          in kwargs.items()}
+                value = FastAPICache.get_coder().encode(await func(*args, **kwargs))
+            await FastAPICache.get_backend().set(key, value, expire=expire)
+        except Exception:
+            self.stats.failures += 1
+            logger.opt(exception=True).warning('Can not refresh cache key {}', key)
+            return
+        self.stats.refreshes += 1
+        self.record_delta(namespace, perf_counter() - start)
+
+    async def stop(self) -> None:
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        self._refreshing.clear()
+
+
+def session_params(func: Callable[..., Any]) -> frozenset[str]:
+    """
+    Имена аргументов `func` с аннотацией сессии Базы Данных
+
+    Endpoint получает не саму :class:`AsyncSession`, а прокси
+    `async_scoped_session` текущей задачи, поэтому сессия определяется
+    по аннотации, а не по типу значения.
+    """
+    return frozenset(name
+                     for name, param
+                     in inspect.signature(func).parameters.items()
+                     if isinstance(param.annotation, type)
+                     and issubclass(param.annotation, (AsyncSession, async_scoped_session)))
+
+
+def stale_while_revalidate(revalidator: StaleWhileRevalidate,
+                           expire: int,
+                           namespace: str = '',
+                           key_builder: KeyBuilder = request_key_builder,
+                           ) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Декоратор обновления записей `@cache` до истечения их срока
+
+    Ставится над `@cache` с теми же `expire`, `namespace` и `key_builder`.
+    Читает запись один раз: отдает ее так же, как `@cache` (заголовки
+    `ETag`, `Cache-Control`, ответ `304`), при промахе сам пересчитывает
+    и записывает ее, и по оставшемуся TTL при необходимости запускает
+    фоновый пересчет. `@cache` остается для внедрения запроса и ответа
+    и обслуживает только запросы мимо кэша (не `GET`, `no-store`,
+    `no-cache`). Аргументы
+    с аннотацией сессии Базы Данных (см. :function:`session_params`)
+    при пересчете получают новую сессию, сессия запроса к тому моменту
+    закрыта.
+
+    ## Args:
+        revalidator (StaleWhileRevalidate): Планировщик пересчетов.
+        expire (int): Срок жизни записей `@cache`.
+        namespace (str): Пространство имен `@cache`.
+        key_builder (KeyBuilder): Построение ключа `@cache`.
+    """
+    def wrapper(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        original = inspect.unwrap(func)
+        params = inspect.signature(original).parameters
+        sessions = session_params(original)
+        return_type = get_typed_return_annotation(original)
+
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            request = injected(kwargs, Request)
+            response = injected(kwargs, Response)
+            if not FastAPICache.get_enable() or (request is not None and _bypasses_cache(request)):
+                return await func(*args, **kwargs)
+            call_kwargs = {name: value
+                           for name, value
+                           in kwargs.items()
+                           if name in params}
+            key = key_builder(original,
+                              f'{FastAPICache.get_prefix()}:{namespace}',
+                              args=args,
+                              kwargs=call_kwargs,
+                              )
+            if inspect.isawaitable(key):
+                key = await key
+            backend = FastAPICache.get_backend()
+            coder = FastAPICache.get_coder()
+            try:
+                ttl, cached = await backend.get_with_ttl(key)
+            except Exception:
+                ttl, cached = 0, None
+            if cached is None:
+                start = perf_counter()
+                result = await original(*args, **call_kwargs)
+                revalidator.record_delta(namespace, perf_counter() - start)
+                cached = coder.encode(result)
+                try:
+                    await backend.set(key, cached, expire=expire)
+                except Exception:
+                    logger.warning('Can not cache key {}', key)
+                _cache_headers(response, expire, cached, 'MISS')
+                return result
+            if revalidator.is_due(namespace, ttl, expire):
+                if revalidator.is_stale(ttl, expire):
+                    revalidator.stats.stale_hits += 1
+                else:
+                    revalidator.stats.early_refreshes += 1
+                revalidator.schedule(key, namespace, original, args, call_kwargs, expire, sessions)
+            etag = _cache_headers(response, ttl, cached, 'HIT')
+            if response is not None and request is not None and request.headers.get('if-none-match') == etag:
+                response.status_code = HTTP_304_NOT_MODIFIED
+                return response
+            return coder.decode_as_type(cached, type_=return_type)
+        return inner
+    return wrapper
+
+
+
+def _bypasses_cache(request: Request) -> bool:
+    # Те же условия, что и у `@cache`
+    return request.method != 'GET' or request.headers.get('Cache-Control') in ('no-store', 'no-cache')
+
+
+def _cache_headers(response: Response | None, max_age: int, cached: bytes, status: str) -> str:
+    # Заголовки ответа `@cache`, `ETag` совпадает с его `ETag`
+    etag = f'W/{hash(cached)}'
+    if response is not None:
+        response.headers.update({
+            'Cache-Control': f'max-age={max_age}',
+            'ETag': etag,
+            FastAPICache.get_cache_status_header(): status,
+        })
+    return etag
@@ -0,0 +1,211 @@
+r"""
+Локальный (L1) кэш процесса с политикой вытеснения W-TinyLFU
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from time import monotonic
+from typing import Any, Hashable
+
+
+_MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    """
+    Счетчики работы L1 кэша
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    rejections: int = 0
+    expirations: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class CountMinSketch:
+    """
+    Приближенный счетчик частот обращений к ключам.
+
+    Хранит 4-битные (насыщаемые на 15) счетчики в нескольких строках
+    и периодически делит их пополам, чтобы старая популярность затухала.
+
+    ## Args:
+        width (int): Количество счетчиков в строке, округляется до степени 2.
+        sample_size (int): Количество инкрементов до очередного старения.
+    """
+    _seeds: tuple[int, ...] = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+
+    def __init__(self, width: int, sample_size: int) -> None:
+        size = 16
+        while size < width:
+            size <<= 1
+        self._mask = size - 1
+        self._rows = tuple(bytearray(size) for _ in self._seeds)
+        self._sample_size = sample_size
+        self._additions = 0
+
+    def _indexes(self, key: Hashable):
+        h = hash(key)
+        mask = self._mask
+        for seed in self._seeds:
+            h = (h ^ seed) * 0x01000193
+            yield (h ^ (h >> 16)) & mask
+
+    def increment(self, key: Hashable) -> None:
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._reset()
+
+    def frequency(self, key: Hashable) -> int:
+        return min(row[index]
+                   for row, index
+                   in zip(self._rows, self._indexes(key)))
+
+    def _reset(self) -> None:
+        for row in self._rows:
+            row[:] = bytes(value >> 1 for value in row)
+        self._additions //= 2
+
+
+class TinyLFUCache:
+    """
+    Ограниченный по размеру и времени жизни кэш с допуском W-TinyLFU.
+
+    Новые ключи попадают в маленькое LRU окно (~1% емкости). Вытесненный
+    из окна кандидат допускается в основную SLRU область (probation +
+    protected) только если он обращался чаще, чем ее текущая жертва.
+    Так разовые обращения (сканирование, случайные id) не вымывают
+    горячие ключи с Zipf-распределением.
+
+    Класс не потокобезопасен и рассчитан на использование внутри
+    одного event loop: между операциями нет точек переключения.
+
+    ## Args:
+        max_size (int): Максимальное количество записей.
+        ttl (float): Время жизни записи по умолчанию в секундах.
+
+    ## Примеры:
+    ```python
+    l1 = TinyLFUCache(max_size=10_000, ttl=30)
+    l1.set('key', b'value')
+    l1.get('key')
+    l1.stats.as_dict()
+    ```
+    """
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max(max_size, 2)
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._window_size = max(1, self.max_size // 100)
+        main_size = self.max_size - self._window_size
+        self._protected_size = max(1, int(main_size * 0.8))
+        self._main_size = main_size
+        self._window: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._probation: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._protected: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._sketch = CountMinSketch(width=self.max_size,
+                                      sample_size=self.max_size * 10,
+                                      )
+
+    def __len__(self) -> int:
+        return len(self._window) + len(self._probation) + len(self._protected)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._segment(key) is not None
+
+    def _segment(self, key: Hashable) -> OrderedDict | None:
+        for segment in (self._window, self._protected, self._probation):
+            if key in segment:
+                return segment
+        return None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Получение значения по ключу с учетом времени жизни
+        """
+        self._sketch.increment(key)
+        segment = self._segment(key)
+        if segment is None:
+            self.stats.misses += 1
+            return default
+        value, expires_at = segment[key]
+        if expires_at <= monotonic():
+            del segment[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return default
+        if segment is self._probation:
+            del segment[key]
+            self._protected[key] = (value, expires_at)
+            self._demote_protected()
+        else:
+            segment.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Запись значения, ttl переопределяет время жизни по умолчанию
+        """
+        expires_at = monotonic() + (self.ttl if ttl is None else ttl)
+        segment = self._segment(key)
+        if segment is not None:
+            segment[key] = (value, expires_at)
+            segment.move_to_end(key)
+            return
+        self._sketch.increment(key)
+        self._window[key] = (value, expires_at)
+        if len(self._window) > self._window_size:
+            candidate, entry = self._window.popitem(last=False)
+            self._admit(candidate, entry)
+
+    def pop(self, key: Hashable) -> Any:
+        """
+        Удаление ключа, возвращает значение или None
+        """
+        segment = self._segment(key)
+        if segment is None:
+            return None
+        return segment.pop(key)[0]
+
+    def clear(self, prefix: str | None = None) -> int:
+        """
+        Очистка всего кэша или ключей начинающихся с `prefix`
+        """
+        count = 0
+        for segment in (self._window, self._probation, self._protected):
+            if prefix is None:
+                count += len(segment)
+                segment.clear()
+                continue
+            keys = [key for key in segment
+                    if isinstance(key, str) and key.startswith(prefix)]
+            for key in keys:
+                del segment[key]
+            count += len(keys)
+        return count
+
+    def _admit(self, candidate: Hashable, entry: tuple[Any, float]) -> None:
+        if len(self._probation) + len(self._protected) < self._main_size:
+            self._probation[candidate] = entry
+            return
+        victims = self._probation or self._protected
+        victim = next(iter(victims))
+        if self._sketch.frequency(candidate) > self._sketch.frequency(victim):
+            del victims[victim]
+            self._probation[candidate] = entry
+        else:
+            self.stats.rejections += 1
+        self.stats.evictions += 1
+
+    def _demote_protected(self) -> None:
+        while len(self._protected) > self._protected_size:
+            key, entry = self._protected.popitem(last=False)
+            self._probation[key] = entry
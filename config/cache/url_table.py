@@ -0,0 +1,107 @@
+from array import array
+from typing import Iterable
+
+
+class UrlTable:
+    """
+    Компактная таблица `id -> url` в памяти процесса.
+
+    Url лежат подряд в одном буфере UTF-8, url с `id` занимает
+    `buffer[offsets[id]:offsets[id + 1]]`, пустой отрезок - `id` нет.
+    На url приходится 8 байт индекса и байты самого url, без объектов
+    Python на каждую строку.
+
+    Новые `id` дописываются по возрастанию. `id` меньше уже известного
+    наибольшего (транзакция зафиксирована позже соседней) и `id`
+    дальше `max_gap` за концом индекса (скачок последовательности,
+    импорт с `id`) попадают в небольшой словарь, пропуск не занимает
+    индекс. Удаленные `id` запоминаются в множестве, место в буфере
+    освобождается при новой загрузке.
+
+    ## Args:
+        max_gap (int): Наибольший пропуск `id`, заполняемый в индексе.
+
+    ## Примеры:
+    ```python
+    table = UrlTable()
+    table.extend([(1, b'/path'), (3, b'/other')])
+    table.put(2, b'/late')
+    table.delete(3)
+    assert table.get(2) == '/late'
+    ```
+    """
+    def __init__(self, max_gap: int = 1_000_000) -> None:
+        self.max_gap = max_gap
+        self._offsets = array('Q', (0, 0))
+        self._buffer = bytearray()
+        self._sparse: dict[int, bytes] = dict()
+        self._deleted: set[int] = set()
+        self._count = 0
+        self._max_id = 0
+
+    @property
+    def max_id(self) -> int:
+        return self._max_id
+
+    @property
+    def _indexed_id(self) -> int:
+        return len(self._offsets) - 2
+
+    def __len__(self) -> int:
+        return self._count
+
+    def nbytes(self) -> int:
+        """
+        Память буфера и индекса в байтах
+        """
+        return (len(self._buffer)
+                + self._offsets.itemsize * len(self._offsets)
+                + sum(len(url) for url in self._sparse.values()))
+
+    def append(self, url_id: int, url: bytes) -> None:
+        """
+        Дописать url с `id` больше `max_id`, пропущенные `id` остаются пустыми
+        """
+        offsets = self._offsets
+        end = offsets[-1]
+        gap = url_id - self._indexed_id - 1
+        if gap > self.max_gap:
+            self._sparse[url_id] = url
+        else:
+            if gap > 0:
+                offsets.extend(array('Q', (end,)) * gap)
+            self._buffer += url
+            offsets.append(end + len(url))
+        self._max_id = max(self._max_id, url_id)
+        self._count += 1
+
+    def extend(self, urls: Iterable[tuple[int, bytes]]) -> None:
+        for url_id, url in urls:
+            self.put(url_id, url)
+
+    def put(self, url_id: int, url: bytes) -> None:
+        if url_id in self._deleted:
+            self._deleted.discard(url_id)
+            self._count += 1
+        if url_id in self._sparse:
+            return
+        if url_id > self._indexed_id:
+            self.append(url_id, url)
+        elif self._offsets[url_id] == self._offsets[url_id + 1]:
+            self._sparse[url_id] = url
+            self._count += 1
+
+    def delete(self, url_id: int) -> None:
+        if self.get(url_id) is not None:
+            self._deleted.add(url_id)
+            self._count -= 1
+
+    def get(self, url_id: int) -> str | None:
+        if url_id < 1 or url_id > self.max_id or url_id in self._deleted:
+            return None
+        if url_id <= self._indexed_id:
+            start, end = self._offsets[url_id], self._offsets[url_id + 1]
+            if start != end:
+                return self._buffer[start:end].decode()
+        url = self._sparse.get(url_id)
+        return None if url is None else url.decode()
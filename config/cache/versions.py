@@ -0,0 +1,32 @@
+from fastapi_cache import FastAPICache
+
+
+def version_cache_key(namespace: str) -> str:
+    """
+    Ключ версии коллекции `namespace`
+    """
+    return f'{FastAPICache.get_prefix()}:{namespace}:version'
+
+
+async def get_version(namespace: str) -> int:
+    """
+    Текущая версия коллекции, входит в ключи ее закэшированных выборок
+    """
+    value = await FastAPICache.get_backend().get(version_cache_key(namespace))
+    return int(value) if value else 0
+
+
+async def bump_version(namespace: str) -> int:
+    """
+    Увеличение версии коллекции
+
+    Все выборки закэшированные под прошлой версией становятся
+    недостижимы и вытесняются Redis по истечении времени жизни.
+    """
+    backend = FastAPICache.get_backend()
+    key = version_cache_key(namespace)
+    if hasattr(backend, 'incr'):
+        return await backend.incr(key)
+    version = await get_version(namespace) + 1
+    await backend.set(key, str(version).encode())
+    return version
@@ -1,7 +1,8 @@
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from starlette.config import Config
+from starlette.datastructures import CommaSeparatedStrings
 
 
 base_dir = Path(__file__).resolve().parent.parent
@@ -40,7 +41,41 @@ class DBSettings(BaseModel):
     _password: str = config('DB_PASSWORD')
     _name: str = config('DB_HOST')
     _db_name: str = config('DB_NAME')
+    _replica_hosts: CommaSeparatedStrings = config('DB_REPLICA_HOSTS',
+                                                   cast=CommaSeparatedStrings,
+                                                   default='',
+                                                   )
     url: str = f'{_engine}://{_owner}:{_password}@{_name}/{_db_name}'
+    replica_urls: list[str] = list(map(
+        f'{_engine}://{_owner}:{_password}@{{}}/{_db_name}'.format,
+        _replica_hosts,
+    ))
+    REPLICA_STRATEGY: str = config('DB_REPLICA_STRATEGY', default='round_robin')
+
+
+class PoolSettings(BaseModel):
+    """
+    Настройки пула соединений с DataBase
+    """
+    SIZE: int = config('DB_POOL_SIZE', cast=int, default=10)
+    MAX_OVERFLOW: int = config('DB_POOL_MAX_OVERFLOW', cast=int, default=10)
+    TIMEOUT: float = config('DB_POOL_TIMEOUT', cast=float, default=30.0)
+    RECYCLE: int = config('DB_POOL_RECYCLE', cast=int, default=1_800)
+    PRE_PING: bool = bool(int(config('DB_POOL_PRE_PING', default=1)))
+    PREWARM: int = config('DB_POOL_PREWARM', cast=int, default=5)
+    STATEMENT_CACHE_SIZE: int = config('DB_STATEMENT_CACHE_SIZE', cast=int, default=100)
+
+
+class StorageSettings(BaseModel):
+    """
+    Настройки хранилища коротких ссылок
+
+    `postgres` - DataBase, `mmap` - файлы в `STORAGE_PATH` без DataBase
+    для одной машины: без реплик и без статистики переходов.
+    """
+    BACKEND: str = config('STORAGE_BACKEND', default='postgres')
+    PATH: Path = config('STORAGE_PATH', cast=Path, default=base_dir.joinpath('data'))
+    SYNC: bool = bool(int(config('STORAGE_SYNC', default=1)))
 
 
 class RedisSettings(BaseModel):
@@ -51,6 +86,122 @@ class RedisSettings(BaseModel):
     REDIS_PORT: str = config('REDIS_PORT')
     redis_url: str = ('redis://' +
                       REDIS_HOST)
+    # Соединений на один процесс приложения
+    MAX_CONNECTIONS: int = config('REDIS_MAX_CONNECTIONS', cast=int, default=100)
+
+
+class CacheSettings(BaseModel):
+    """
+    Настройки кэширования
+    """
+    PREFIX: str = 'fastapi-cache'
+    REDIRECT_EXPIRE: int = config('CACHE_REDIRECT_EXPIRE', cast=int, default=86_400)
+    LIST_EXPIRE: int = config('CACHE_LIST_EXPIRE', cast=int, default=3_600)
+    # Срок кэширования браузерами и CDN, до них не доходит вытеснение
+    CLIENT_MAX_AGE: int = config('CACHE_CLIENT_MAX_AGE', cast=int, default=60)
+    L1_ENABLED: bool = bool(int(config('CACHE_L1_ENABLED', default=1)))
+    L1_MAX_SIZE: int = config('CACHE_L1_MAX_SIZE', cast=int, default=10_000)
+    L1_TTL: int = config('CACHE_L1_TTL', cast=int, default=30)
+    NEGATIVE_EXPIRE: int = config('CACHE_NEGATIVE_EXPIRE', cast=int, default=30)
+    BLOOM_ENABLED: bool = bool(int(config('CACHE_BLOOM_ENABLED', default=1)))
+    BLOOM_CAPACITY: int = config('CACHE_BLOOM_CAPACITY', cast=int, default=1_000_000)
+    BLOOM_ERROR_RATE: float = 0.001
+    BLOOM_REFRESH_INTERVAL: float = 1.0
+    BLOOM_GAP_TIMEOUT: float = config('CACHE_BLOOM_GAP_TIMEOUT', cast=float, default=30.0)
+    WARMUP_ENABLED: bool = bool(int(config('CACHE_WARMUP_ENABLED', default=1)))
+    WARMUP_SIZE: int = config('CACHE_WARMUP_SIZE', cast=int, default=10_000)
+    WARMUP_BATCH_SIZE: int = 1_000
+    WARMUP_BUDGET: float = config('CACHE_WARMUP_BUDGET', cast=float, default=10.0)
+    SNAPSHOT_ENABLED: bool = bool(int(config('CACHE_SNAPSHOT_ENABLED', default=0)))
+    SNAPSHOT_REFRESH_INTERVAL: float = config('CACHE_SNAPSHOT_REFRESH_INTERVAL', cast=float, default=1.0)
+    SNAPSHOT_GAP_TIMEOUT: float = config('CACHE_SNAPSHOT_GAP_TIMEOUT', cast=float, default=30.0)
+    CHANGE_FEED_ENABLED: bool = bool(int(config('CACHE_CHANGE_FEED_ENABLED', default=0)))
+    CHANGE_FEED_CHANNEL: str = config('CACHE_CHANGE_FEED_CHANNEL', default='url_changes')
+    CHANGE_FEED_HEALTH_INTERVAL: float = config('CACHE_CHANGE_FEED_HEALTH_INTERVAL', cast=float, default=10.0)
+    CHANGE_FEED_MAX_BACKOFF: float = config('CACHE_CHANGE_FEED_MAX_BACKOFF', cast=float, default=30.0)
+    FAST_PATH_ENABLED: bool = bool(int(config('CACHE_FAST_PATH_ENABLED', default=1)))
+    STALE_WINDOW: int = config('CACHE_STALE_WINDOW', cast=int, default=600)
+    EARLY_REFRESH_BETA: float = config('CACHE_EARLY_REFRESH_BETA', cast=float, default=1.0)
+    SINGLE_FLIGHT_LOCK: bool = bool(int(config('CACHE_SINGLE_FLIGHT_LOCK', default=0)))
+    SINGLE_FLIGHT_LOCK_TTL: float = config('CACHE_SINGLE_FLIGHT_LOCK_TTL', cast=float, default=5.0)
+    SINGLE_FLIGHT_WAIT: float = config('CACHE_SINGLE_FLIGHT_WAIT', cast=float, default=5.0)
+
+
+class PaginationSettings(BaseModel):
+    """
+    Настройки постраничной и потоковой выдачи
+    """
+    DEFAULT_LIMIT: int = 100
+    MAX_LIMIT: int = 1000
+    STREAM_CHUNK_SIZE: int = 1000
+
+
+class BatchSettings(BaseModel):
+    """
+    Настройки пакетных операций
+    """
+    MAX_SIZE: int = config('BATCH_MAX_SIZE', cast=int, default=10_000)
+
+
+class AnalyticsSettings(BaseModel):
+    """
+    Настройки учета переходов
+    """
+    CLICKS_ENABLED: bool = bool(int(config('CLICKS_ENABLED', default=1)))
+    CLICKS_FLUSH_INTERVAL: float = config('CLICKS_FLUSH_INTERVAL', cast=float, default=5.0)
+    CLICKS_FLUSH_SIZE: int = config('CLICKS_FLUSH_SIZE', cast=int, default=10_000)
+    CLICKS_MAX_PENDING: int = 1_000_000
+
+
+class ShortCodeSettings(BaseModel):
+    """
+    Настройки коротких кодов ссылок
+    """
+    SALT: str = config('SHORT_CODE_SALT', default='')
+    BITS: int = 40
+    MAX_LENGTH: int = 11
+
+
+class LogSettings(BaseModel):
+    """
+    Настройки логирования
+    """
+    FORMAT: str = config('LOG_FORMAT', default='text')
+    LEVEL: str = config('LOG_LEVEL', default='DEBUG')
+    BATCH_SIZE: int = config('LOG_BATCH_SIZE', cast=int, default=256)
+    FLUSH_INTERVAL: float = config('LOG_FLUSH_INTERVAL', cast=float, default=1.0)
+    SAMPLE_LIMIT: int = config('LOG_SAMPLE_LIMIT', cast=int, default=10)
+
+
+class ServerSettings(BaseModel):
+    """
+    Настройки запуска приложения через `server.py`
+
+    `WORKERS=0` - по процессу на каждое ядро. Каждый процесс держит свои
+    пулы DataBase и Redis, всего соединений с DataBase до
+    `WORKERS * (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW)`.
+    """
+    HOST: str = config('SERVER_HOST', default='0.0.0.0')
+    PORT: int = config('SERVER_PORT', cast=int, default=8000)
+    WORKERS: int = config('SERVER_WORKERS', cast=int, default=0)
+    LOOP: str = config('SERVER_LOOP', default='auto')
+    HTTP: str = config('SERVER_HTTP', default='auto')
+    BACKLOG: int = config('SERVER_BACKLOG', cast=int, default=2048)
+    KEEP_ALIVE: int = config('SERVER_KEEP_ALIVE', cast=int, default=5)
+    GRACEFUL_TIMEOUT: int = config('SERVER_GRACEFUL_TIMEOUT', cast=int, default=30)
+    LIMIT_CONCURRENCY: int = config('SERVER_LIMIT_CONCURRENCY', cast=int, default=0)
+    ACCESS_LOG: bool = bool(int(config('SERVER_ACCESS_LOG', default=1)))
+    FORWARDED_ALLOW_IPS: str = config('SERVER_FORWARDED_ALLOW_IPS', default='127.0.0.1')
+
+
+class MetricsSettings(BaseModel):
+    """
+    Настройки метрик
+    """
+    ENABLED: bool = bool(int(config('METRICS_ENABLED', default=1)))
+    # Каталог сложения метрик процессов, `server.py` задает его сам
+    MULTIPROCESS_DIR: str = config('METRICS_MULTIPROCESS_DIR', default='')
+    SYNC_INTERVAL: float = config('METRICS_SYNC_INTERVAL', cast=float, default=5.0)
 
 
 class Regex(BaseModel):
@@ -58,6 +209,7 @@ class Regex(BaseModel):
     Settings for regular
     """
     URL_VALIDATION: str = r"^\/[\/\.a-zA-Z0-9\-?&='\"]+$"
+    SHORT_CODE: str = r'^[0-9a-zA-Z]+$'
 
 
 class Settings(BaseSettings):
@@ -69,15 +221,32 @@ class Settings(BaseSettings):
     )
     db: DBSettings = DBSettings()
     test_db: TestDBSettings = TestDBSettings()
+    pool: PoolSettings = PoolSettings()
+    storage: StorageSettings = StorageSettings()
     redis: RedisSettings = RedisSettings()
+    cache: CacheSettings = CacheSettings()
     alembic: AlembicSettings = AlembicSettings()
     regex: Regex = Regex()
+    pagination: PaginationSettings = PaginationSettings()
+    batch: BatchSettings = BatchSettings()
+    analytics: AnalyticsSettings = AnalyticsSettings()
+    short_codes: ShortCodeSettings = ShortCodeSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    logs: LogSettings = LogSettings()
+    server: ServerSettings = ServerSettings()
     debug: bool = bool(int(config('DEBUG')))
-    MAX_CACHE_EXPIRE: int = 60
+    MAX_URL_LENGTH: int = 8192
     API_PREFIX: str = '/api/v1'
     BASE_DIR: Path = base_dir
     LOG_DIR: Path = log_dir
     CURRENT_ORIGIN: str = config('CURRENT_ORIGIN')
 
+    @model_validator(mode='after')
+    def disable_clicks_without_db(self) -> 'Settings':
+        # Статистика переходов хранится только в DataBase
+        if self.storage.BACKEND == 'mmap':
+            self.analytics.CLICKS_ENABLED = False
+        return self
+
 
 settings = Settings()
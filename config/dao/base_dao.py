@@ -1,14 +1,27 @@
-from typing import TypeVar, Generic
+import json
+from typing import TypeVar, Generic, AsyncIterator
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import Select
+from sqlalchemy import Select, any_, bindparam, func
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import joinedload, selectinload
 from typing import ClassVar, Sequence
 
+from config.database.routing import REPLICA_READ
+
 
 T_co = TypeVar('T_co', covariant=True)
 
+# Ограничение протокола PostgreSQL на количество параметров в запросе
+MAX_QUERY_PARAMS = 32767
+
+# Идентификаторов в одном уведомлении, полезная нагрузка NOTIFY до 8000 байт
+NOTIFY_CHUNK_SIZE = 300
+
+# Готовые запросы SELECT по форме выборки, см. cached_options_statment
+_STATEMENT_CACHE: dict[tuple, Select] = dict()
+
 
 class BaseDAO(Generic[T_co]):
     """
@@ -18,6 +31,14 @@ class BaseDAO(Generic[T_co]):
 
     CRUD модели
 
+    Методы поиска и выборки читают с реплик (если они настроены),
+    методы записи работают с основной Базой Данных.
+
+    У секционированной модели (см. `__partition_by__` в :class:`Base`)
+    поиск по `id` читает одну секцию, поиск по другим полям читает все
+    секции: для частых выборок по ним нужна таблица соответствия
+    значения и `id` (как `redirectdigests` для url).
+
     Примеры::
 
         # Поиск сущности
@@ -32,14 +53,90 @@ class BaseDAO(Generic[T_co]):
             many_to_many = (Model.users, Model.stations,)
             name='model',
         )
+        # Постраничная выборка по первичному ключу
+        items = ModelDAO.find_page_by_args(
+            session=session,
+            after_id=100,
+            limit=50,
+        )
+        # Потоковая выборка через серверный курсор
+        async for item in ModelDAO.stream_items_by_args(session=session):
+            ...
+        # Поиск сущностей по множеству значений поля
+        items = ModelDAO.find_items_by_values(
+            session=session,
+            field='name',
+            values=['model', 'other'],
+        )
         # Создание сущности
         item = ModelDAO.add(
             session,
             id=3,
             name='model',
             )
+        # Получение существующей или создание новой сущности
+        item, created = ModelDAO.get_or_create(
+            session,
+            index_elements=('name',),
+            name='model',
+            )
+        # Множественное создание сущностей одним INSERT
+        items = ModelDAO.add_many(
+            session,
+            values=[dict(name='model'), dict(name='other')],
+            index_elements=('name',),
+            )
     """
     model: ClassVar[T_co | None] = None
+    # Канал `NOTIFY` для изменений сущностей, None - изменения не публикуются
+    change_channel: ClassVar[str | None] = None
+
+    @classmethod
+    async def notify_changes(cls,
+                             session: AsyncSession,
+                             operation: str,
+                             ids: Sequence[int],
+                             ) -> None:
+        """
+        Публикация изменения в канал `change_channel` текущей транзакцией
+
+        Postgres доставляет уведомления слушателям только после
+        фиксации транзакции и не доставляет их при откате, поэтому
+        слушатели узнают только о сохраненных изменениях. Полезная
+        нагрузка - JSON `{"op": operation, "ids": [...]}`.
+
+        Args:
+            session (AsyncSession): Текущая сессия
+
+            operation (str): `insert`, `update` или `delete`
+
+            ids (Sequence[int]): Первичные ключи измененных сущностей
+        """
+        if cls.change_channel is None or not ids:
+            return
+        for start in range(0, len(ids), NOTIFY_CHUNK_SIZE):
+            payload = json.dumps(dict(op=operation, ids=list(ids[start:start + NOTIFY_CHUNK_SIZE])),
+                                 separators=(',', ':'),
+                                 )
+            await session.execute(Select(func.pg_notify(cls.change_channel, payload)))
+
+    @classmethod
+    async def after_commit(cls,
+                           operation: str,
+                           instances: Sequence[T_co],
+                           ) -> None:
+        """
+        Крючек вызываемый после фиксации изменений
+
+        Переопределяется в наследниках для инвалидации кэшей и других
+        побочных эффектов записи.
+
+        Args:
+            operation (str): `insert`, `update` или `delete`
+
+            instances (Sequence[T_co]): Измененные сущности
+        """
+        pass
 
     @classmethod
     async def find_item_by_args(cls,
@@ -65,13 +162,16 @@ class BaseDAO(Generic[T_co]):
         Returns:
             T_co: Сущность из выборки
         """
-        stmt = struct_options_statment(
+        stmt, params = cached_options_statment(
             model=cls.model,
             one_to_many=one_to_many,
             many_to_many=many_to_many,
             **kwargs,
         )
-        result = await session.scalar(statement=stmt)
+        result = await session.scalar(statement=stmt,
+                                      params=params,
+                                      bind_arguments=REPLICA_READ,
+                                      )
         return result
 
     @classmethod
@@ -98,13 +198,161 @@ class BaseDAO(Generic[T_co]):
         Returns:
             T_co: Сущности из выборки
         """
+        stmt, params = cached_options_statment(
+            model=cls.model,
+            one_to_many=one_to_many,
+            many_to_many=many_to_many,
+            **kwargs,
+        )
+        result = await session.scalars(statement=stmt,
+                                       params=params,
+                                       bind_arguments=REPLICA_READ,
+                                       )
+        return list(result)
+
+    @classmethod
+    async def find_page_by_args(cls,
+                                session: AsyncSession,
+                                after_id: int | None = None,
+                                limit: int = 100,
+                                one_to_many: Sequence[T_co] | None = None,
+                                many_to_many: Sequence[T_co] | None = None,
+                                **kwargs: dict[str, str | int],
+                                ) -> list[T_co]:
+        """
+        Постраничная выборка сущностей по курсору первичного ключа
+
+        Выборка идет по индексу `id` начиная после `after_id`, поэтому
+        стоимость запроса не зависит от номера страницы.
+
+        Args:
+            session (AsyncSession): Текущая сессия
+
+            after_id (int | None, optional): Последний `id` предыдущей
+                страницы. Defaults to None.
+
+            limit (int, optional): Размер страницы. Defaults to 100.
+
+        Returns:
+            list[T_co]: Сущности страницы упорядоченные по `id`
+        """
         stmt = struct_options_statment(
             model=cls.model,
             one_to_many=one_to_many,
             many_to_many=many_to_many,
             **kwargs,
         )
-        result = await session.scalars(statement=stmt)
+        stmt = keyset_statment(
+            stmt=stmt,
+            model=cls.model,
+            after_id=after_id,
+        ).limit(limit)
+        result = await session.scalars(statement=stmt, bind_arguments=REPLICA_READ)
+        return list(result)
+
+    @classmethod
+    async def stream_items_by_args(cls,
+                                   session: AsyncSession,
+                                   after_id: int | None = None,
+                                   chunk_size: int = 1000,
+                                   one_to_many: Sequence[T_co] | None = None,
+                                   **kwargs: dict[str, str | int],
+                                   ) -> AsyncIterator[T_co]:
+        """
+        Потоковая выборка сущностей через серверный курсор
+
+        Строки читаются пачками по `chunk_size`, поэтому потребление
+        памяти не зависит от размера таблицы.
+
+        Args:
+            session (AsyncSession): Текущая сессия
+
+            after_id (int | None, optional): Начать после этого `id`.
+                Defaults to None.
+
+            chunk_size (int, optional): Размер пачки курсора.
+                Defaults to 1000.
+
+        Yields:
+            T_co: Сущности упорядоченные по `id`
+        """
+        stmt = struct_options_statment(
+            model=cls.model,
+            one_to_many=one_to_many,
+            **kwargs,
+        )
+        stmt = keyset_statment(
+            stmt=stmt,
+            model=cls.model,
+            after_id=after_id,
+        ).execution_options(yield_per=chunk_size)
+        result = await session.stream_scalars(statement=stmt, bind_arguments=REPLICA_READ)
+        async for item in result:
+            yield item
+
+    @classmethod
+    async def stream_field_values(cls,
+                                  session: AsyncSession,
+                                  field: str,
+                                  after_id: int | None = None,
+                                  chunk_size: int = 1000,
+                                  **kwargs: dict[str, str | int],
+                                  ) -> AsyncIterator[str | int]:
+        """
+        Потоковая выборка значений одного поля без построения сущностей
+
+        Args:
+            session (AsyncSession): Текущая сессия
+
+            field (str): Имя поля модели
+
+            after_id (int | None, optional): Начать после этого `id`.
+                Defaults to None.
+
+            chunk_size (int, optional): Размер пачки курсора.
+                Defaults to 1000.
+
+        Yields:
+            str | int: Значения поля упорядоченные по `id`
+        """
+        stmt = keyset_statment(
+            stmt=Select(getattr(cls.model, field)).filter_by(**kwargs),
+            model=cls.model,
+            after_id=after_id,
+        ).execution_options(yield_per=chunk_size)
+        result = await session.stream_scalars(statement=stmt)
+        async for value in result:
+            yield value
+
+    @classmethod
+    async def find_items_by_values(cls,
+                                   session: AsyncSession,
+                                   field: str,
+                                   values: Sequence[str | int],
+                                   ) -> list[T_co]:
+        """
+        Нахождение сущностей у которых поле `field` входит в `values`
+
+        Выполняется одним запросом `WHERE field = ANY(:values)` с
+        массивом в качестве единственного параметра.
+
+        Args:
+            session (AsyncSession): Текущая сессия
+
+            field (str): Имя поля модели
+
+            values (Sequence[str | int]): Искомые значения
+
+        Returns:
+            list[T_co]: Найденные сущности
+        """
+        column = getattr(cls.model, field)
+        stmt = (Select(cls.model)
+                .where(column == any_(bindparam(f'{field}_values',
+                                                value=list(values),
+                                                type_=ARRAY(column.type),
+                                                ))))
+        result = await session.scalars(statement=stmt, bind_arguments=REPLICA_READ)
         return list(result)
 
     @classmethod
@@ -115,12 +363,106 @@ class BaseDAO(Generic[T_co]):
         instance = cls.model(**values)
         session.add(instance=instance)
         try:
+            if cls.change_channel is not None:
+                await session.flush()
+                await cls.notify_changes(session, 'insert', (instance.id,))
             await session.commit()
         except SQLAlchemyError as ex:
             await session.rollback()
             raise ex
+        await cls.after_commit('insert', (instance,))
         return instance
 
+    @classmethod
+    async def get_or_create(cls,
+                            session: AsyncSession,
+                            index_elements: Sequence[str],
+                            **values,
+                            ) -> tuple[T_co, bool]:
+        """
+        Получение существующей или создание новой сущности
+
+        Создание выполняется одним `INSERT ... ON CONFLICT DO NOTHING
+        RETURNING`, при конфликте по `index_elements` существующая
+        сущность выбирается по тем же полям. Транзакция не прерывается
+        ошибкой уникальности, поэтому откат не нужен.
+
+        Args:
+            session (AsyncSession): Текущая сессия
+
+            index_elements (Sequence[str]): Поля уникального индекса
+
+        Returns:
+            tuple[T_co, bool]: Сущность и признак того, что она создана
+        """
+        stmt = (insert(cls.model)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=index_elements)
+                .returning(cls.model))
+        try:
+            instance = await session.scalar(statement=stmt)
+            created = instance is not None
+            if not created:
+                instance = await cls.find_item_by_args(
+                    session=session,
+                    **{name: values[name] for name in index_elements},
+                )
+            else:
+                await cls.notify_changes(session, 'insert', (instance.id,))
+            await session.commit()
+        except SQLAlchemyError as ex:
+            await session.rollback()
+            raise ex
+        if created:
+            await cls.after_commit('insert', (instance,))
+        return instance, created
+
+    @classmethod
+    async def add_many(cls,
+                       session: AsyncSession,
+                       values: Sequence[dict],
+                       index_elements: Sequence[str] | None = None,
+                       ) -> list[T_co]:
+        """
+        Создание множества сущностей многострочным INSERT
+
+        Строки конфликтующие по `index_elements` пропускаются
+        (`ON CONFLICT DO NOTHING`), возвращаются только созданные.
+        Запрос разбивается на части только если количество параметров
+        превышает ограничение PostgreSQL.
+
+        Args:
+            session (AsyncSession): Текущая сессия
+
+            values (Sequence[dict]): Значения полей создаваемых сущностей
+
+            index_elements (Sequence[str] | None, optional): Поля
+                уникального индекса для `ON CONFLICT`. Defaults to None.
+
+        Returns:
+            list[T_co]: Созданные сущности
+        """
+        if not values:
+            return list()
+        chunk_size = max(1, MAX_QUERY_PARAMS // len(values[0]))
+        created = list()
+        try:
+            for start in range(0, len(values), chunk_size):
+                stmt = (insert(cls.model)
+                        .values(values[start:start + chunk_size])
+                        .on_conflict_do_nothing(index_elements=index_elements)
+                        .returning(cls.model))
+                result = await session.scalars(statement=stmt)
+                created.extend(result)
+            await cls.notify_changes(session, 'insert', [item.id for item in created])
+            await session.commit()
+        except SQLAlchemyError as ex:
+            await session.rollback()
+            raise ex
+        if created:
+            await cls.after_commit('insert', created)
+        return created
+
     @classmethod
     async def update(cls,
                      session: AsyncSession,
@@ -130,7 +472,9 @@ class BaseDAO(Generic[T_co]):
         [setattr(instance, name, value)
          for name, value
          in values.items()]
+        await cls.notify_changes(session, 'update', (instance.id,))
         await session.commit()
+        await cls.after_commit('update', (instance,))
         return instance
 
     @classmethod
@@ -139,7 +483,9 @@ class BaseDAO(Generic[T_co]):
                      instance: T_co,
                      ) -> None:
         await session.delete(instance)
+        await cls.notify_changes(session, 'delete', (instance.id,))
         await session.commit()
+        await cls.after_commit('delete', (instance,))
 
 
 def struct_options_statment(model: T_co,
@@ -174,3 +520,65 @@ def struct_options_statment(model: T_co,
             .options(*stms_one_to_many)
             .options(*stmt_any_to_many))
     return stmt
+
+
+def cached_options_statment(model: T_co,
+                            one_to_many: Sequence[T_co] | None = None,
+                            many_to_many: Sequence[T_co] | None = None,
+                            **kwargs: dict[str, str | int],
+                            ) -> tuple[Select, dict[str, str | int]]:
+    """
+    Готовый запрос SELECT для выборки и параметры к нему
+
+    Запрос строится :function:`struct_options_statment` один раз на форму
+    выборки (модель, имена полей фильтра, отношения) с именованными
+    параметрами вместо значений и дальше берется из кэша. Ключ кэша
+    SQLAlchemy запоминается в самом запросе, поэтому повторные вызовы
+    не строят запрос и не обходят его для поиска скомпилированного SQL.
+    Поля со значением `None` сравниваются через `IS NULL`, как в
+    `filter_by`.
+
+    Args:
+        model (BaseModel): Модель таблицы для выборки
+        one_to_many (Sequence[BaseModel] | None, optional): Выбранные поля
+            для one_to_many
+        many_to_many (Sequence[BaseModel] | None, optional): Выбранные поля
+            для many_to_many
+
+    Returns:
+        tuple[Select, dict]: Запрос и значения его параметров
+    """
+    fields = tuple(sorted((name, value is None) for name, value in kwargs.items()))
+    key = (model, fields, tuple(one_to_many or ()), tuple(many_to_many or ()))
+    stmt = _STATEMENT_CACHE.get(key)
+    if stmt is None:
+        stmt = _STATEMENT_CACHE[key] = struct_options_statment(
+            model=model,
+            one_to_many=one_to_many,
+            many_to_many=many_to_many,
+            **{name: None if is_null else bindparam(name)
+               for name, is_null
+               in fields},
+        )
+    params = {name: value for name, value in kwargs.items() if value is not None}
+    return stmt, params
+
+
+def keyset_statment(stmt: Select,
+                    model: T_co,
+                    after_id: int | None = None,
+                    ) -> Select:
+    """
+    Добавление курсора по первичному ключу к запросу SELECT
+
+    Args:
+        stmt (Select): Исходный запрос
+        model (BaseModel): Модель таблицы для выборки
+        after_id (int | None, optional): Последний полученный `id`
+
+    Returns:
+        Select: Запрос упорядоченный по `id` начиная после `after_id`
+    """
+    if after_id is not None:
+        stmt = stmt.where(model.id > after_id)
+    return stmt.order_by(model.id)
@@ -1,17 +1,30 @@
 from sqlalchemy.ext.asyncio import (create_async_engine,
                                     async_sessionmaker,
+                                    AsyncEngine,
                                     async_scoped_session,
                                     AsyncSession,
                                     )
+from sqlalchemy.engine import make_url
 from sqlalchemy.pool import Pool
-from asyncio import current_task
+from asyncio import current_task, gather
+from loguru import logger
 
-from typing import AsyncGenerator, Any
+from typing import AsyncGenerator, Any, Sequence
 
 from config import settings
+from .pool import InstrumentedQueuePool
+from .routing import ReplicaRouter, RoutingSession
 
 
 DATA_BASE_URL = settings.db.url
+REPLICA_URLS = settings.db.replica_urls
+
+
+def asyncpg_dsn(db_url: str) -> str:
+    """
+    Адрес `postgresql://` для прямого соединения asyncpg из адреса SQLAlchemy
+    """
+    return make_url(db_url).set(drivername='postgresql').render_as_string(hide_password=False)
 
 
 class DataBaseHelper:
@@ -24,10 +37,21 @@ class DataBaseHelper:
     ## Инициализация:
         :string:`db_url` - Адресс базы данных.
         :string:`poolclass` - Пул типа :class:`sqlalchemy.pool.Pool`
+        :list:`replica_urls` - Адреса реплик Базы Данных.
+
+    Без `poolclass` используется :class:`InstrumentedQueuePool` с размерами,
+    таймаутом, пересозданием и проверкой соединений из `settings.pool`.
+
+    С репликами сессии отдают им чтения, выполненные с
+    `bind_arguments=REPLICA_READ` (см. :class:`RoutingSession`), запись
+    всегда идет в основную Базу Данных.
 
     ## Методы:
         :function:`DataBaseHelper.session_geter` - Получение генератора текущей сессии.
         :function:`DataBaseHelper.get_scoped_session` - Получение текущей сессии.
+        :function:`DataBaseHelper.get_session_factory` - Получение фабрики сессий.
+        :function:`DataBaseHelper.prewarm` - Открытие соединений пула заранее.
+        :function:`DataBaseHelper.pool_stats` - Счетчики пула соединений.
         :function:`DataBaseHelper.dispose` - Закрытые соединения.
 
     ## Примеры:
@@ -51,6 +75,7 @@ class DataBaseHelper:
     def __init__(self,
                  db_url: str = DATA_BASE_URL,
                  poolclass: Pool | None = None,
+                 replica_urls: Sequence[str] = (),
                  ) -> None:
         """
         Args:
@@ -58,31 +83,106 @@ class DataBaseHelper:
 
             poolclass (Pool | None, optional): Пул типа :class:`sqlalchemy.pool.Pool`.
             Defaults to None.
+
+            replica_urls (Sequence[str], optional): Адреса реплик.
+            Defaults to ().
         """
-        self._db_url = db_url
+        self.engine = self._create_engine(db_url, poolclass)
+        self.replicas = [self._create_engine(url, poolclass) for url in replica_urls]
+        session_class = RoutingSession
+        if self.replicas:
+            session_class = type('RoutingSession', (RoutingSession,), dict(
+                router=ReplicaRouter(self.replicas, strategy=settings.db.REPLICA_STRATEGY),
+            ))
+        self.session = async_sessionmaker(
+            bind=self.engine,
+            sync_session_class=session_class,
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+        )
+
+    @staticmethod
+    def _create_engine(db_url: str, poolclass: Pool | None = None) -> AsyncEngine:
+        url = make_url(db_url)
+        if url.get_driver_name() == 'asyncpg':
+            url = url.update_query_dict(dict(
+                prepared_statement_cache_size=str(settings.pool.STATEMENT_CACHE_SIZE),
+            ))
         setup = dict(
-            url=self._db_url,
+            url=url,
             echo=settings.debug,
         )
         if poolclass:
             setup.update(
                 poolclass=poolclass,
             )
-        self.engine = create_async_engine(
+        else:
+            setup.update(
+                poolclass=InstrumentedQueuePool,
+                pool_size=settings.pool.SIZE,
+                max_overflow=settings.pool.MAX_OVERFLOW,
+                pool_timeout=settings.pool.TIMEOUT,
+                pool_recycle=settings.pool.RECYCLE,
+                pool_pre_ping=settings.pool.PRE_PING,
+            )
+        return create_async_engine(
             **setup
         )
-        self.session = async_sessionmaker(
-            bind=self.engine,
-            autoflush=False,
-            autocommit=False,
-            expire_on_commit=False,
+
+    async def prewarm(self, connections: int = settings.pool.PREWARM) -> None:
+        """
+        Открытие соединений пулов заранее
+
+        Первые запросы после запуска не тратят время на установку
+        соединений. Ошибка соединения не прерывает запуск приложения.
+        """
+        for engine in (self.engine, *self.replicas):
+            await self._prewarm_engine(engine, connections)
+
+    @staticmethod
+    async def _prewarm_engine(engine: AsyncEngine, connections: int) -> None:
+        pool = engine.pool
+        if not isinstance(pool, InstrumentedQueuePool):
+            return
+        connections = min(connections, pool.size())
+        if connections <= 0:
+            return
+        results = await gather(*(engine.connect().start()
+                                 for _ in range(connections)),
+                               return_exceptions=True,
+                               )
+        opened = [result for result in results if not isinstance(result, BaseException)]
+        for connection in opened:
+            await connection.close()
+        if len(opened) < connections:
+            error = next(result for result in results if isinstance(result, BaseException))
+            logger.opt(exception=error).error('Can not prewarm pool of Data Base connections to {}',
+                                              engine.url.host,
+                                              )
+        if opened:
+            logger.info('Prewarmed {} Data Base connections to {}', len(opened), engine.url.host)
+
+    def pool_stats(self) -> dict[str, Any]:
+        """
+        Счетчики пулов соединений, None для пула без счетчиков
+        """
+        def engine_stats(engine: AsyncEngine) -> dict[str, Any] | None:
+            if not isinstance(engine.pool, InstrumentedQueuePool):
+                return None
+            return dict(host=engine.url.host, **engine.pool.stats_dict())
+
+        return dict(
+            primary=engine_stats(self.engine),
+            replicas=[engine_stats(replica) for replica in self.replicas],
         )
 
     async def dispose(self) -> None:
         """
         Закрытие соединения
         """
-        await self.engine.dispose()
+        for engine in (self.engine, *self.replicas):
+            await engine.dispose()
 
     def get_scoped_session(self) -> AsyncSession:
         """
@@ -94,6 +194,16 @@ class DataBaseHelper:
         )
         return session
 
+    def get_session_factory(self) -> async_sessionmaker[AsyncSession]:
+        """
+        Получение фабрики сессий
+
+        Нужна обработчикам, которые продолжают работать с Базой Данных
+        после возврата ответа (например потоковая выдача), когда сессия
+        из :function:`DataBaseHelper.session_geter` уже закрыта.
+        """
+        return self.session
+
     async def session_geter(self) -> AsyncGenerator[AsyncSession, Any]:
         """
         Получение генератора сессии
@@ -111,5 +221,5 @@ class DataBaseHelper:
         await session.remove()
 
 
-db_helper = DataBaseHelper()
+db_helper = DataBaseHelper(replica_urls=REPLICA_URLS)
 db_test = DataBaseHelper
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from time import perf_counter
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+
+@dataclass
+class PoolStats:
+    """
+    Счетчики выдачи соединений пулом
+    """
+    checkouts: int = 0
+    connects: int = 0
+    timeouts: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    connect_seconds: float = 0.0
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, считающий время ожидания соединения.
+
+    Ожиданием считается время выдачи соединения без времени установки
+    новых соединений, то есть время простоя в очереди при исчерпанном
+    пуле. По нему вместе с `checkedout` и `overflow` подбираются
+    `pool_size` и `max_overflow` под конкурентность приложения.
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _create_connection(self) -> ConnectionPoolEntry:
+        start = perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            self.stats.connects += 1
+            self.stats.connect_seconds += perf_counter() - start
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        stats = self.stats
+        start = perf_counter()
+        connect_seconds = stats.connect_seconds
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            wait = perf_counter() - start - (stats.connect_seconds - connect_seconds)
+            stats.checkouts += 1
+            stats.wait_seconds += wait
+            stats.max_wait_seconds = max(stats.max_wait_seconds, wait)
+
+    def stats_dict(self) -> dict[str, int | float]:
+        stats = self.stats
+        return dict(
+            size=self.size(),
+            checked_in=self.checkedin(),
+            checked_out=self.checkedout(),
+            overflow=max(self.overflow(), 0),
+            max_overflow=self._max_overflow,
+            checkouts=stats.checkouts,
+            connects=stats.connects,
+            timeouts=stats.timeouts,
+            avg_wait_ms=round(stats.wait_seconds / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+            max_wait_ms=round(stats.max_wait_seconds * 1000, 3),
+            avg_connect_ms=round(stats.connect_seconds / stats.connects * 1000, 3) if stats.connects else 0.0,
+        )
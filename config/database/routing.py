@@ -0,0 +1,77 @@
+from itertools import count
+from typing import Any, ClassVar, Sequence
+
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+
+
+# Аргументы выбора соединения для чтений, которые можно отдать реплике
+REPLICA_READ = dict(replica=True)
+
+_USE_PRIMARY = 'use_primary'
+_REPLICA = 'replica'
+
+
+class ReplicaRouter:
+    """
+    Выбор реплики для чтения.
+
+    ## Args:
+        replicas (Sequence[AsyncEngine]): Движки реплик.
+        strategy (str): `round_robin` по очереди или `least_busy` -
+            реплика с наименьшим количеством выданных соединений пула.
+    """
+    def __init__(self,
+                 replicas: Sequence[AsyncEngine],
+                 strategy: str = 'round_robin',
+                 ) -> None:
+        if strategy not in ('round_robin', 'least_busy'):
+            raise ValueError(f'Unknown replica strategy {strategy}')
+        self.replicas = tuple(replica.sync_engine for replica in replicas)
+        self.strategy = strategy
+        self._counter = count()
+
+    def choose(self) -> Engine:
+        if self.strategy == 'least_busy':
+            return min(self.replicas, key=lambda engine: engine.pool.checkedout())
+        return self.replicas[next(self._counter) % len(self.replicas)]
+
+
+class RoutingSession(Session):
+    """
+    Сессия, отдающая чтения репликам.
+
+    На реплику уходят только запросы, выполненные с
+    `bind_arguments=REPLICA_READ`, все остальное, в том числе запись,
+    идет в основную Базу Данных. После первой записи и после
+    :function:`use_primary` чтения сессии тоже идут в основную Базу
+    Данных, так сессия видит свои изменения. Сессия держится одной
+    реплики до закрытия.
+    """
+    router: ClassVar[ReplicaRouter | None] = None
+
+    def get_bind(self, mapper=None, *, clause=None, replica: bool = False, **kwargs: Any):
+        if (replica
+                and self.router is not None
+                and not self._flushing
+                and not self.info.get(_USE_PRIMARY)):
+            engine = self.info.get(_REPLICA)
+            if engine is None:
+                engine = self.info[_REPLICA] = self.router.choose()
+            return engine
+        if self._flushing or (clause is not None and getattr(clause, 'is_dml', False)):
+            self.info[_USE_PRIMARY] = True
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def use_primary(session: AsyncSession) -> AsyncSession:
+    """
+    Направить все дальнейшие чтения сессии в основную Базу Данных
+
+    Для чтения только что записанных данных, которые могли еще не
+    дойти до реплики.
+    """
+    session.info[_USE_PRIMARY] = True
+    return session
+
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from config import settings
+from .registry import (
+    MetricsRegistry,
+    Counter,
+    Histogram,
+    Gauge,
+    )
+from .middleware import MetricsMiddleware, ROUTE_SCOPE_KEY, route_label
+from .multiprocess import MultiProcessCollector, prepare_directory
+
+
+metrics = MetricsRegistry()
+multiprocess_collector = (MultiProcessCollector(metrics,
+                                                path=Path(settings.metrics.MULTIPROCESS_DIR),
+                                                interval=settings.metrics.SYNC_INTERVAL,
+                                                )
+                          if settings.metrics.MULTIPROCESS_DIR
+                          else None)
+
+
+__all__ = ('MetricsRegistry',
+           'Counter',
+           'Histogram',
+           'Gauge',
+           'MetricsMiddleware',
+           'ROUTE_SCOPE_KEY',
+           'route_label',
+           'MultiProcessCollector',
+           'prepare_directory',
+           'metrics',
+           'multiprocess_collector',
+           )
@@ -0,0 +1,82 @@
+from time import perf_counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .registry import MetricsRegistry
+
+
+# Ключ scope с шаблоном пути для запросов, обслуженных без маршрутизации
+ROUTE_SCOPE_KEY = 'metrics.route'
+
+_CACHE_HEADER = b'x-fastapi-cache'
+_CACHE_RESULTS = {b'HIT': 'hit', b'MISS': 'miss'}
+_STATUSES = {status: str(status) for status in range(100, 600)}
+
+
+def route_label(scope: Scope) -> str:
+    """
+    Шаблон пути запроса, `unmatched` для путей без маршрута
+
+    Метки по шаблону, а не по пути, держат количество рядов метрик
+    постоянным.
+    """
+    route = scope.get('route')
+    if route is not None:
+        return getattr(route, 'path', 'unmatched')
+    return scope.get(ROUTE_SCOPE_KEY, 'unmatched')
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware учета запросов.
+
+    Считает запросы по методу, шаблону пути и статусу, время ответа
+    по методу и шаблону пути, и попадания в кэш `fastapi_cache` по
+    заголовку `X-FastAPI-Cache` ответа.
+
+    ## Args:
+        app (ASGIApp): Следующее ASGI приложение.
+        registry (MetricsRegistry): Реестр метрик.
+    """
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry) -> None:
+        self.app = app
+        self.requests = registry.counter(
+            'http_requests_total',
+            'HTTP requests by method, route and status.',
+            labels=('method', 'route', 'status'),
+        )
+        self.latency = registry.histogram(
+            'http_request_duration_seconds',
+            'HTTP request latency by method and route.',
+            labels=('method', 'route'),
+        )
+        self.cache = registry.counter(
+            'http_cache_responses_total',
+            'Responses of cached routes by cache result.',
+            labels=('route', 'result'),
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = perf_counter()
+        response = [500, None]
+
+        async def send_with_metrics(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                response[0] = message['status']
+                for name, value in message.get('headers', ()):
+                    if name == _CACHE_HEADER:
+                        response[1] = value
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            route = route_label(scope)
+            method = scope['method']
+            status, cache = response
+            self.latency.observe(perf_counter() - start, method, route)
+            self.requests.inc(method, route, _STATUSES.get(status) or str(status))
+            if cache is not None:
+                self.cache.inc(route, _CACHE_RESULTS.get(cache) or cache.decode('latin-1').lower())
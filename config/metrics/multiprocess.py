@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from time import time
+from typing import Any, Iterable
+
+from loguru import logger
+
+from .registry import Gauge, Histogram, LabelValues, MetricsRegistry
+
+
+def prepare_directory(path: Path) -> None:
+    """
+    Создание каталога метрик и удаление файлов прошлого запуска
+
+    Вызывается один раз до запуска процессов, иначе счетчики процессов
+    прошлого запуска попадут в сумму.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    for file in path.glob('*.json'):
+        file.unlink(missing_ok=True)
+
+
+class MultiProcessCollector:
+    """
+    Сложение метрик процессов одного сервера через файлы в каталоге.
+
+    Запрос метрик принимает любой из процессов `server.py`, поэтому
+    каждый процесс раз в `interval` секунд (и перед ответом на запрос
+    метрик) пишет значения своего :class:`MetricsRegistry` в
+    `{path}/{pid}.json`. Ответ складывает файлы всех процессов:
+
+    - счетчики и гистограммы суммируются, файлы завершенных процессов
+      остаются в сумме, поэтому счетчики не убывают и Prometheus
+      не видит ложных сбросов;
+    - показатели выгружаются по процессам с меткой `pid`, только
+      у работающих процессов: файл обновлялся не раньше чем
+      `3 * interval` назад и процесс не завершен.
+
+    ## Args:
+        registry (MetricsRegistry): Метрики этого процесса.
+        path (Path): Общий каталог файлов процессов.
+        interval (float): Период записи файла в секундах.
+
+    ## Примеры:
+    ```python
+    collector = MultiProcessCollector(metrics, path=Path('/tmp/metrics'))
+    await collector.start()
+    text = collector.render()
+    await collector.stop()
+    ```
+    """
+    def __init__(self,
+                 registry: MetricsRegistry,
+                 path: Path,
+                 interval: float = 1.0,
+                 ) -> None:
+        self.registry = registry
+        self.path = Path(path)
+        self.interval = interval
+        self.pid = os.getpid()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def file(self) -> Path:
+        return self.path / f'{self.pid}.json'
+
+    def dump(self, final: bool = False) -> None:
+        """
+        Запись значений процесса, `final` - процесс завершается
+        """
+        data = dict(pid=self.pid, final=final, metrics=self.registry.dump())
+        self.path.mkdir(parents=True, exist_ok=True)
+        temporary = self.file.with_suffix('.tmp')
+        temporary.write_text(json.dumps(data, separators=(',', ':')))
+        os.replace(temporary, self.file)
+
+    def _read(self) -> Iterable[tuple[dict[str, Any], bool]]:
+        stale_before = time() - 3 * self.interval
+        for file in self.path.glob('*.json'):
+            try:
+                data = json.loads(file.read_text())
+                modified = file.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            yield data, not data['final'] and modified >= stale_before
+
+    def merge(self) -> MetricsRegistry:
+        """
+        Метрики всех процессов в одном реестре
+        """
+        merged = MetricsRegistry()
+        values: dict[str, dict[LabelValues, float]] = dict()
+        for data, alive in self._read():
+            for metric in data['metrics']:
+                name, labels = metric['name'], tuple(metric['labels'])
+                if metric['type'] == 'histogram':
+                    histogram = merged.histogram(name, metric['help'], labels, metric['buckets'])
+                    for label_values, counts, total in metric['values']:
+                        histogram.merge(tuple(label_values), counts, total)
+                    continue
+                if metric['type'] == 'gauge':
+                    if not alive:
+                        continue
+                    labels = (*labels, 'pid')
+                series = values.setdefault(name, dict())
+                merged.gauge(name,
+                             metric['help'],
+                             collect=lambda series=series: series,
+                             labels=labels,
+                             type=metric['type'],
+                             )
+                for label_values, value in metric['values']:
+                    label_values = tuple(label_values)
+                    if metric['type'] == 'gauge':
+                        series[(*label_values, str(data['pid']))] = value
+                    else:
+                        series[label_values] = series.get(label_values, 0) + value
+        return merged
+
+    def render(self) -> str:
+        """
+        Метрики всех процессов в текстовом формате Prometheus
+        """
+        self.dump()
+        return self.merge().render()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.dump()
+            except OSError:
+                logger.opt(exception=True).warning('Can not write metrics to {}', self.file)
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        """
+        Запуск периодической записи значений процесса
+        """
+        self.pid = os.getpid()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            self.dump(final=True)
+        except OSError:
+            logger.opt(exception=True).warning('Can not write metrics to {}', self.file)
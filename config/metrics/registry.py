@@ -0,0 +1,245 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Mapping
+
+
+LabelValues = tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + '}'
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric(ABC):
+    """
+    Базовая метрика с именем, описанием и именами меток
+    """
+    type: str = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        """
+        Строки значений в текстовом формате Prometheus
+        """
+
+    @abstractmethod
+    def values(self) -> list[list[Any]]:
+        """
+        Текущие значения `[значения меток, значение]` для сложения процессов
+        """
+
+    def dump(self) -> dict[str, Any]:
+        return dict(name=self.name,
+                    help=self.documentation,
+                    type=self.type,
+                    labels=list(self.labels),
+                    values=self.values(),
+                    )
+
+    def render(self) -> list[str]:
+        return [f'# HELP {self.name} {self.documentation}',
+                f'# TYPE {self.name} {self.type}',
+                *self.samples()]
+
+
+class Counter(Metric):
+    """
+    Монотонный счетчик.
+
+    Значения хранятся в словаре по кортежу значений меток и меняются
+    без блокировок: все изменения идут из одного цикла событий процесса.
+    """
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = dict()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        values = self._values
+        values[labels] = values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def values(self) -> list[list[Any]]:
+        return [[list(labels), value] for labels, value in self._values.items()]
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f'{self.name}{_labels(self.labels, labels)} {_number(value)}'
+
+
+class Histogram(Metric):
+    """
+    Гистограмма распределения значений.
+
+    При наблюдении увеличивается только счетчик одной корзины,
+    накопительные значения `_bucket` считаются при выгрузке.
+    """
+    type = 'histogram'
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS,
+                 ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[LabelValues, list[int]] = dict()
+        self._sums: dict[LabelValues, float] = dict()
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def count(self, *labels: str) -> int:
+        return sum(self._counts.get(labels, ()))
+
+    def values(self) -> list[list[Any]]:
+        return [[list(labels), counts, self._sums[labels]]
+                for labels, counts in self._counts.items()]
+
+    def dump(self) -> dict[str, Any]:
+        return dict(super().dump(), buckets=list(self.buckets))
+
+    def merge(self, labels: LabelValues, counts: list[int], total: float) -> None:
+        """
+        Прибавить значения корзин и сумму другого процесса
+        """
+        current = self._counts.get(labels)
+        if current is None:
+            self._counts[labels] = list(counts)
+            self._sums[labels] = total
+            return
+        for index, count in enumerate(counts):
+            current[index] += count
+        self._sums[labels] += total
+
+    def samples(self) -> Iterable[str]:
+        for labels, counts in self._counts.items():
+            total = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                total += count
+                yield (f'{self.name}_bucket'
+                       f'{_labels(self.labels, labels, le=_number(bound))} {total}')
+            yield f'{self.name}_sum{_labels(self.labels, labels)} {_number(self._sums[labels])}'
+            yield f'{self.name}_count{_labels(self.labels, labels)} {total}'
+
+
+class Gauge(Metric):
+    """
+    Показатель, значения которого читаются функцией при выгрузке
+
+    Функция возвращает словарь значений по кортежу значений меток.
+    С `type='counter'` выгружает счетчики, которые ведут сами объекты
+    (статистика пула, кэша и т.д.).
+    """
+    type = 'gauge'
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 collect: Callable[[], Mapping[LabelValues, float]],
+                 labels: Iterable[str] = (),
+                 type: str = 'gauge',
+                 ) -> None:
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+        self.type = type
+
+    def _collect(self) -> Mapping[LabelValues, float]:
+        try:
+            values = self.collect()
+        except Exception:
+            return dict()
+        return {labels: value for labels, value in values.items() if value is not None}
+
+    def values(self) -> list[list[Any]]:
+        return [[list(labels), float(value)] for labels, value in self._collect().items()]
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._collect().items():
+            yield f'{self.name}{_labels(self.labels, labels)} {_number(float(value))}'
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса в текстовом формате Prometheus.
+
+    Повторная регистрация метрики с тем же именем возвращает уже
+    зарегистрированную метрику.
+
+    ## Примеры:
+    ```python
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', labels=('route',))
+    requests.inc('/api/v1/urls')
+    print(registry.render())
+    ```
+    """
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = dict()
+
+    def _register(self, metric: Metric) -> Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self,
+                  name: str,
+                  documentation: str,
+                  labels: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS,
+                  ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self,
+              name: str,
+              documentation: str,
+              collect: Callable[[], Mapping[LabelValues, float]],
+              labels: Iterable[str] = (),
+              type: str = 'gauge',
+              ) -> Gauge:
+        return self._register(Gauge(name, documentation, collect, labels, type))
+
+    def dump(self) -> list[dict[str, Any]]:
+        """
+        Значения всех метрик для сложения процессов, см. :class:`MultiProcessCollector`
+        """
+        return [metric.dump() for metric in self._metrics.values()]
+
+    def render(self) -> str:
+        lines = list()
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
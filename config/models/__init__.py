@@ -1,4 +1,14 @@
 from .urls import RedirectURL
+from .clicks import RedirectClick
+from .deletions import RedirectDeletion
+from .digests import RedirectDigest
+from .partitioning import HashPartitions, RangePartitions
 
 
-__all__ = ('RedirectURL',)
+__all__ = ('RedirectURL',
+           'RedirectClick',
+           'RedirectDeletion',
+           'RedirectDigest',
+           'HashPartitions',
+           'RangePartitions',
+           )
@@ -1,9 +1,18 @@
+from typing import Any, ClassVar
+
+from sqlalchemy import BigInteger, Identity
 from sqlalchemy.orm import (DeclarativeBase,
                             Mapped,
                             mapped_column,
                             declared_attr,
                             )
 
+from .partitioning import Partitioning
+
+
+# Наибольшее значение автоинкрементного `id` (BIGINT)
+MAX_ID = 2 ** 63 - 1
+
 
 class Base(DeclarativeBase):
     """
@@ -18,7 +27,12 @@ class Base(DeclarativeBase):
     добаляется `s` к окончанию.
 
     - Для каждой таблицы создается автогенерируемое поле `id` или `uid`,
-    которое автоинкремирует счетчик интидификатора сущностей.
+    которое автоинкремирует счетчик интидификатора сущностей
+    (`BIGINT GENERATED BY DEFAULT AS IDENTITY`).
+
+    - Таблица с `__partition_by__` (:class:`HashPartitions` или
+    :class:`RangePartitions`) создается секционированной вместе со
+    всеми секциями.
 
     ## Примеры:
     ```python
@@ -48,11 +62,35 @@ class Base(DeclarativeBase):
     ```
     По итогу к классу :class:`User` будет добавленно поле `id` или `uid`,
     а так же в Базу данных таблица будет с названием `users`.
+
+    ```python
+    class Event(Base):
+        __partition_by__ = HashPartitions('id', modulus=8)
+    ```
+    Таблица `events` секционирована по хэшу `id` на 8 секций
+    `events_p0` ... `events_p7`.
     """
     __abstract__ = True
+    # Секционирование таблицы, None - обычная таблица
+    __partition_by__: ClassVar[Partitioning | None] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.__partition_by__ is not None and '__table__' in cls.__dict__:
+            cls.__partition_by__.attach(cls.__table__)
+
+    @declared_attr.directive
+    def __table_args__(cls) -> dict[str, Any]:
+        if cls.__partition_by__ is None:
+            return dict()
+        return dict(postgresql_partition_by=cls.__partition_by__.clause)
 
     @declared_attr.directive
     def __tablename__(cls) -> str:
         return cls.__name__.lower() + 's'
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(BigInteger,
+                                    Identity(),
+                                    primary_key=True,
+                                    index=True,
+                                    )
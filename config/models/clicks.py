@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class RedirectClick(Base):
+    """
+    Model RedirectClick
+
+    Usage counters of short url, `id` is `id` of :class:`RedirectURL`.
+    """
+    id: Mapped[int] = mapped_column(BigInteger,
+                                    ForeignKey('redirecturls.id', ondelete='CASCADE'),
+                                    primary_key=True,
+                                    )
+    clicks: Mapped[int] = mapped_column(BigInteger,
+                                        default=0,
+                                        server_default='0',
+                                        doc='Count of redirects.',
+                                        )
+    last_access: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                  doc='Time of last redirect.',
+                                                  )
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class RedirectDeletion(Base):
+    """
+    Model RedirectDeletion
+
+    Log of deleted short urls, `id` is position in the log.
+    """
+    url_id: Mapped[int] = mapped_column(BigInteger,
+                                        doc='Id of deleted :class:`RedirectURL`.',
+                                        )
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 server_default=func.now(),
+                                                 doc='Time of deletion.',
+                                                 )
@@ -0,0 +1,28 @@
+from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import LargeBinary
+
+from .base import Base
+
+
+class RedirectDigest(Base):
+    """
+    Model RedirectDigest
+
+    Unique digests of urls, `id` is `id` of :class:`RedirectURL`.
+    Partitioned `redirecturls` can not have unique index on `url_hash`,
+    so uniqueness of urls is kept here and lookups by digest find `id`
+    here first and then read one partition.
+    """
+    url_hash: Mapped[bytes] = mapped_column(LargeBinary(32),
+                                            primary_key=True,
+                                            doc='SHA-256 of url.',
+                                            )
+    id: Mapped[int] = mapped_column(BigInteger,
+                                    ForeignKey('redirecturls.id',
+                                               ondelete='CASCADE',
+                                               deferrable=True,
+                                               initially='DEFERRED',
+                                               ),
+                                    unique=True,
+                                    )
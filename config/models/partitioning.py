@@ -0,0 +1,103 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from sqlalchemy import DDL, Table, event
+
+
+@dataclass(frozen=True)
+class Partitioning(ABC):
+    """
+    Декларативное секционирование таблицы PostgreSQL.
+
+    Задается атрибутом `__partition_by__` модели, см. :class:`Base`.
+    Таблица создается с `PARTITION BY`, секции создаются сразу после
+    нее (`create_all`). В миграциях те же секции создаются по
+    :function:`Partitioning.statements`.
+
+    Ключ секционирования должен входить в первичный ключ и во все
+    уникальные индексы таблицы.
+    """
+    column: str = 'id'
+
+    @property
+    @abstractmethod
+    def clause(self) -> str:
+        """
+        Выражение после `PARTITION BY`
+        """
+
+    @abstractmethod
+    def bounds(self) -> list[tuple[str, str]]:
+        """
+        Суффиксы имен и границы секций
+        """
+
+    def statements(self, table_name: str) -> list[str]:
+        """
+        `CREATE TABLE` всех секций таблицы `table_name`
+        """
+        return [f'CREATE TABLE {table_name}_{suffix} PARTITION OF {table_name} {bound}'
+                for suffix, bound in self.bounds()]
+
+    def attach(self, table: Table) -> None:
+        """
+        Создание секций вместе с таблицей
+        """
+        for statement in self.statements(table.name):
+            event.listen(table, 'after_create', DDL(statement))
+
+
+@dataclass(frozen=True)
+class HashPartitions(Partitioning):
+    """
+    Секционирование по хэшу `column` на `modulus` секций
+
+    Строки распределяются по секциям равномерно, поиск по `column`
+    читает одну секцию. Количество секций меняется только переносом
+    таблицы.
+
+    ## Примеры:
+    ```python
+    class Url(Base):
+        __partition_by__ = HashPartitions('id', modulus=16)
+    ```
+    """
+    modulus: int = 16
+
+    @property
+    def clause(self) -> str:
+        return f'HASH ({self.column})'
+
+    def bounds(self) -> list[tuple[str, str]]:
+        return [(f'p{remainder}', f'FOR VALUES WITH (MODULUS {self.modulus}, REMAINDER {remainder})')
+                for remainder in range(self.modulus)]
+
+
+@dataclass(frozen=True)
+class RangePartitions(Partitioning):
+    """
+    Секционирование по диапазонам `column` шириной `step`
+
+    Создается `count` секций `[n * step, (n + 1) * step)` и секция
+    `default` для значений за ними. Старые секции можно отсоединять
+    и удалять целиком, новые добавляются до заполнения `default`.
+
+    ## Примеры:
+    ```python
+    class Url(Base):
+        __partition_by__ = RangePartitions('id', step=100_000_000, count=8)
+    ```
+    """
+    step: int = 100_000_000
+    count: int = 8
+
+    @property
+    def clause(self) -> str:
+        return f'RANGE ({self.column})'
+
+    def bounds(self) -> list[tuple[str, str]]:
+        bounds = [(f'p{number}',
+                   f'FOR VALUES FROM ({number * self.step}) TO ({(number + 1) * self.step})')
+                  for number in range(self.count)]
+        bounds.append(('default', 'DEFAULT'))
+        return bounds
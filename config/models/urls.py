@@ -1,14 +1,41 @@
+from hashlib import sha256
+
+from sqlalchemy.engine.default import DefaultExecutionContext
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.types import String
+from sqlalchemy.types import LargeBinary, Text
 
 from .base import Base
+from .partitioning import HashPartitions
+
+
+# Секций таблицы коротких ссылок, меняется только переносом таблицы
+URL_PARTITIONS = 16
+
+
+def url_digest(url: str) -> bytes:
+    """
+    Fixed-width digest of url used for uniqueness checks
+    """
+    return sha256(url.encode()).digest()
+
+
+def _url_digest_default(context: DefaultExecutionContext) -> bytes:
+    return url_digest(context.get_current_parameters()['url'])
 
 
 class RedirectURL(Base):
     """
     Model RedirectUrl
+
+    Table is partitioned by hash of `id`, lookup by `id` reads one
+    partition. Uniqueness of urls is kept by :class:`RedirectDigest`.
     """
-    url: Mapped[str] = mapped_column(String(256),
-                                     unique=True,
+    __partition_by__ = HashPartitions('id', modulus=URL_PARTITIONS)
+
+    url: Mapped[str] = mapped_column(Text,
                                      doc='Short url path.',
                                      )
+    url_hash: Mapped[bytes] = mapped_column(LargeBinary(32),
+                                            default=_url_digest_default,
+                                            doc='SHA-256 of url, unique by :class:`RedirectDigest`.',
+                                            )
@@ -1,60 +1,109 @@
 r"""
 Основной файл настройки логирования проектов
+
+Режим выбирается `LOG_FORMAT`:
+
+- `text` - текстовые файлы `access.log`, `error.log` и вывод в консоль.
+- `json` - один sink, строки JSON пачками в stdout, без очередей
+  и без трассировок для записей ниже ERROR.
 """
 
+import atexit
 import sys
+from pathlib import Path
+from typing import TextIO
+
 from loguru import logger
 
 from config import settings
+from .sinks import BatchedJsonSink, RateSampler
+
+
+def setup_text_logging(log_directory: Path, level: str = 'DEBUG') -> None:
+    """
+    Текстовые логи в файлы и консоль
+    """
+    log_directory.mkdir(parents=True, exist_ok=True)
+
+    logger.remove()
+
+    logger.add(
+        log_directory.joinpath('access.log'),
+        rotation='15MB',
+        format='{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}',
+        encoding='utf-8',
+        enqueue=True,
+        level=level,
+        diagnose=False,
+        backtrace=False,
+        colorize=False,
+        filter=lambda record: record['level'].no < 40,
+    )
+
+    logger.add(
+        log_directory.joinpath('error.log'),
+        rotation='15MB',
+        format='{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}',
+        encoding='utf-8',
+        enqueue=True,
+        level='ERROR',
+        diagnose=False,
+        backtrace=False,
+        colorize=False,
+    )
+
+    logger.add(
+        sink=sys.stderr,
+        format='{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}',
+        enqueue=True,
+        level='ERROR',
+        diagnose=False,
+        backtrace=False,
+        colorize=False,
+    )
+
+    logger.add(
+        sink=sys.stdout,
+        format='{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}',
+        enqueue=True,
+        level=level,
+        diagnose=False,
+        backtrace=False,
+        colorize=False,
+        filter=lambda record: record['level'].no < 40,
+    )
+
+
+def setup_json_logging(stream: TextIO = sys.stdout,
+                       level: str = 'INFO',
+                       batch_size: int = 256,
+                       flush_interval: float = 1.0,
+                       ) -> BatchedJsonSink:
+    """
+    Структурные логи JSON одним sink с записью пачками
+    """
+    logger.remove()
+    sink = BatchedJsonSink(stream, batch_size=batch_size, flush_interval=flush_interval)
+    logger.add(
+        sink,
+        format='{message}',
+        level=level,
+        diagnose=False,
+        backtrace=False,
+        colorize=False,
+        catch=True,
+    )
+    atexit.register(sink.stop)
+    return sink
+
 
+if settings.logs.FORMAT == 'json':
+    setup_json_logging(level=settings.logs.LEVEL,
+                       batch_size=settings.logs.BATCH_SIZE,
+                       flush_interval=settings.logs.FLUSH_INTERVAL,
+                       )
+else:
+    setup_text_logging(settings.LOG_DIR, level=settings.logs.LEVEL)
 
-log_directory = settings.LOG_DIR
-log_directory.mkdir(parents=True, exist_ok=True)
-
-logger.remove()
-
-logger.add(
-    log_directory.joinpath('access.log'),
-    rotation='15MB',
-    format='{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}',
-    encoding='utf-8',
-    enqueue=True,
-    level='DEBUG',
-    diagnose=False,
-    backtrace=False,
-    colorize=False,
-    filter=lambda record: record['level'].no < 40,
-)
-
-logger.add(
-    log_directory.joinpath('error.log'),
-    rotation='15MB',
-    format='{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}',
-    encoding='utf-8',
-    enqueue=True,
-    level='ERROR',
-    diagnose=False,
-    backtrace=False,
-    colorize=False,
-)
-
-logger.add(
-    sink=sys.stderr,
-    format='{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}',
-    enqueue=True,
-    level='ERROR',
-    diagnose=False,
-    backtrace=False,
-    colorize=False,
-)
-
-logger.add(
-    sink=sys.stdout,
-    format='{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}',
-    enqueue=True,
-    level='DEBUG',
-    diagnose=False,
-    backtrace=False,
-    colorize=False,
-    filter=lambda record: record['level'].no < 40,
-)
+# Ограничение частоты записей об ожидаемых ошибках клиента
+error_sampler = RateSampler(limit=settings.logs.SAMPLE_LIMIT)
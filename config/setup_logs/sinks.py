@@ -0,0 +1,138 @@
+import json
+import threading
+import traceback
+from time import monotonic
+from typing import Hashable, TextIO
+
+
+# Уровень, с которого записи пишутся сразу и с трассировкой
+ERROR_LEVEL = 40
+
+
+class BatchedJsonSink:
+    """
+    Sink loguru, пишущий записи строками JSON пачками.
+
+    Запись превращается в одну строку JSON и копится в буфере, буфер
+    пишется в поток одним `write`, когда в нем `batch_size` строк, когда
+    с прошлой записи прошло `flush_interval` секунд (проверяет фоновый
+    поток) и сразу для записей уровня ERROR и выше. Трассировка
+    исключения добавляется только к записям уровня ERROR и выше,
+    остальные получают тип и текст исключения.
+
+    ## Args:
+        stream (TextIO): Поток вывода.
+        batch_size (int): Размер пачки строк.
+        flush_interval (float): Максимальная задержка записи в секундах.
+
+    ## Примеры:
+    ```python
+    logger.add(BatchedJsonSink(sys.stdout), format='{message}')
+    ```
+    """
+    def __init__(self,
+                 stream: TextIO,
+                 batch_size: int = 256,
+                 flush_interval: float = 1.0,
+                 ) -> None:
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = list()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically,
+                                         name='log-flusher',
+                                         daemon=True,
+                                         )
+        self._flusher.start()
+
+    @staticmethod
+    def serialize(record: dict) -> str:
+        entry = dict(
+            ts=record['time'].timestamp(),
+            level=record['level'].name,
+            message=record['message'],
+            logger=record['name'],
+        )
+        if record['extra']:
+            entry.update(record['extra'])
+        exception = record['exception']
+        if exception is not None and exception.type is not None:
+            entry['exception'] = dict(type=exception.type.__name__, value=str(exception.value))
+            if record['level'].no >= ERROR_LEVEL:
+                entry['exception']['traceback'] = ''.join(traceback.format_exception(
+                    exception.type,
+                    exception.value,
+                    exception.traceback,
+                ))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+    def write(self, message) -> None:
+        record = message.record
+        line = self.serialize(record)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.batch_size or record['level'].no >= ERROR_LEVEL:
+                self._drain()
+
+    def _drain(self) -> None:
+        if self._buffer:
+            self._buffer.append('')
+            self.stream.write('\n'.join(self._buffer))
+            self.stream.flush()
+            self._buffer.clear()
+
+    def drain(self) -> None:
+        """
+        Записать накопленные строки
+        """
+        with self._lock:
+            self._drain()
+
+    def _flush_periodically(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.drain()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.drain()
+
+
+class RateSampler:
+    """
+    Ограничение частоты однотипных записей.
+
+    Пропускает не больше `limit` записей на ключ за `window` секунд,
+    остальные только считает. Первая запись следующего окна получает
+    количество пропущенных. `limit=0` отключает ограничение.
+
+    ## Примеры:
+    ```python
+    sampler = RateSampler(limit=10)
+    suppressed = sampler.allow(('UrlNotFoundError', 404))
+    if suppressed is not None:
+        logger.warning('Url not found, {} similar suppressed', suppressed)
+    ```
+    """
+    def __init__(self, limit: int = 10, window: float = 1.0) -> None:
+        self.limit = limit
+        self.window = window
+        self._windows: dict[Hashable, list] = dict()
+
+    def allow(self, key: Hashable) -> int | None:
+        """
+        None если запись надо пропустить, иначе количество пропущенных
+        """
+        if not self.limit:
+            return 0
+        now = monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.window:
+            self._windows[key] = [now, 1, 0]
+            return window[2] if window is not None else 0
+        if window[1] < self.limit:
+            window[1] += 1
+            return 0
+        window[2] += 1
+        return None
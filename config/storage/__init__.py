@@ -0,0 +1,4 @@
+from .mmap_store import MmapUrlStore
+
+
+__all__ = ('MmapUrlStore',)
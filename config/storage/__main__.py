@@ -0,0 +1,39 @@
+r"""
+Обслуживание хранилища `mmap` коротких ссылок
+
+Выполняется при остановленном приложении::
+
+    python -m config.storage stats
+    python -m config.storage compact
+"""
+
+import argparse
+from pathlib import Path
+
+from config import settings
+from .mmap_store import MmapUrlStore
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m config.storage',
+                                     description='Обслуживание хранилища mmap коротких ссылок')
+    parser.add_argument('command', choices=('stats', 'compact'))
+    parser.add_argument('--path', type=Path, default=settings.storage.PATH,
+                        help='каталог хранилища, по умолчанию STORAGE_PATH')
+    options = parser.parse_args(argv)
+    store = MmapUrlStore(options.path)
+    store.open()
+    try:
+        if options.command == 'compact':
+            result = store.compact()
+            print(f'Urls: {result["urls"]}, '
+                  f'data: {result["bytes_before"]} -> {result["bytes_after"]} bytes')
+        else:
+            print(f'Urls: {store.count}, max id: {store.max_id}, '
+                  f'data: {store.data_path.stat().st_size} bytes')
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
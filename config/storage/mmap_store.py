@@ -0,0 +1,395 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from hashlib import sha256
+from pathlib import Path
+from typing import Iterator, Sequence
+
+from loguru import logger
+
+
+DATA_MAGIC = b'URLDATA1'
+INDEX_MAGIC = b'URLIDX01'
+
+# Заголовок файла данных: метка и поколение файла
+_DATA_HEADER = struct.Struct('<8sQ')
+# Заголовок индекса: метка, поколение файла данных, конец данных
+# последней контрольной точки и наибольший `id`
+_INDEX_HEADER = struct.Struct('<8sQQI')
+INDEX_HEADER_SIZE = 64
+# Заголовок записи: вид, `id`, длина url и crc32 заголовка с url
+_RECORD_HEAD = struct.Struct('<BII')
+_RECORD_CRC = struct.Struct('<I')
+RECORD_HEADER_SIZE = _RECORD_HEAD.size + _RECORD_CRC.size
+# Ячейка индекса: смещение url в файле данных и его длина
+_SLOT = struct.Struct('<QI')
+
+RECORD_URL = 1
+RECORD_TOMBSTONE = 2
+# Длина в ячейке индекса удаленного `id`
+TOMBSTONE = 0xFFFFFFFF
+
+INDEX_GROWTH = 65_536
+
+
+class MmapUrlStore:
+    """
+    Хранилище `id -> url` в двух отображаемых в память файлах.
+
+    `urls.data` - журнал только для дописывания: записи url и
+    надгробий удаления с crc32. `urls.idx` - индекс фиксированной
+    ширины, ячейка `id` лежит по смещению `64 + id * 12` и хранит
+    смещение и длину url в журнале, поэтому поиск по `id` - O(1),
+    а `get_bytes` возвращает `memoryview` без копирования.
+
+    Запись дописывается в журнал одним `write` (и `fdatasync` при
+    `sync=True`), затем применяется к индексу. При открытии записи
+    после последней контрольной точки индекса применяются заново,
+    оборванный хвост журнала (не совпал crc) отрезается. Писатели
+    разных процессов разделены `flock`, перед записью каждый
+    догоняет записи других процессов.
+
+    Удаленные url остаются в журнале до сжатия `compact`, которое
+    выполняется при остановленном приложении.
+
+    ## Args:
+        path (Path): Каталог файлов хранилища.
+        sync (bool): `fdatasync` после каждой записи.
+        max_id (int): Наибольший допустимый `id`.
+
+    ## Примеры:
+    ```python
+    store = MmapUrlStore(Path('data'))
+    store.open()
+    url_id, created = store.add('/path/some/path')
+    store.get(url_id)
+    store.delete(url_id)
+    store.close()
+    ```
+    """
+    def __init__(self,
+                 path: Path,
+                 sync: bool = True,
+                 max_id: int = 2 ** 31 - 1,
+                 ) -> None:
+        self.path = Path(path)
+        self.sync = sync
+        self.max_id_limit = max_id
+        self.max_id = 0
+        self._data_fd: int | None = None
+        self._index_fd: int | None = None
+        self._lock_fd: int | None = None
+        self._data: mmap.mmap | None = None
+        self._index: mmap.mmap | None = None
+        self._generation = 0
+        self._end = 0
+        self._digests: dict[bytes, int] = dict()
+        self._thread_lock = threading.RLock()
+
+    @property
+    def data_path(self) -> Path:
+        return self.path.joinpath('urls.data')
+
+    @property
+    def index_path(self) -> Path:
+        return self.path.joinpath('urls.idx')
+
+    @property
+    def opened(self) -> bool:
+        return self._data_fd is not None
+
+    @property
+    def count(self) -> int:
+        # Url уникальны, поэтому их столько же, сколько SHA-256
+        return len(self._digests)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def open(self) -> None:
+        """
+        Открыть файлы хранилища, создать их при отсутствии
+        """
+        if self.opened:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock_fd = os.open(self.path.joinpath('urls.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        self._data_fd = os.open(self.data_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._index_fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked():
+            if os.fstat(self._data_fd).st_size < _DATA_HEADER.size:
+                os.ftruncate(self._data_fd, 0)
+                self._write(_DATA_HEADER.pack(DATA_MAGIC, int.from_bytes(os.urandom(8), 'little')))
+                os.fsync(self._data_fd)
+            self._map_data()
+            magic, self._generation = _DATA_HEADER.unpack_from(self._data, 0)
+            if magic != DATA_MAGIC:
+                raise ValueError(f'{self.data_path} is not a data file of url store')
+            self._open_index()
+            self._load_digests()
+            self._replay(truncate=True)
+            self.checkpoint()
+        logger.info('Url store {} opened: {} urls up to id {}', self.path, self.count, self.max_id)
+
+    def _open_index(self) -> None:
+        if os.fstat(self._index_fd).st_size < INDEX_HEADER_SIZE:
+            os.ftruncate(self._index_fd, INDEX_HEADER_SIZE + INDEX_GROWTH * _SLOT.size)
+        self._map_index()
+        magic, generation, end, max_id = _INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC or generation != self._generation:
+            # Индекс другого журнала (например после сжатия) строится заново
+            self._index.close()
+            os.ftruncate(self._index_fd, 0)
+            os.ftruncate(self._index_fd, INDEX_HEADER_SIZE + INDEX_GROWTH * _SLOT.size)
+            self._map_index()
+            end, max_id = _DATA_HEADER.size, 0
+            _INDEX_HEADER.pack_into(self._index, 0, INDEX_MAGIC, self._generation, end, max_id)
+        self._end, self.max_id = end, max_id
+
+    def _map_data(self) -> None:
+        self._data = mmap.mmap(self._data_fd, 0, access=mmap.ACCESS_READ)
+
+    def _map_index(self) -> None:
+        self._index = mmap.mmap(self._index_fd, 0, access=mmap.ACCESS_WRITE)
+
+    def _load_digests(self) -> None:
+        self._digests.clear()
+        for url_id in range(1, self.max_id + 1):
+            url = self.get_bytes(url_id)
+            if url is not None:
+                self._digests[sha256(url).digest()] = url_id
+
+    def close(self) -> None:
+        """
+        Записать контрольную точку и закрыть файлы
+        """
+        if not self.opened:
+            return
+        with self._locked():
+            self._replay()
+            self.checkpoint()
+        for mapping in (self._data, self._index):
+            try:
+                mapping.close()
+            except BufferError:
+                # Остались `memoryview` на файл, он закроется сборщиком
+                pass
+        for fd in (self._data_fd, self._index_fd, self._lock_fd):
+            os.close(fd)
+        self._data = self._index = None
+        self._data_fd = self._index_fd = self._lock_fd = None
+        self._digests.clear()
+
+    def checkpoint(self) -> None:
+        """
+        Сохранить индекс, дальше этой точки при открытии журнал применяется заново
+        """
+        self._index.flush()
+        _INDEX_HEADER.pack_into(self._index, 0, INDEX_MAGIC, self._generation, self._end, self.max_id)
+        self._index.flush(0, mmap.PAGESIZE)
+
+    def _write(self, buffer: bytes) -> None:
+        view = memoryview(buffer)
+        while view:
+            view = view[os.write(self._data_fd, view):]
+
+    def _replay(self, truncate: bool = False) -> None:
+        """
+        Применить к индексу записи журнала после `self._end`
+        """
+        size = os.fstat(self._data_fd).st_size
+        if size > len(self._data):
+            self._map_data()
+        data = memoryview(self._data)
+        position = self._end
+        try:
+            while position + RECORD_HEADER_SIZE <= size:
+                kind, url_id, length = _RECORD_HEAD.unpack_from(data, position)
+                (crc,) = _RECORD_CRC.unpack_from(data, position + _RECORD_HEAD.size)
+                start = position + RECORD_HEADER_SIZE
+                if kind not in (RECORD_URL, RECORD_TOMBSTONE) or start + length > size:
+                    break
+                payload = data[start:start + length]
+                if zlib.crc32(payload, zlib.crc32(data[position:position + _RECORD_HEAD.size])) != crc:
+                    break
+                self._apply(kind, url_id, start, payload)
+                position = start + length
+        finally:
+            data.release()
+        if truncate and position < size:
+            logger.warning('Url store {}: cut {} bytes of broken tail', self.path, size - position)
+            os.ftruncate(self._data_fd, position)
+            self._map_data()
+        self._end = position
+
+    def _slot_position(self, url_id: int) -> int:
+        return INDEX_HEADER_SIZE + url_id * _SLOT.size
+
+    def _ensure_index(self, url_id: int) -> None:
+        needed = self._slot_position(url_id) + _SLOT.size
+        if needed <= len(self._index):
+            return
+        size = os.fstat(self._index_fd).st_size
+        if size < needed:
+            size = max(needed, len(self._index) * 2)
+            os.ftruncate(self._index_fd, size)
+        self._map_index()
+
+    def _apply(self, kind: int, url_id: int, offset: int, payload: memoryview) -> None:
+        self._ensure_index(url_id)
+        position = self._slot_position(url_id)
+        if kind == RECORD_URL:
+            self._digests[sha256(payload).digest()] = url_id
+            _SLOT.pack_into(self._index, position, offset, len(payload))
+        else:
+            url = self.get_bytes(url_id)
+            if url is not None:
+                self._digests.pop(sha256(url).digest(), None)
+            _SLOT.pack_into(self._index, position, offset, TOMBSTONE)
+        self.max_id = max(self.max_id, url_id)
+
+    def _append(self, records: Sequence[tuple[int, int, bytes]]) -> None:
+        buffer = bytearray()
+        for kind, url_id, payload in records:
+            head = _RECORD_HEAD.pack(kind, url_id, len(payload))
+            buffer += head
+            buffer += _RECORD_CRC.pack(zlib.crc32(payload, zlib.crc32(head)))
+            buffer += payload
+        self._write(buffer)
+        if self.sync:
+            os.fdatasync(self._data_fd)
+        self._replay()
+
+    def get_bytes(self, url_id: int) -> memoryview | None:
+        """
+        Url по `id` без копирования, `None` для неизвестного или удаленного
+        """
+        position = self._slot_position(url_id)
+        if url_id < 1 or position + _SLOT.size > len(self._index):
+            if url_id < 1 or position + _SLOT.size > os.fstat(self._index_fd).st_size:
+                return None
+            # Индекс вырос в другом процессе
+            self._map_index()
+        offset, length = _SLOT.unpack_from(self._index, position)
+        if offset == 0 or length == TOMBSTONE:
+            return None
+        if offset + length > len(self._data):
+            self._map_data()
+        return memoryview(self._data)[offset:offset + length]
+
+    def get(self, url_id: int) -> str | None:
+        url = self.get_bytes(url_id)
+        return None if url is None else str(url, 'utf-8')
+
+    def find_digest(self, digest: bytes) -> int | None:
+        """
+        `id` url по его SHA-256 (`url_digest`)
+        """
+        return self._digests.get(digest)
+
+    def add(self, url: str) -> tuple[int, bool]:
+        """
+        Получить `id` существующего или добавить новый url
+        """
+        return self.add_many([url])[0]
+
+    def add_many(self, urls: Sequence[str]) -> list[tuple[int, bool]]:
+        """
+        `id` и признак создания для каждого url, новые дописываются одной записью журнала
+        """
+        with self._locked():
+            self._replay()
+            results, records, pending = list(), list(), dict()
+            next_id = self.max_id
+            for url in urls:
+                encoded = url.encode()
+                digest = sha256(encoded).digest()
+                url_id = self._digests.get(digest) or pending.get(digest)
+                if url_id is not None:
+                    results.append((url_id, False))
+                    continue
+                next_id += 1
+                if next_id > self.max_id_limit:
+                    raise OverflowError(f'Url store {self.path} is out of ids')
+                pending[digest] = next_id
+                records.append((RECORD_URL, next_id, encoded))
+                results.append((next_id, True))
+            if records:
+                self._append(records)
+            return results
+
+    def delete(self, url_id: int) -> bool:
+        """
+        Удалить url надгробием, `False` если его нет
+        """
+        with self._locked():
+            self._replay()
+            if self.get_bytes(url_id) is None:
+                return False
+            self._append([(RECORD_TOMBSTONE, url_id, b'')])
+            return True
+
+    def catch_up(self) -> None:
+        """
+        Применить записи других процессов, если журнал вырос
+        """
+        if os.fstat(self._data_fd).st_size > self._end:
+            with self._locked():
+                self._replay()
+
+    def iter_ids(self, after_id: int = 0, reverse: bool = False) -> Iterator[int]:
+        """
+        Существующие `id` по возрастанию после `after_id` или по убыванию с конца
+        """
+        self.catch_up()
+        ids = range(self.max_id, 0, -1) if reverse else range(after_id + 1, self.max_id + 1)
+        index = self._index
+        for url_id in ids:
+            offset, length = _SLOT.unpack_from(index, self._slot_position(url_id))
+            if offset and length != TOMBSTONE:
+                yield url_id
+
+    def compact(self) -> dict[str, int]:
+        """
+        Переписать журнал без удаленных url
+
+        Только при остановленном приложении: процессы, открывшие
+        хранилище до сжатия, продолжат читать старые файлы.
+        """
+        with self._locked():
+            self._replay()
+            before = self._end
+            temporary = self.data_path.with_suffix('.compact')
+            fd = os.open(temporary, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                buffer = bytearray(_DATA_HEADER.pack(DATA_MAGIC, int.from_bytes(os.urandom(8), 'little')))
+                live = 0
+                for url_id in self.iter_ids():
+                    payload = bytes(self.get_bytes(url_id))
+                    head = _RECORD_HEAD.pack(RECORD_URL, url_id, len(payload))
+                    buffer += head + _RECORD_CRC.pack(zlib.crc32(payload, zlib.crc32(head))) + payload
+                    live += 1
+                if self.max_id and self.get_bytes(self.max_id) is None:
+                    # Надгробие наибольшего `id` сохраняет его занятым
+                    head = _RECORD_HEAD.pack(RECORD_TOMBSTONE, self.max_id, 0)
+                    buffer += head + _RECORD_CRC.pack(zlib.crc32(b'', zlib.crc32(head)))
+                view = memoryview(buffer)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(temporary, self.data_path)
+        self.close()
+        self.open()
+        return dict(urls=live, bytes_before=before, bytes_after=self._end)
@@ -0,0 +1,7 @@
+#!/bin/bash
+
+set -o errexit
+set -o nounset
+
+# Allow streaming replication connections for the read replica
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
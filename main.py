@@ -1,16 +1,30 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 
 from redis import asyncio as aioredis
 
 from api_v1 import register_routers
+from api_v1.redirect_servise.cache import revalidator
+from api_v1.redirect_servise.change_feed import change_feed
+from api_v1.redirect_servise.clicks import click_counter
+from api_v1.redirect_servise.dao import MmapRedirectServiseDAO
+from api_v1.redirect_servise.negative import negative_lookups
+from api_v1.redirect_servise.snapshot import redirect_snapshot
+from api_v1.redirect_servise.fast_path import RedirectFastPathMiddleware
+from api_v1.redirect_servise.warmup import cache_warmer
 from app_includes import (
     register_errors,
     register_middlewares,
     )
-from config import settings
+from config import db_connection, settings
+from config.cache import (
+    BulkRedisBackend,
+    L1RedisBackend,
+    TinyLFUCache,
+    request_key_builder,
+    )
+from config.metrics import multiprocess_collector
 
 
 def start_app() -> FastAPI:
@@ -20,15 +34,64 @@ def start_app() -> FastAPI:
     app = FastAPI(lifespan=lifespan)
     register_routers(app=app)
     register_errors(app=app)
+    if settings.cache.FAST_PATH_ENABLED:
+        app.add_middleware(
+            RedirectFastPathMiddleware,
+            reserved_paths=tuple(route.path for route in app.routes),
+        )
     register_middlewares(app=app)
     return app
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis = aioredis.from_url(settings.redis.redis_url)
-    FastAPICache.init(RedisBackend(redis), prefix='fastapi-cache')
-    yield
+    if settings.storage.BACKEND == 'mmap':
+        MmapRedirectServiseDAO.store.open()
+    else:
+        await db_connection.prewarm(settings.pool.PREWARM)
+    redis = aioredis.from_url(settings.redis.redis_url,
+                              max_connections=settings.redis.MAX_CONNECTIONS,
+                              )
+    if settings.cache.L1_ENABLED:
+        backend = L1RedisBackend(
+            redis,
+            l1=TinyLFUCache(
+                max_size=settings.cache.L1_MAX_SIZE,
+                ttl=settings.cache.L1_TTL,
+                ),
+            )
+    else:
+        backend = BulkRedisBackend(redis)
+    FastAPICache.init(backend,
+                      prefix=settings.cache.PREFIX,
+                      key_builder=request_key_builder,
+                      )
+    if settings.cache.CHANGE_FEED_ENABLED and settings.storage.BACKEND == 'postgres':
+        await change_feed.start()
+    if settings.cache.WARMUP_ENABLED:
+        await cache_warmer.warm_up()
+    if settings.analytics.CLICKS_ENABLED:
+        await click_counter.start()
+    if settings.cache.BLOOM_ENABLED:
+        await negative_lookups.start()
+    if settings.cache.SNAPSHOT_ENABLED and settings.storage.BACKEND == 'postgres':
+        await redirect_snapshot.start()
+    if multiprocess_collector is not None:
+        await multiprocess_collector.start()
+    try:
+        yield
+        if multiprocess_collector is not None:
+            await multiprocess_collector.stop()
+        await revalidator.stop()
+        await change_feed.stop()
+        await redirect_snapshot.stop()
+        await negative_lookups.stop()
+        await click_counter.stop()
+    finally:
+        # Пулы принадлежат процессу, закрываются при его остановке
+        await redis.aclose()
+        await db_connection.dispose()
+        MmapRedirectServiseDAO.store.close()
 
 
 app = start_app()
@@ -0,0 +1,77 @@
+r"""
+Запуск приложения в production
+
+Поднимает `SERVER_WORKERS` процессов uvicorn (`0` - по числу ядер).
+Каждый процесс импортирует `main:app` заново и в `lifespan` открывает
+и закрывает свои пулы DataBase и Redis. `SERVER_LOOP` и `SERVER_HTTP`
+по умолчанию `auto`: uvloop и httptools, если установлены.
+
+По SIGTERM/SIGINT процессы перестают принимать соединения, дожидаются
+текущих запросов не дольше `SERVER_GRACEFUL_TIMEOUT` секунд и
+выполняют завершение `lifespan`.
+
+С несколькими процессами метрики складываются через файлы в
+`METRICS_MULTIPROCESS_DIR` (по умолчанию во временном каталоге),
+файлы прошлого запуска удаляются при старте.
+
+```bash
+python server.py
+```
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import uvicorn
+
+from config import settings
+from config.metrics import prepare_directory
+
+
+def worker_count(workers: int) -> int:
+    """
+    Количество процессов, `0` - по числу ядер
+    """
+    return workers if workers > 0 else os.cpu_count() or 1
+
+
+def server_options() -> dict[str, Any]:
+    """
+    Параметры `uvicorn.run` из настроек
+    """
+    server = settings.server
+    return dict(
+        host=server.HOST,
+        port=server.PORT,
+        workers=worker_count(server.WORKERS),
+        loop=server.LOOP,
+        http=server.HTTP,
+        backlog=server.BACKLOG,
+        timeout_keep_alive=server.KEEP_ALIVE,
+        timeout_graceful_shutdown=server.GRACEFUL_TIMEOUT,
+        limit_concurrency=server.LIMIT_CONCURRENCY or None,
+        access_log=server.ACCESS_LOG,
+        proxy_headers=True,
+        forwarded_allow_ips=server.FORWARDED_ALLOW_IPS,
+    )
+
+
+def prepare_metrics(workers: int) -> Path | None:
+    """
+    Каталог сложения метрик процессов, передается им через окружение
+    """
+    if workers <= 1 or not settings.metrics.ENABLED:
+        return None
+    path = Path(settings.metrics.MULTIPROCESS_DIR
+                or Path(tempfile.gettempdir()) / f'url-shortener-metrics-{settings.server.PORT}')
+    prepare_directory(path)
+    os.environ['METRICS_MULTIPROCESS_DIR'] = str(path)
+    return path
+
+
+if __name__ == '__main__':
+    options = server_options()
+    prepare_metrics(options['workers'])
+    uvicorn.run('main:app', **options)